@@ -1,11 +1,163 @@
+import contextlib
 import copy
+import functools
+import math
+import weakref
+from fractions import Fraction
 
 from cogst5.models.errors import *
 from cogst5.utils import *
 
 
+class BbwNameIndex:
+    """Index on the names of the children of a container
+
+    Lower case names and trigrams of the lower case names. It is kept outside of the container so that it is never
+    saved or copied: it is built the first time it is needed
+    """
+
+    _n = 3
+
+    def __init__(self, names=()):
+        self._pos = {}
+        self._lower = {}
+        self._by_lower = {}
+        self._grams = {}
+        self._counter = 0
+        for i in names:
+            self.add(i)
+
+    def is_valid(self, names):
+        return len(self._pos) == len(names)
+
+    @staticmethod
+    def _get_grams(s):
+        return {s[i : i + BbwNameIndex._n] for i in range(len(s) - BbwNameIndex._n + 1)}
+
+    def add(self, name):
+        if name in self._pos:
+            return
+
+        l = name.lower()
+        self._pos[name] = self._counter
+        self._counter += 1
+        self._lower[name] = l
+        self._by_lower.setdefault(l, set()).add(name)
+        for g in BbwNameIndex._get_grams(l):
+            self._grams.setdefault(g, set()).add(name)
+
+    def remove(self, name):
+        if name not in self._pos:
+            return
+
+        del self._pos[name]
+        l = self._lower.pop(name)
+        self._by_lower[l].discard(name)
+        if not len(self._by_lower[l]):
+            del self._by_lower[l]
+        for g in BbwNameIndex._get_grams(l):
+            self._grams[g].discard(name)
+            if not len(self._grams[g]):
+                del self._grams[g]
+
+    def _sorted(self, names):
+        return sorted(names, key=lambda x: self._pos[x])
+
+    def lower_matches(self, k):
+        return self._sorted(self._by_lower.get(k.lower(), ()))
+
+    def substring_matches(self, k):
+        """Names that contain k, case-insensitive. Superset of all the other kinds of matches"""
+        k = k.lower()
+        if len(k) < BbwNameIndex._n:
+            return [n for n, l in self._lower.items() if k in l]
+
+        postings = sorted([self._grams.get(g, set()) for g in BbwNameIndex._get_grams(k)], key=len)
+        ans = set(postings[0]).intersection(*postings[1:])
+        return self._sorted([n for n in ans if k in self._lower[n]])
+
+
+class BbwObjCache:
+    """Derived data of a BbwObj or of a BbwPart
+
+    It is kept outside of the object (see BbwObj._cache) so that it is never saved or copied.
+
+    - parent: weakref to the container that holds the object
+    - name_index: BbwNameIndex of the children
+    - used_space: exact sum of the finite capacities of the children and number of infinite ones. Fractions so that
+    adding and removing children many times does not accumulate rounding errors
+    - hex_index: BbwHexIndex of the children (worlds). Dropped when the children change
+    - cube: global cube coordinates of the object (worlds)
+    - skill_index: BbwPerson.skill_index. Dropped when the skills change
+    - crew_profile: (version, BbwCrewProfile) of a vehicle
+    - version: when the object or something in it last changed (see BbwObj._touch)
+    - rendered: {(method, args): (version, string)} of render_cache_decor
+    - on_change: called before something in the object changes with the key of the child it is in, or None if it is
+    the object itself (see BbwObj._will_change and BbwHistory)
+    - dirty: parts of the session data the journal must write (see BbwSessionData.mark_dirty)
+    """
+
+    _clock = 0
+    _max_rendered = 8
+
+    def __init__(self):
+        self.parent = None
+        self.name_index = None
+        self.used_space = None
+        self.n_inf = 0
+        self.hex_index = None
+        self.cube = None
+        self.skill_index = None
+        self.crew_profile = None
+        self.version = 0
+        self.rendered = None
+        self.on_change = None
+        self.dirty = None
+
+    def add_used_space(self, v, sign=1):
+        if v == float("inf"):
+            self.n_inf += sign
+        else:
+            self.used_space += sign * Fraction(v)
+
+    @staticmethod
+    def render_cache_decor(f):
+        """Cache the strings returned by f(self, ...) until the object or something in it changes
+
+        The arguments are part of the key. Few keys are kept per object
+        """
+        f = BbwUtils.type_sanitizer_decor(f)
+
+        @functools.wraps(f)
+        def wrapper(self, *args, **kwargs):
+            key = (f.__qualname__, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                return f(self, *args, **kwargs)
+
+            c = self._cache()
+            if c.rendered is None or len(c.rendered) >= BbwObjCache._max_rendered:
+                c.rendered = {}
+            version = c.version
+            ans = c.rendered.get(key, None)
+            if ans is not None and ans[0] == version and not BbwObj._ck_cache:
+                return ans[1]
+
+            s = f(self, *args, **kwargs)
+            if ans is not None and ans[0] == version and ans[1] != s:
+                raise AssertionError(f"`{self.name()}` cached rendering is stale")
+            c.rendered[key] = (version, s)
+            return s
+
+        return wrapper
+
+
 @BbwUtils.for_all_methods(BbwUtils.type_sanitizer_decor)
 class BbwObj(dict):
+    _caches = {}
+    _ck_cache = False
+
     def __init__(self, name="", capacity=None, count=1, size=None, info=""):
         self._capacity = 0
         self._size = 0
@@ -48,19 +200,22 @@ def set_capacity(self, v: float = None):
             v = 0.0
 
         if v == float("inf"):
-            self._capacity = v
+            with self._update_parent():
+                self._capacity = v
             return
 
         BbwUtils.test_geq("size", self.free_space(capacity=v), 0.0)
         BbwUtils.test_geq("capacity", v, 0.0)
-        self._capacity = v
+        with self._update_parent():
+            self._capacity = v
 
     @BbwUtils.set_if_not_present_decor
     def capacity(self, is_per_obj=False):
         return self._per_obj(self._capacity, is_per_obj)
 
     def set_name(self, v: str = "new_name"):
-        self._name = v
+        with self._update_parent():
+            self._name = v
 
     @BbwUtils.set_if_not_present_decor
     def name(self):
@@ -68,7 +223,8 @@ def name(self):
 
     def set_count(self, v: float = 1):
         BbwUtils.test_g("count", v, 0)
-        self._count = v
+        with self._update_parent():
+            self._count = v
 
     @BbwUtils.set_if_not_present_decor
     def count(self):
@@ -92,8 +248,149 @@ def free_space(self, capacity: float = None, size: float = None, is_per_obj=Fals
     def status(self):
         return f"({BbwUtils.pf(self.size()+self.used_space())}/{BbwUtils.pf(self.capacity())})"
 
+    def _cache(self):
+        ans = BbwObj._caches.get(id(self), None)
+        if ans is None:
+            ans = BbwObjCache()
+            BbwObj._caches[id(self)] = ans
+            weakref.finalize(self, BbwObj._caches.pop, id(self), None)
+        return ans
+
+    def parent(self):
+        p = self._cache().parent
+        return None if p is None else p()
+
+    def __setattr__(self, k, v):
+        self._will_change()
+        super().__setattr__(k, v)
+        self._touch()
+
+    def _will_change(self, k=None):
+        """Call it before changes in place (they do not pass from __setattr__). k: the child that changes, if any
+
+        The first container up with an on_change is told which of its children is about to change
+        """
+        o = self
+        while o is not None:
+            c = BbwObj._caches.get(id(o), None)
+            if c is None:
+                return
+            if c.on_change is not None:
+                c.on_change(k)
+                return
+            k = o.__dict__.get("_name", None)
+            o = None if c.parent is None else c.parent()
+
+    def _touch(self):
+        """Something that is shown changed. Call it after changes in place (they do not pass from __setattr__)
+
+        The new version goes up the containers: their rendered strings are stale too. Objects without a cache have
+        neither containers nor rendered strings
+        """
+        BbwObjCache._clock += 1
+        c = BbwObj._caches.get(id(self), None)
+        while c is not None:
+            c.version = BbwObjCache._clock
+            p = None if c.parent is None else c.parent()
+            c = None if p is None else BbwObj._caches.get(id(p), None)
+
+    def _version(self):
+        """When the object or something in it last changed (see _touch)"""
+        return self._cache().version
+
+    @contextlib.contextmanager
+    def _update_parent(self):
+        """Wrap changes that affect the capacity of this object as seen by its container"""
+        p = self.parent()
+        if p is None or p._cache().used_space is None:
+            yield
+            return
+
+        old = p.get_obj_capacity(self)
+        yield
+        p._cache().add_used_space(old, -1)
+        p._cache().add_used_space(p.get_obj_capacity(self))
+
     def used_space(self):
-        return sum([self.get_obj_capacity(i) for i in self.values()])
+        c = self._cache()
+        if c.used_space is None:
+            c.used_space, c.n_inf = Fraction(0), 0
+            for i in self.values():
+                c.add_used_space(self.get_obj_capacity(i))
+
+        ans = float("inf") if c.n_inf else float(c.used_space)
+
+        if BbwObj._ck_cache:
+            expected = math.fsum([self.get_obj_capacity(i) for i in self.values()])
+            if ans != expected:
+                raise AssertionError(f"`{self.name()}` cached used space: `{ans}` != `{expected}`")
+
+        return ans
+
+    def __setitem__(self, k, v):
+        self._will_change(k)
+        c = self._cache()
+        if k in self:
+            self._release_child(k)
+        if c.name_index is not None:
+            c.name_index.add(k)
+        if c.used_space is not None:
+            c.add_used_space(self.get_obj_capacity(v))
+        c.hex_index = None
+        v._cache().parent = weakref.ref(self)
+        super().__setitem__(k, v)
+        self._touch()
+
+    def __delitem__(self, k):
+        self._will_change(k)
+        self._release_child(k)
+        c = self._cache()
+        super().__delitem__(k)
+        c.hex_index = None
+        if c.name_index is not None:
+            c.name_index.remove(k)
+        self._touch()
+
+    def _release_child(self, k):
+        c, v = self._cache(), self[k]
+        if c.used_space is not None:
+            c.add_used_space(self.get_obj_capacity(v), -1)
+        if v.parent() is self:
+            v._cache().parent = None
+
+    def name_index(self):
+        c = self._cache()
+        if c.name_index is None or not c.name_index.is_valid(self):
+            c.name_index = BbwNameIndex(self.keys())
+        return c.name_index
+
+    def _get_children_by_name(self, name=None, extra=[], *args, **kwargs):
+        """As BbwUtils.get_objs on extra + children, but only the children that may match are checked
+
+        Matches are looked for in the same order: exact, case-insensitive, substring, case-insensitive substring
+        """
+        only_one = bool(int(kwargs.pop("only_one", False)))
+        if name is not None and type(name) is not str:
+            name = name.name()
+
+        if name is None:
+            return BbwUtils.get_objs([*extra, *self.values()], name=name, only_one=only_one, *args, **kwargs)
+
+        ans = []
+        idx = self.name_index()
+        for e, l in [
+            ([i for i in extra if i.name() == name], [name] if name in self else []),
+            ([i for i in extra if i.name().lower() == name.lower()], idx.lower_matches(name)),
+            (extra, idx.substring_matches(name)),
+        ]:
+            ans = BbwUtils.get_objs([*e, *[self[i] for i in l]], name=name, *args, **kwargs)
+            if len(ans):
+                break
+
+        if only_one and len(ans) != 1:
+            # raise with the usual message
+            BbwUtils.get_objs([*extra, *self.values()], name=name, only_one=True, *args, **kwargs)
+        return ans
 
     def get_children(self):
         return sorted(
@@ -110,24 +407,24 @@ def rename_obj(self, name, new_name, cont=None, only_one=True, *args, **kwargs):
         res = BbwRes()
 
         if len(BbwUtils.get_objs([self], name=cont)):
-            objs = BbwUtils.get_objs(self.values(), name=name, *args, **kwargs)
+            objs = self._get_children_by_name(name=name, *args, **kwargs)
             if len(objs) > 1:
                 raise SelectionException(
                     f"too many matches for container `{name}`: `{', '.join([i.name() for i in objs])}`"
                 )
             if len(objs):
-                obj = copy.deepcopy(objs[0])
+                obj = objs[0]
                 del self[obj.name()]
                 obj.set_name(new_name)
                 self[obj.name()] = obj
-                res += BbwRes(count=obj.count(), objs=[(obj, self)])
+                res.extend(BbwRes(count=obj.count(), objs=[(obj, self)]))
                 if only_one:
                     return res
 
         for i in self.get_children():
             if res.count() and only_one:
                 return res
-            res += i.rename_obj(name=name, new_name=new_name, cont=cont, *args, **kwargs)
+            res.extend(i.rename_obj(name=name, new_name=new_name, cont=cont, *args, **kwargs))
 
         return res
 
@@ -137,7 +434,7 @@ def del_obj(self, name=None, count=float("inf"), cont=None, *args, **kwargs):
 
         ans = BbwRes()
         if len(BbwUtils.get_objs([self], name=cont)):
-            objs = [i.name() for i in BbwUtils.get_objs(raw_list=self.values(), name=name, *args, **kwargs)]
+            objs = [i.name() for i in self._get_children_by_name(name=name, *args, **kwargs)]
 
             for i in objs:
                 if ans.count() == count:
@@ -145,18 +442,17 @@ def del_obj(self, name=None, count=float("inf"), cont=None, *args, **kwargs):
 
                 nr = min(self[i].count(), count)
                 if nr == self[i].count():
-                    ans += BbwRes(count=nr, objs=[(copy.deepcopy(self[i]), self)])
+                    # the whole lot goes away: hand it over, no need to copy it
+                    ans.extend(BbwRes(count=nr, objs=[(self[i], self)]))
                     del self[i]
                 else:
                     self[i].set_count(self[i].count() - nr)
-                    elimnated = copy.deepcopy(self[i])
-                    elimnated.set_count(nr)
-                    ans += BbwRes(count=nr, objs=[(elimnated, self)])
+                    ans.extend(BbwRes(count=nr, objs=[(self[i].copy_obj(nr), self)]))
 
         for i in self.get_children():
             if ans.count() == count:
                 return ans
-            ans += i.del_obj(name=name, count=count - ans.count(), cont=cont, *args, **kwargs)
+            ans.extend(i.del_obj(name=name, count=count - ans.count(), cont=cont, *args, **kwargs))
 
         return ans
 
@@ -185,35 +481,69 @@ def _free_slots(self, obj, recursive: bool, cont: str = None, *args, **kwargs):
         return ans
 
     def dist_obj(self, obj, unbreakable: bool = False, cont: str = None, *args, **kwargs):
+        """Distribute copies of obj among self and its children. obj is not modified"""
+        return self._dist_obj(obj, obj.count(), False, unbreakable, cont, *args, **kwargs)
+
+    def move_obj(self, obj, unbreakable: bool = False, cont: str = None, *args, **kwargs):
+        """As dist_obj but obj is moved in instead of copied
+
+        obj must not be in a container (del_obj returns objects like that). If it is placed whole it is linked as it is,
+        children included. Only the parts of a lot that is split among containers are copied. obj is not modified
+        when it is not placed whole
+        """
+        if obj.parent() is not None:
+            raise InvalidArgument(f"`{obj.name()}` is still in `{obj.parent().name()}`! Remove it first")
+
+        return self._dist_obj(obj, obj.count(), True, unbreakable, cont, *args, **kwargs)
+
+    def move_objs(self, objs):
+        """Move many objects in this container (not in its children). Names must be new
+
+        For bulk loads: the free space is checked once and the name index is rebuilt when it is needed again
+        """
+        objs = list(objs)
+        names = set()
+        for i in objs:
+            if i.parent() is not None:
+                raise InvalidArgument(f"`{i.name()}` is still in `{i.parent().name()}`! Remove it first")
+            if i.name() in self or i.name() in names:
+                raise InvalidArgument(f"`{i.name()}` is already in `{self.name()}`!")
+            names.add(i.name())
+
+        if self.free_space() != float("inf"):
+            BbwUtils.test_geq(
+                "final container capacity", self.free_space() - sum(self.get_obj_capacity(i) for i in objs), 0.0
+            )
+
+        self._cache().name_index = None
+        for i in objs:
+            self[i.name()] = i
+
+        return BbwRes(count=sum(i.count() for i in objs), objs=[(i, self) for i in objs])
+
+    def _dist_obj(self, obj, n, move, unbreakable, cont, *args, **kwargs):
         ans = BbwRes()
-        n = obj.count()
 
         if unbreakable and n > self._free_slots(obj=obj, recursive=True, cont=cont, *args, **kwargs):
             return ans
 
         if len(BbwUtils.get_objs([self], name=cont, *args, **kwargs)):
-            ans += self._fit_obj(obj)
+            ans.extend(self._fit_obj(obj, n, move))
 
         for i in self.get_children():
             if ans.count() == n:
                 break
 
-            obj.set_count(n - ans.count())
-            ans += i.dist_obj(obj, unbreakable=False, cont=cont, *args, **kwargs)
+            ans.extend(i._dist_obj(obj, n - ans.count(), move, False, cont, *args, **kwargs))
 
-        obj.set_count(n)
         return ans
 
     def get_objs(self, name=None, recursive=True, self_included=False, only_one=False, cont=None, *args, **kwargs):
         ans = BbwRes()
 
         if len(BbwUtils.get_objs([self], name=cont)):
-            l = sorted([i for i in self.values()], key=lambda x: not BbwUtils.has_any_tags(x, {"main"}))
-            if self_included:
-                l = [self, *l]
-
-            objs = BbwUtils.get_objs(raw_list=l, name=name, *args, **kwargs)
-            ans += BbwRes(count=sum([i.count() for i in objs]), objs=zip(objs, [self] * len(objs)))
+            objs = self._get_children_by_name(name=name, extra=[self] if self_included else [], *args, **kwargs)
+            ans.extend(BbwRes(count=sum([i.count() for i in objs]), objs=zip(objs, [self] * len(objs))))
 
         def only_one_ck(only_one, ans):
             if not only_one:
@@ -228,40 +558,57 @@ def only_one_ck(only_one, ans):
             return ans
 
         for i in self.get_children():
-            ans += i.get_objs(recursive=True, self_included=False, name=name, cont=cont, *args, **kwargs)
+            ans.extend(i.get_objs(recursive=True, self_included=False, name=name, cont=cont, *args, **kwargs))
 
         only_one_ck(only_one, ans)
         return ans
 
-    def _fit_obj(self, v):
-        n = v.count()
+    def _fit_obj(self, v, n=None, move=False):
+        if n is None:
+            n = v.count()
         ns = self._free_slots(obj=v, recursive=False)
 
         if ns:
             nfitting = min(ns, n)
-            v.set_count(nfitting)
-            ans = self._add_obj(v)
-            v.set_count(n)
-            return ans
-        v.set_count(n)
+            return self._add_obj(v, nfitting, move and nfitting == n)
         return BbwRes()
 
-    def _add_obj(self, v):
+    def _add_obj(self, v, count=None, move=False):
+        """Add count objects like v. With move, v itself is linked if there is no lot with the same name"""
         k = v.name()
+        if count is None:
+            count = v.count()
+
+        delta_capacity = self.get_obj_capacity(self[k] if k in self else v, is_per_obj=True) * count
+        BbwUtils.test_geq("final container capacity", self.free_space() - delta_capacity, 0.0)
 
         if k in self:
-            new_obj = copy.deepcopy(self[k])
-            new_obj.set_count(new_obj.count() + v.count())
-            delta_capacity, delta_count = self.get_obj_capacity(new_obj) - self.get_obj_capacity(self[k]), v.count()
+            self[k].set_count(self[k].count() + count)
+        elif move:
+            if v.count() != count:
+                v.set_count(count)
+            self[k] = v
         else:
-            delta_capacity, delta_count = self.get_obj_capacity(v), v.count()
-            new_obj = copy.deepcopy(v)
+            self[k] = v.copy_obj(count)
 
-        BbwUtils.test_geq("final container capacity", self.free_space() - delta_capacity, 0.0)
+        return BbwRes(count=count, objs=[(self[k], self)])
 
-        self[k] = new_obj
+    def copy_obj(self, count=None):
+        """Independent copy, children included. Needed only when a lot is split"""
+        ans = copy.deepcopy(self)
+        if count is not None:
+            ans.set_count(count)
+        return ans
 
-        return BbwRes(count=delta_count, objs=[(self[k], self)])
+    def view_obj(self):
+        """Shallow copy that shares the children with self. Read only: it is meant for printing
+
+        The children are put in with dict.update so that they still belong to self
+        """
+        ans = type(self).__new__(type(self))
+        ans.__dict__.update(self.__dict__)
+        dict.update(ans, self)
+        return ans
 
     def set_attr(self, v: str, *args, **kwargs):
         if v == "name":
@@ -279,6 +626,7 @@ def _header(detail_lvl: int = 0):
     def _str_table(self, detail_lvl: int = 0):
         return [self.count(), self.name(), self.status(), self.n_objs(), self.info()]
 
+    @BbwObjCache.render_cache_decor
     def __str__(self, detail_lvl: int = 0, lsort=lambda x: x.name(), lname=None):
         s = ""
         if detail_lvl > 0:
@@ -298,7 +646,7 @@ def __str__(self, detail_lvl: int = 0, lsort=lambda x: x.name(), lname=None):
         )
         h = type(list(self.values())[maxIndex])._header(detail_lvl=entry_detail_lvl)
 
-        t = sorted(BbwUtils.get_objs(raw_list=self.values(), name=lname), key=lsort)
+        t = sorted(self._get_children_by_name(name=lname), key=lsort)
 
         t = [i._str_table(detail_lvl=entry_detail_lvl) for i in t]
 
@@ -306,24 +654,58 @@ def __str__(self, detail_lvl: int = 0, lsort=lambda x: x.name(), lname=None):
         return s
 
 
+class BbwPart:
+    """Part of the session data that is not a BbwObj (company, ledger, calendar, log)
+
+    Its changes are tracked as the ones of a BbwObj: the methods that change it call _will_change before and _touch
+    after. Its cache has no parent: only version and on_change are used
+    """
+
+    def _cache(self):
+        return BbwObj._cache(self)
+
+    def _will_change(self, k=None):
+        BbwObj._will_change(self, k)
+
+    def _touch(self):
+        BbwObj._touch(self)
+
+    def _version(self):
+        return self._cache().version
+
+
 @BbwUtils.for_all_methods(BbwUtils.type_sanitizer_decor)
 class BbwRes:
     """Count is a separate member because we can add to an item that is already there. Getting the count from that would give the total count of the items, not the delta
+
+    + and += give a new result: the results that are handed out never change. A function that collects many results
+    extends its own with extend, so that collecting n results costs O(n)
     """
 
     def __init__(self, count=0, objs=[]):
         self.set_count(count)
         if type(objs) is tuple:
             objs = [objs]
-        self._objs = objs
+        self._objs = list(objs)
 
-    def __add__(self, o):
+    @staticmethod
+    def _ck_type(o):
         if type(o) is not BbwRes:
             raise InvalidArgument(f"The obj `{o}` must be of type BbwRes!")
+
+    def __add__(self, o):
+        BbwRes._ck_type(o)
         count = self.count() + o.count()
         objs = [*self.objs(), *o.objs()]
         return BbwRes(count=count, objs=objs)
 
+    def extend(self, o):
+        """Add o to this result in place. Only for a result that was not handed out yet. Return self"""
+        BbwRes._ck_type(o)
+        self._count = self.count() + o.count()
+        self._objs.extend(o.objs())
+        return self
+
     def set_count(self, v: int = 0):
         BbwUtils.test_geq("count", v, 0)
         self._count = v
@@ -370,7 +752,7 @@ def __str__(self, detail_lvl: int = 0):
         if detail_lvl == 1 and len(self) > 1:
             o = BbwObj("Results", capacity="inf", size=0)
             for i in self:
-                o.dist_obj(i)
+                o.move_obj(i.view_obj())
 
             s += o.__str__(detail_lvl=1)
 
@@ -5,7 +5,7 @@
 
 
 @BbwUtils.for_all_methods(BbwUtils.type_sanitizer_decor)
-class BbwCalendar:
+class BbwCalendar(BbwPart):
     _days_in_week = 7
     _days_in_month = 28
     _days_in_year = 365
@@ -15,7 +15,9 @@ def __init__(self, t: int = 0):
         self.set_t(t)
 
     def set_t(self, v):
+        self._will_change()
         self._t = v
+        self._touch()
 
     def set_date(self, day: int, year: int):
         self.set_t(BbwCalendar.date2t(day, year))
@@ -83,6 +85,21 @@ def date2t(day, year):
         year = int(year)
         return year * BbwCalendar._days_in_year + day - 1
 
+    @staticmethod
+    def month_starts(t, ndays):
+        """Times in (t, t + ndays] when a new month starts. There are as many as add_t(ndays) returns"""
+        t, ndays = int(t), int(ndays)
+        # the holiday (day 1) is in month 1 with the first 28 days after it
+        days = [0, *range(29, BbwCalendar._days_in_year - 1, BbwCalendar._days_in_month)]
+        ans = []
+        for year in range(t // BbwCalendar._days_in_year, (t + ndays) // BbwCalendar._days_in_year + 1):
+            ans.extend(
+                year * BbwCalendar._days_in_year + i
+                for i in days
+                if t < year * BbwCalendar._days_in_year + i <= t + ndays
+            )
+        return ans
+
     def __str__(self, detail_lvl=0):
         s = f"date: {self.date()}\n"
         if detail_lvl == 0:
@@ -1,4 +1,6 @@
+import asyncio
 import os
+import shutil
 import time
 
 from discord.ext import commands
@@ -6,8 +8,13 @@
 import itertools
 
 from cogst5.company import *
+from cogst5.journal import BbwJournal
 from cogst5.library import Library
+from cogst5.output import BbwOutput
+from cogst5.route import BbwRoute
+from cogst5.sector import BbwSector
 from cogst5.session_data import BbwSessionData
+from cogst5.session_manager import BbwSessionManager
 from cogst5.trade import *
 from cogst5.vehicle import *
 from cogst5.wishlist import *
@@ -24,15 +31,28 @@ def __init__(self, bot):
     def __init__(self, bot):
         self.bot = bot
         self.library = Library()
-        self.session_data = BbwSessionData()
+        save_path = "../../" if os.getcwd() == "/home/bambleweeny" else ""
+        self.sessions = BbwSessionManager(f"{save_path}save/")
+
+    @property
+    def session_data(self):
+        """Session data of the campaign of the channel of the running command"""
+        return self.sessions.campaign().session_data
+
+    @session_data.setter
+    def session_data(self, v):
+        self.sessions.campaign().session_data = v
+
+    @property
+    def journal(self):
+        return self.sessions.campaign().journal
 
     def save_path(self, filename: str, with_timestamp: bool = False):
         """Save status to file ana backup with date"""
-        save_path = "../../" if os.getcwd() == "/home/bambleweeny" else ""
         if not filename.endswith(".json"):
             filename += ".json"
 
-        s = f"{save_path}save/{filename}"
+        s = f"{self.sessions.campaign_dir()}{filename}"
         if not with_timestamp:
             return s
         ts = time.gmtime()
@@ -46,20 +66,16 @@ def save_path(self, filename: str, with_timestamp: bool = False):
     async def send(self, ctx, msg: str):
         """Send message in chat
 
-        Split long ones to workaround the discord limit
+        Split long ones to workaround the discord limit. During a command the messages are collected and sent together
+        at the end (see BbwOutput)
         """
 
         if type(msg) is not str:
             msg = msg.__str__()
         msg = BbwUtils._msg_divisor + msg
 
-        # with open(f"save/debug.txt", "w") as f:
-        #     f.write(msg)
-
-        for idx, i in enumerate(BbwUtils.split_md_compatible(msg)):
-            # with open(f"save/debug{idx}.txt", "w") as f:
-            #     f.write(msg)
-            await ctx.send(i)
+        if not BbwOutput.write(msg):
+            await BbwOutput.send(ctx, [msg])
 
     # ==== commands ====
     @commands.command(name="library_data", aliases=["library", "lib", "l"])
@@ -77,29 +93,64 @@ async def query_library(self, ctx, *args):
     ### load/save
     ##################################################
 
+    async def cog_before_invoke(self, ctx):
+        """Every channel has its own campaign. The output is sent at the end"""
+        BbwSessionManager.set_current(ctx.guild.id if ctx.guild is not None else None, ctx.channel.id)
+        BbwOutput.begin()
+        await self.sessions.acquire(name=ctx.message.content)
+
+    async def cog_after_invoke(self, ctx):
+        """Journal what the command changed. Compact in background once in a while. Send the output"""
+        try:
+            self.sessions.release()
+        finally:
+            await BbwOutput.flush(ctx)
+
+    def cog_unload(self):
+        asyncio.create_task(self.sessions.flush())
+
+    async def compact_session_data(self, backup_path: str = None):
+        """Write a snapshot and drop the journal. The file is written in a separate thread"""
+        await self.sessions.compact(self.sessions.campaign(), backup_path=backup_path)
+
     @commands.command(name="save")
     async def save_session_data(self, ctx, filename: str = "session_data"):
-        """Save session data to a file in JSON format"""
+        """Save session data to a file in JSON format
 
-        enc_data = jsonpickle.encode(self.session_data)
-        p = self.save_path(filename)
-        with open(p, "w") as f:
-            json.dump(json.loads(enc_data), f, indent=2)
+        Every command is journaled and compacted automatically in the campaign of the channel anyway. Use this for
+        backups and copies
+        """
 
+        p = self.save_path(filename)
         p_backup = self.save_path(filename, True)
-        with open(p_backup, "w") as f:
-            json.dump(json.loads(enc_data), f, indent=2)
+        await self.compact_session_data(backup_path=p_backup)
+        if p != self.journal.path():
+            shutil.copyfile(p_backup, p)
 
         await self.send(ctx, f"Session data saved as: {p}. Backup in: {p_backup}")
 
     @commands.command(name="load", aliases=["Load"])
     async def load_session_data(self, ctx, filename: str = "session_data.json"):
-        """Load session data from a JSON-formatted file"""
+        """Load session data from a JSON-formatted file
+
+        The journal of the commands issued after the last save is replayed on top of it. Files that are not in the
+        directory of the campaign of the channel are looked for in the main save directory
+        """
 
         p = self.save_path(filename)
-        with open(p, "r") as f:
-            enc_data = json.dumps(json.load(f))
-            self.session_data = jsonpickle.decode(enc_data)
+        if not os.path.exists(p):
+            p = f"{self.sessions.root()}{os.path.basename(p)}"
+
+        c = self.sessions.campaign()
+        async with c.lock:
+            if p == c.journal.path():
+                c.load()
+            else:
+                c.session_data = BbwJournal(p).load()
+                c.journal.sync(c.session_data)
+                c.set_log_archive()
+        if p != c.journal.path():
+            await self.compact_session_data()
 
         await self.send(ctx, f"Session data loaded from {p}.")
 
@@ -107,7 +158,35 @@ async def load_session_data(self, ctx, filename: str = "session_data.json"):
     async def get_session_data(self, ctx):
         """Send session_data.json in the chat"""
 
-        await ctx.send(file=discord.File(self.save_path("session_data.json")))
+        await self.compact_session_data()
+        await ctx.send(file=discord.File(self.journal.path()))
+
+    @commands.command(name="undo", aliases=[])
+    async def undo(self, ctx, n: int = 1):
+        """Undo the last n commands that changed something in the campaign of the channel
+
+        Only what they changed is restored. The history is lost when the bot restarts or a save is loaded
+        """
+        c = self.sessions.campaign()
+        names = c.history.undo(c.session_data, n)
+        if not len(names):
+            await self.send(ctx, "Nothing to undo!")
+            return
+
+        all_names = "\n • ".join(f"`{i}`" for i in names)
+        await self.send(ctx, f"Undone:\n • {all_names}")
+
+    @commands.command(name="redo", aliases=[])
+    async def redo(self, ctx, n: int = 1):
+        """Redo the last n undone commands. Any other command that changes something drops them"""
+        c = self.sessions.campaign()
+        names = c.history.redo(c.session_data, n)
+        if not len(names):
+            await self.send(ctx, "Nothing to redo!")
+            return
+
+        all_names = "\n • ".join(f"`{i}`" for i in names)
+        await self.send(ctx, f"Redone:\n • {all_names}")
 
     ##################################################
     ### trade
@@ -216,9 +295,59 @@ def nd_tpl(item):
                 ctx,
                 mail_value,
                 f"mail ({n_canisters} canisters)",
+                kind="mail",
             )
         await self.send(ctx, s)
 
+    @commands.command(name="expected_passengers", aliases=["passengers_report"])
+    async def expected_passengers(self, ctx, carouse_or_broker_or_streetwise_mod: int, SOC_mod: int, w_to_name: str):
+        """Exact statistics of load_passengers (no rolls)
+
+        It assumes that all the passengers can embark"""
+        cs = self.session_data.get_ship_curr()
+        w0, w1 = self.session_data.get_worlds(w_to_name=w_to_name)
+
+        h, t = BbwTrade.expected_passengers(cs, carouse_or_broker_or_streetwise_mod, SOC_mod, w0, w1)
+        s = f"expected passengers from `{w0.name()}` to `{w1.name()}`:\n"
+        s += BbwUtils.print_table(t, headers=h, detail_lvl=1)
+        await self.send(ctx, s)
+
+    @commands.command(name="expected_mail_and_freight", aliases=["mail_and_freight_report"])
+    async def expected_mail_and_freight(self, ctx, broker_or_streetwise_mod: int, SOC_mod: int, w_to_name: str):
+        """Exact statistics of find_mail_and_freight (no rolls)
+
+        It assumes that everything can be loaded. Count: canisters for mail, lots for freight"""
+        cs = self.session_data.get_ship_curr()
+        w0, w1 = self.session_data.get_worlds(w_to_name=w_to_name)
+
+        h, t = BbwTrade.expected_mail_and_freight(cs, broker_or_streetwise_mod, SOC_mod, w0, w1)
+        s = f"expected mail and freight from `{w0.name()}` to `{w1.name()}`:\n"
+        s += BbwUtils.print_table(t, headers=h, detail_lvl=1)
+        await self.send(ctx, s)
+
+    @commands.command(name="trade_scan", aliases=["scan_trade", "best_destinations"])
+    async def trade_scan(
+        self, ctx, carouse_or_broker_or_streetwise_mod: int = 0, SOC_mod: int = 0, n_jumps: int = 1, w_from_name=None
+    ):
+        """Rank the worlds within n_jumps by expected profit per day (no rolls)
+
+        Speculative goods, passengers, mail and freight minus fuel and docking fee. No w_from_name inserted means that
+        we move from current planet"""
+        cs = self.session_data.get_ship_curr()
+        w0 = self.session_data.get_world(w_from_name)
+
+        h, t = BbwTrade.trade_scan(
+            cs,
+            w0,
+            self.session_data.charted_space(),
+            carouse_or_broker_or_streetwise_mod,
+            SOC_mod,
+            n_jumps=n_jumps,
+        )
+        s = f"expected profit from `{w0.name()}`:\n"
+        s += BbwUtils.print_table(t, headers=h, detail_lvl=1)
+        await self.send(ctx, s)
+
     @commands.command(name="load_ship", aliases=[])
     async def load_ship(
         self,
@@ -227,19 +356,73 @@ async def load_ship(
         brocker_or_streetwise_mod: int,
         SOC_mod: int,
         w_to_name: str,
+        preview: bool = False,
     ):
-        """Fill the ship with freight, mail and passengers"""
+        """Fill the ship with the freight, mail and passengers that pay more
 
-        # load passengers
-        await self.load_passengers(ctx, carouse_or_broker_or_streetwise_mod, SOC_mod, w_to_name)
+        All the offers are rolled and then the best combination that fits in the staterooms, lowberths and cargo is
+        loaded. preview: show the plan without loading anything. The offers are rolled once per ship and destination:
+        the plan of a preview is the one that the next load_ship loads. A travel drops them"""
+        cs = self.session_data.get_ship_curr()
+        w0, w1 = self.session_data.get_worlds(w_to_name=w_to_name)
+        n_sectors = BbwWorld.distance(w0, w1)
 
-        # load mail and freight
-        await self.find_mail_and_freight(
-            ctx,
-            brocker_or_streetwise_mod,
-            SOC_mod,
-            w_to_name,
-        )
+        campaign = self.sessions.campaign()
+        k = (cs.name(), w0.name(), w1.name())
+        if campaign.offers is not None and campaign.offers[0] == k:
+            offers = campaign.offers[1]
+        else:
+            offers = []
+            for i in ["high", "middle", "basic", "low"]:
+                person, _ = BbwTrade.find_passengers(cs, carouse_or_broker_or_streetwise_mod, SOC_mod, i, w0, w1)
+                offers.append((i, person))
+
+            item, _, _ = BbwTrade.find_mail(cs, brocker_or_streetwise_mod, SOC_mod, w0, w1)
+            offers.append(("mail", item))
+            for i in ["major", "minor", "incidental"]:
+                item, _ = BbwTrade.find_freight(brocker_or_streetwise_mod, SOC_mod, i, w0, w1)
+                offers.append((i, item))
+        campaign.offers = (k, offers) if preview else None
+
+        plan = BbwTrade.plan_cargo(cs, offers)
+        h, t = BbwTrade.plan_cargo_table(plan)
+        s = f"loading plan from `{w0.name()}` to `{w1.name()}`:\n{BbwUtils.print_table(t, headers=h, detail_lvl=1)}\n"
+        if preview:
+            await self.send(ctx, s)
+            return
+        if not any(n for _, _, n, _ in plan):
+            await self.send(ctx, f"{s}nothing to load!")
+            return
+
+        loaded = []
+        mail_value, n_canisters = 0, 0
+        for kind, obj, n, income in plan:
+            if n == 0:
+                loaded.append((kind, obj, 0, 0))
+                continue
+            if kind in ["high", "middle", "basic", "low"]:
+                res = await self.add_person(ctx, name=kind, count=n, n_sectors=n_sectors, mute=True)
+            else:
+                res = await self.add_item(
+                    ctx,
+                    name=kind,
+                    count=n,
+                    capacity=obj.capacity(is_per_obj=True),
+                    value=obj.value(is_per_obj=True),
+                    n_sectors=n_sectors,
+                    unbreakable=True,
+                    mute=True,
+                )
+                if kind == "mail" and res.count():
+                    mail_value, n_canisters = res.value(), res.count()
+            loaded.append((kind, obj, res.count(), income * res.count() / n))
+
+        h, t = BbwTrade.plan_cargo_table(loaded)
+        self.session_data.add_log_entry(f"load ship: {', '.join(f'{i[0]} {i[2]}' for i in t[:-1])}")
+        s = f"loaded from `{w0.name()}` to `{w1.name()}`:\n{BbwUtils.print_table(t, headers=h, detail_lvl=1)}\n"
+        await self.send(ctx, s)
+        if mail_value:
+            await self.money(ctx, mail_value, f"mail ({n_canisters} canisters)", kind="mail")
 
     @commands.command(name="unload_passengers", aliases=[])
     async def unload_passengers(self, ctx):
@@ -253,7 +436,7 @@ async def unload_passengers(self, ctx):
         await self.del_obj(ctx, name="luggage, high", mute=True)
         await self.del_obj(ctx, name="luggage, middle", mute=True)
 
-        await self.money(ctx, value=int(tot), description="passenger tickets")
+        await self.money(ctx, value=int(tot), description="passenger tickets", kind="passengers")
 
     @commands.command(name="unload_mail", aliases=[])
     async def unload_mail(self, ctx):
@@ -274,7 +457,7 @@ async def unload_freight(self, ctx):
                 tot += sum([i.value() for i in cs.get_objs(name=i)])
                 await self.del_obj(ctx, name=i, mute=True)
 
-        await self.money(ctx, value=int(tot), description="unload freight")
+        await self.money(ctx, value=int(tot), description="unload freight", kind="freight")
 
     @commands.command(name="unload_ship", aliases=[])
     async def unload(self, ctx):
@@ -408,6 +591,7 @@ async def m_drive(self, ctx, d_km: int = None):
     async def travel_m(self, ctx, d_km: int = None):
         """As drive_m but we really do the trip"""
         t = await self.m_drive(ctx, d_km)
+        self.sessions.campaign().offers = None
         self.session_data.add_log_entry(f"jump m: {BbwUtils.conv_days_2_time(t)}")
         await self.newday(ctx, ndays=t, travel_accounting=True)
 
@@ -431,6 +615,24 @@ async def j_drive(self, ctx, w_to_name: str, w_from_name: str = None):
         err = cs.ck_j_drive(w0, w1)
         await self.send(ctx, err)
 
+    @commands.command(name="route", aliases=["plan_route", "jump_route"])
+    async def route(self, ctx, w_to_name: str, objective: str = "time", w_from_name: str = None):
+        """Plan a multi-jump route with refuels
+
+        objective: time or fuel (costs). No w_from_name inserted means that we move from current planet"""
+        w0, w1 = self.session_data.get_worlds(w_to_name=w_to_name, w_from_name=w_from_name)
+        cs = self.session_data.get_ship_curr()
+
+        legs = BbwRoute.plan(cs, self.session_data.charted_space(), w0, w1, objective=objective)
+        if legs is None:
+            raise InvalidArgument(
+                f"no route from `{w0.name()}` to `{w1.name()}` with j drive `{cs.j_drive()}` and fuel tanks of"
+                f" `{cs.fuel_tank_capacity()}` tons in the charted space!"
+            )
+
+        h, t = BbwRoute.table(legs)
+        await self.send(ctx, BbwUtils.print_table(t, headers=h, detail_lvl=1))
+
     @commands.command(name="jump_j", aliases=["travel_j", "j_jump", "j_travel"])
     async def travel_j(self, ctx, w_to_name: str):
         """As drive_j but we really do the trip"""
@@ -444,6 +646,7 @@ async def travel_j(self, ctx, w_to_name: str):
         n_sectors = BbwWorld.distance(w0, w1)
         rf = BbwSpaceShip.j_drive_required_fuel(n_sectors)
 
+        self.sessions.campaign().offers = None
         self.session_data.add_log_entry(f"jump j: {w0.name()} -> {w1.name()}")
 
         await self.consume_fuel(ctx, rf)
@@ -457,7 +660,7 @@ async def trip_accounting_life_support(self, ctx, t: int):
         """Do the accounting for the life support"""
         cs = self.session_data.get_ship_curr()
         res, life_support_costs = cs.var_life_support(t)
-        await self.money(ctx, value=-life_support_costs, description="variable life support costs")
+        await self.money(ctx, value=-life_support_costs, description="variable life support costs", kind="life support")
 
     @commands.command(name="trip_accounting_payback", aliases=[])
     async def trip_accounting_payback(self, ctx, t: int):
@@ -495,13 +698,13 @@ async def add_fuel(self, ctx, source: str, count: float = float("inf"), value: i
         res, cost = cs.add_fuel(source=source, count=count)
 
         if res.count():
-            t = d20.roll(f"1d6").total / 24
+            t = BbwUtils.roll(f"1d6").total / 24
             await self.send(ctx, f"refueling time is: {BbwUtils.conv_days_2_time(t)}")
 
             if value is None:
                 value = cost
             if value:
-                await self.money(ctx, value=-value, description=res)
+                await self.money(ctx, value=-value, description=res, kind="fuel", tons=res.capacity())
         else:
             await self.send(ctx, f"the tank was full. Nothing to do")
         await self.fuel(ctx)
@@ -535,7 +738,7 @@ async def refine_fuel(self, ctx):
     ### containers
     ##################################################
     @commands.command(name="add_world", aliases=["set_planet", "add_planet"])
-    async def set_world(self, ctx, name: str, uwp: str, zone: str, hex: str, sector=None):
+    async def set_world(self, ctx, name: str, uwp: str, zone: str, hex: str, sector=None, gas_giants: int = 0):
         """Add a world to the galaxy"""
 
         if sector is None:
@@ -546,11 +749,33 @@ async def set_world(self, ctx, name: str, uwp: str, zone: str, hex: str, sector=
                 f"the world: `{name}` exists already! If you really want to replace it, delete it first"
             )
 
-        w = BbwWorld(name=name, uwp=uwp, zone=zone, hex=hex, sector=sector)
+        w = BbwWorld(name=name, uwp=uwp, zone=zone, hex=hex, sector=sector, gas_giants=gas_giants)
         self.session_data.charted_space().dist_obj(w)
 
         await self.send(ctx, f"The world `{name}` was successfully added to the charted space")
 
+    @commands.command(name="import_sector", aliases=["add_sector", "load_sector"])
+    async def import_sector(self, ctx, filename: str, sector_x: int = None, sector_y: int = None):
+        """Add all the worlds of a sector file (T5 tab delimited or T5 column/SEC format) to the galaxy
+
+        The file is looked for in the directory of the campaign, in `sectors/` of the save directory and in the save
+        directory itself. The sector is the one of the current world if not given. Worlds with names already in the
+        charted space are skipped"""
+
+        sector = (sector_x, sector_y)
+        if sector_x is None or sector_y is None:
+            sector = self.session_data.get_world().sector()
+
+        dirs = [self.sessions.campaign_dir(), f"{self.sessions.root()}sectors/", self.sessions.root()]
+        path = BbwSector.find_file(filename, dirs)
+        res, skipped = BbwSector.import_sector_file(self.session_data.charted_space(), path, sector)
+
+        s = f"`{len(res)}` worlds were successfully added to the charted space"
+        if len(skipped):
+            s += f"\n`{len(skipped)}` skipped:\n"
+            s += BbwUtils.print_table([list(i) for i in skipped], headers=["name", "reason"], detail_lvl=1)
+        await self.send(ctx, s)
+
     @commands.command(name="del_world", aliases=["del_planet"])
     async def del_world(self, ctx, name: str):
         """Del world"""
@@ -589,10 +814,20 @@ async def set_world_curr(self, ctx, name: str):
         self.session_data.add_log_entry(f"set world curr: {self.session_data.world_curr()}")
 
     @commands.command(name="charted_space", aliases=["galaxy"])
-    async def charted_space(self, ctx):
-        """charted space summary"""
+    async def charted_space(self, ctx, n_parsecs: int = None):
+        """charted space summary
 
-        await self.send(ctx, self.session_data.charted_space().__str__(detail_lvl=1))
+        With n_parsecs only the worlds within n_parsecs from the current world are listed, closest first"""
+
+        if n_parsecs is None:
+            await self.send(ctx, self.session_data.charted_space().__str__(detail_lvl=1))
+            return
+
+        w = self.session_data.get_world()
+        l = BbwHexIndex.of(self.session_data.charted_space()).worlds_within(w, n_parsecs)
+        h = ["name", "uwp", "zone", "hex", "sector", "parsecs"]
+        t = [[i.name(), i.uwp(), i.zone(), i.hex(), str(i.sector()), d] for i, d in l]
+        await self.send(ctx, BbwUtils.print_table(t, headers=h, detail_lvl=1))
 
     @commands.command(name="set_world_attr", aliases=["set_world_curr_attr", "set_planet_curr_attr"])
     async def set_world_attr(self, ctx, attr_name: str, *args):
@@ -644,14 +879,29 @@ async def get_objs(self, ctx, name: str = "", detail_lvl: int = 1, cont: str = N
         await self._container(ctx, detail_lvl, c)
 
     @commands.command(name="log", aliases=["ll"])
-    async def get_log(self, ctx, log_lines: int = 10, name: str = "", transactions: int = 0):
+    async def get_log(
+        self,
+        ctx,
+        log_lines: int = 10,
+        name: str = "",
+        transactions: int = 0,
+        from_day: int = None,
+        from_year: int = None,
+    ):
         """Return the ship's log
 
         log_lines: number of lines displayed
         name: filter the log with a matching name
         transactions: 0 -> all, 1-> only transactions, 2-> no transactions
+        from_day, from_year: only the entries from this date on
+
+        The whole history of the campaign is searched
         """
-        await self.send(ctx, self.session_data.log().__str__(log_lines=log_lines, name=name, transactions=transactions))
+        t_min = BbwCalendar.date2t(from_day, from_year)
+        await self.send(
+            ctx,
+            self.session_data.log().__str__(log_lines=log_lines, name=name, transactions=transactions, t_min=t_min),
+        )
 
     async def _max_skill_rank_stat(self, ctx, skill, v, l):
         if not len(l):
@@ -663,26 +913,22 @@ async def _max_skill_rank_stat(self, ctx, skill, v, l):
     async def max_stat(self, ctx, stat: str):
         """Get the max of the stat among the crew"""
         cs = self.session_data.get_ship_curr()
-        l = cs.get_objs("crew")
-
         stat = stat.upper()
-        v, l = BbwPerson.max_stat(l, stat=stat)
+        v, l = cs.crew_profile().max_stat(stat)
         await self._max_skill_rank_stat(ctx, stat, v[0][0], l)
 
     @commands.command(name="max_skill", aliases=[])
     async def max_skill(self, ctx, skill: str):
         """Get the max of the skill among the crew"""
         cs = self.session_data.get_ship_curr()
-        l = cs.get_objs("crew")
-        v, l = BbwPerson.max_skill(l, skill=skill)
+        v, l = cs.crew_profile().max_skill(skill)
         await self._max_skill_rank_stat(ctx, v[0], v[1], l)
 
     @commands.command(name="max_rank", aliases=[])
     async def max_rank(self, ctx, rank: str):
         """Get the max of the rank among the crew"""
         cs = self.session_data.get_ship_curr()
-        l = cs.get_objs("crew")
-        v, l = BbwPerson.max_rank(l, rank=rank)
+        v, l = cs.crew_profile().max_rank(rank)
         await self._max_skill_rank_stat(ctx, v[0], v[1], l)
 
     @commands.command(name="check", aliases=["skill_check", "ck"])
@@ -883,13 +1129,14 @@ async def move(
         res_to_tot = BbwRes()
 
         for i, _ in res_from.objs():
-            res_to = cs.dist_obj(i, cont=cont_to)
+            n = i.count()
+            res_to = cs.move_obj(i, cont=cont_to)
             if not mute:
                 await self._send_add_res(ctx, res_to, count)
 
-            if i.count() > res_to.count():
-                i.set_count(i.count() - res_to.count())
-                res_to = cs.dist_obj(i, cont=cont_from)
+            if n > res_to.count():
+                i.set_count(n - res_to.count())
+                res_to = cs.move_obj(i, cont=cont_from)
                 if not mute:
                     await self._send_add_res(ctx, res_to, count)
             res_to_tot += res_to
@@ -908,12 +1155,12 @@ async def move_vip(self, ctx, name: str, world_to: str = None, world_from: str =
         if world_from is None:
             from_c = cs
         else:
-            from_c = self.session_data.charted_space().get_objs(name=world_from, only_one=True)[0].people()
+            from_c = self.session_data.get_world(world_from).people()
 
         if world_to is None:
             to_c = self.session_data.get_world().people()
         else:
-            to_c = self.session_data.charted_space().get_objs(name=world_to, only_one=True)[0].people()
+            to_c = self.session_data.get_world(world_to).people()
 
         res = from_c.del_obj(name=name, type0=BbwPerson)
         if res.count() == 0:
@@ -922,7 +1169,7 @@ async def move_vip(self, ctx, name: str, world_to: str = None, world_from: str =
 
         for i, _ in res.objs():
             with_any_tags_p = {"lowberth", "people"} if BbwUtils.has_any_tags(i, "low") else {"stateroom", "people"}
-            res_to = to_c.dist_obj(i, with_any_tags=with_any_tags_p)
+            res_to = to_c.move_obj(i, with_any_tags=with_any_tags_p)
             await self._send_add_res(ctx, res_to, res_to.count())
 
         if res.count() == 0:
@@ -962,10 +1209,10 @@ async def newday(self, ctx, ndays: int = 1, msg: str = "", travel_accounting: bo
             await self.trip_accounting_life_support(ctx, ndays)
             await self.trip_accounting_payback(ctx, ndays)
 
-        n_months = BbwCalendar(self.session_data.calendar().t()).add_t(ndays)
-
-        for i in range(n_months):
-            await self.close_month(ctx)
+        # the trip accounting already paid the life support
+        await self._close_months(
+            ctx, BbwCalendar.month_starts(self.session_data.calendar().t(), ndays), 0 if travel_accounting else ndays
+        )
 
         self.session_data.calendar().add_t(ndays)
         await self.send(ctx, f"Date advanced by {ndays}d")
@@ -978,10 +1225,22 @@ async def newday(self, ctx, ndays: int = 1, msg: str = "", travel_accounting: bo
     ##################################################
 
     @commands.command(name="cr", aliases=["add_money"])
-    async def money(self, ctx, value: int = 0, description: str = "", is_mute: bool = False):
+    async def money(
+        self,
+        ctx,
+        value: int = 0,
+        description: str = "",
+        is_mute: bool = False,
+        kind: str = "other",
+        name: str = "",
+        tons: float = 0,
+        cost: int = 0,
+    ):
         """Add money/get balance
 
         value == 0 gets balance
+        kind: ledger kind (buy, sell, passengers, freight, mail, salary, debt, fuel, docking, life support, other)
+        name, tons, cost: good, tons and what the sold tons cost (for the ledger, used usually only internally)
         """
 
         if value == 0:
@@ -990,12 +1249,27 @@ async def money(self, ctx, value: int = 0, description: str = "", is_mute: bool
         if type(description) is BbwRes:
             description = f"{description.objs()[0][0].name()} ({description.count()})"
 
-        self.session_data.add_log_entry(description, value)
+        self.session_data.add_log_entry(description, value, kind=kind, name=name, tons=tons, cost=cost)
         msg = f"{description}: `{value}` Cr"
         if not is_mute:
             await self.send(ctx, msg)
         return msg
 
+    @commands.command(name="ledger", aliases=["accounts", "report"])
+    async def ledger(self, ctx, by: str = "month", year: int = None):
+        """Money in and out by kind
+
+        by: month, year or good (profit per ton of what was sold)
+        year: only the months of this year
+        """
+        ledger = self.session_data.company().ledger()
+        if by == "good":
+            h, t = ledger.table_by_good()
+        else:
+            h, t = ledger.table(by=by, year=year)
+
+        await self.send(ctx, BbwUtils.print_table(t, headers=h, detail_lvl=1))
+
     @commands.command(name="debts", aliases=["debt"])
     async def debts(self, ctx):
         """Debts"""
@@ -1074,7 +1348,7 @@ async def pay_docking_fees(self, ctx, value: int = None):
 
         value = cw.docking_fee()
 
-        await self.money(ctx, value=-value, description=f"docking fee")
+        await self.money(ctx, value=-value, description=f"docking fee", kind="docking")
 
     @commands.command(name="pay_salaries", aliases=[])
     async def pay_salaries(self, ctx, print_recap: bool = True):
@@ -1089,10 +1363,37 @@ async def pay_salaries(self, ctx, print_recap: bool = True):
     @commands.command(name="close_month", aliases=[])
     async def close_month(self, ctx):
         """Accounting for the end of the month"""
-        self.session_data.add_log_entry("close month")
-        await self.consume_fuel(ctx, 1)
-        await self.pay_salaries(ctx, False)
-        await self.pay_debts(ctx)
+        await self._close_months(ctx, [self.session_data.calendar().t()])
+
+    async def _close_months(self, ctx, ts, ndays=0):
+        """Accounting for the end of the months at the times ts in one go: 1 ton of fuel, salaries and debts per month.
+        Life support of the next ndays
+
+        One summary message whatever the number of months"""
+        n = len(ts)
+        if n == 0 and ndays <= 0:
+            return
+
+        cs = self.session_data.get_ship_curr()
+        t = []
+        if n:
+            res = cs.consume_fuel(n)
+            self.session_data.add_log_entry(f"close {n} month(s)")
+            t.append(["fuel, refined (tons)", n, res.count()])
+        crew = cs.get_objs(name="crew")
+        company = self.session_data.company()
+        t += company.close_months(
+            crew,
+            self.session_data.log(),
+            self.session_data.calendar().t(),
+            ts,
+            ndays=ndays,
+            life_support=lambda d: cs.var_life_support(d)[1],
+        )
+
+        s = f"closed `{n}` month(s):\n"
+        s += BbwUtils.print_table(t, headers=["", "months", "total"], detail_lvl=1)
+        await self.send(ctx, s)
 
     @commands.command(name="add_gen_obj", aliases=["add_cont"])
     async def add_obj(
@@ -1184,7 +1485,14 @@ async def buy(
         price_payed = int(new_item.value() * price_multi)
         description = f"{new_item.name()} ({new_item.count()})"
         if price_payed != 0:
-            await self.money(ctx, value=-price_payed, description=f"buy: {description}")
+            await self.money(
+                ctx,
+                value=-price_payed,
+                description=f"buy: {description}",
+                kind="buy",
+                name=new_item.name(),
+                tons=new_item.capacity(),
+            )
         else:
             self.session_data.add_log_entry(f"add item: {description}")
 
@@ -1211,7 +1519,15 @@ async def sell(self, ctx, name: str, price_multi: float = 1.0, count: float = fl
         if res.capacity():
             description += f", {int(profit/res.capacity())} Cr per ton"
 
-        await self.money(ctx, value=income, description=description)
+        await self.money(
+            ctx,
+            value=income,
+            description=description,
+            kind="sell",
+            name=", ".join(sorted(set([i.name() for i in res]))),
+            tons=res.capacity(),
+            cost=costs,
+        )
 
     @commands.command(name="buy_spt", aliases=["st_buy", "spt_buy", "buy_st", "stbuy", "buyst", "sptbuy", "buyspt"])
     async def optimize_buy_spt(self, ctx, w_name: str = None, supplier: str = None):
@@ -18,7 +18,8 @@ def set_amount(self, v: int = 0):
         self.set_capacity(v)
 
     def set_capacity(self, v: int = 0):
-        self._capacity = v
+        with self._update_parent():
+            self._capacity = v
         self.set_size()
 
     def set_size(self, v: int = None):
@@ -69,22 +70,133 @@ def _str_table(self, detail_lvl=0):
         ]
 
 
-class BbwCompany:
+class BbwLedger(BbwPart):
+    """Money movements of the company by kind, aggregated by month, by year and, for buy and sell, by good
+
+    Every entry updates the aggregates and the reports are read from them. The single entries stay in the log
+    """
+
+    _kinds = [
+        "buy",
+        "sell",
+        "passengers",
+        "freight",
+        "mail",
+        "salary",
+        "debt",
+        "fuel",
+        "docking",
+        "life support",
+        "other",
+    ]
+
+    def __init__(self):
+        # {period: {kind: [value, tons, n entries]}}. Keys are strings so that they survive jsonpickle
+        self._by_month = {}
+        self._by_year = {}
+        # {good: [tons bought, cost, tons sold, revenue, cost of what was sold]}
+        self._by_good = {}
+
+    @staticmethod
+    def month_key(t):
+        c = BbwCalendar(t)
+        return f"{c.year()}-{c.month():02}"
+
+    @staticmethod
+    def year_key(t):
+        return str(BbwCalendar(t).year())
+
+    @staticmethod
+    def _add(d, k, kind, value, tons):
+        v = d.setdefault(k, {}).setdefault(kind, [0, 0, 0])
+        v[0] += value
+        v[1] += tons
+        v[2] += 1
+
+    def add_entry(self, t, kind, value, name="", tons=0, cost=0):
+        """value: money in (> 0) or out (< 0). For sell: tons sold and what they cost"""
+        kind = BbwUtils.get_objs(raw_list=BbwLedger._kinds, name=kind, only_one=True)[0]
+        t, value, tons, cost = int(t), int(value), float(tons), int(cost)
+
+        self._will_change()
+        BbwLedger._add(self._by_month, BbwLedger.month_key(t), kind, value, tons)
+        BbwLedger._add(self._by_year, BbwLedger.year_key(t), kind, value, tons)
+
+        if kind == "buy" and name:
+            v = self._by_good.setdefault(name, [0, 0, 0, 0, 0])
+            v[0] += tons
+            v[1] -= value
+        if kind == "sell" and name:
+            v = self._by_good.setdefault(name, [0, 0, 0, 0, 0])
+            v[2] += tons
+            v[3] += value
+            v[4] += cost
+        self._touch()
+
+    def total(self, kind=None, year=None, month=None):
+        """Net money of a kind (all kinds if None) in a year, a month or since the beginning"""
+        if month is not None:
+            d = [self._by_month.get(f"{int(year)}-{int(month):02}", {})]
+        elif year is not None:
+            d = [self._by_year.get(str(int(year)), {})]
+        else:
+            d = self._by_year.values()
+
+        if kind is not None:
+            kind = BbwUtils.get_objs(raw_list=BbwLedger._kinds, name=kind, only_one=True)[0]
+
+        return sum(v[0] for i in d for k, v in i.items() if kind is None or k == kind)
+
+    def table(self, by="month", year=None):
+        """Net money by kind (columns) and month or year (rows)"""
+        by = BbwUtils.get_objs(raw_list=["month", "year"], name=by, only_one=True)[0]
+        d = self._by_month if by == "month" else self._by_year
+        periods = sorted(k for k in d if year is None or by == "year" or k.split("-")[0] == str(int(year)))
+
+        kinds = [i for i in BbwLedger._kinds if any(i in d[k] for k in periods)]
+        t = [[k, *[d[k].get(i, [0])[0] for i in kinds], sum(v[0] for v in d[k].values())] for k in periods]
+        return [by, *kinds, "net"], t
+
+    def table_by_good(self):
+        h = ["good", "tons\nbought", "cost", "tons\nsold", "revenue", "profit", "profit/\nton"]
+        t = []
+        for k in sorted(self._by_good):
+            tons_bought, cost, tons_sold, revenue, cost_sold = self._by_good[k]
+            profit = revenue - cost_sold
+            t.append([k, tons_bought, cost, tons_sold, revenue, profit, round(profit / tons_sold) if tons_sold else ""])
+        return h, t
+
+
+class BbwCompany(BbwPart):
     def __init__(self):
         self._money = 0
         self._debts = BbwObj(name="debts", capacity="inf", size=0)
+        self._ledger = BbwLedger()
 
     def debts(self):
         return self._debts
 
+    def ledger(self):
+        if not hasattr(self, "_ledger"):
+            self._ledger = BbwLedger()
+        return self._ledger
+
+    def _version(self):
+        """The ledger and the debts are part of the company"""
+        return max(self._cache().version, self.ledger()._version(), self.debts()._version())
+
     def _pay_debt(self, log, curr_t, name):
         debt = self.debts().get_objs(name=name, only_one=True)[0]
 
         log.add_entry(f"debt: {debt.name()}", curr_t, debt.capacity())
+        self.ledger().add_entry(curr_t, "debt", debt.capacity(), name=debt.name())
+        self._next_instalment(debt)
 
+    def _next_instalment(self, debt):
+        """Move the due date to the next instalment or delete the debt if it is over. Return if it is still there"""
         if not debt.period():
             self.debts().del_obj(name=debt.name())
-            return
+            return False
 
         due_t = debt.due_t()
         new_due_t = due_t + debt.period()
@@ -92,9 +204,10 @@ def _pay_debt(self, log, curr_t, name):
 
         if debt.end_t() and new_due_t >= debt.end_t():
             self.debts().del_obj(name=debt.name())
-            return
+            return False
 
         debt.set_due_t(new_due_t)
+        return True
 
     def pay_debts(self, log, curr_t, name=None):
         if name is None:
@@ -104,29 +217,80 @@ def pay_debts(self, log, curr_t, name=None):
         for i in debts:
             self._pay_debt(log, curr_t, i)
 
-    def pay_salaries(self, crew, log, time):
-        tot = 0
-
-        for i in crew:
-            tot += i.salary_ticket()
-
+    @staticmethod
+    def _salaries(crew):
         no_reinvest_crew = [i for i in crew if not i.reinvest()]
-        tot_not_reinvested = 0
-        for i in no_reinvest_crew:
-            tot_not_reinvested += i.salary_ticket()
+        return sum(i.salary_ticket() for i in crew), sum(i.salary_ticket() for i in no_reinvest_crew), no_reinvest_crew
+
+    def pay_salaries(self, crew, log, time):
+        tot, tot_not_reinvested, no_reinvest_crew = BbwCompany._salaries(crew)
 
         log.add_entry(f"salaries for the crew", time, tot)
+        self.ledger().add_entry(time, "salary", tot)
         if tot_not_reinvested:
             crew_line = "\n".join([i.name() for i in no_reinvest_crew])
             log.add_entry(f"safeguard salaries for:\n{crew_line}", time, -tot_not_reinvested)
 
+    def pay_life_support(self, log, time, cost):
+        log.add_entry("life support", time, -cost)
+        self.ledger().add_entry(time, "life support", -cost)
+
+    def close_months(self, crew, log, curr_t, ts, ndays=0, life_support=None):
+        """Salaries and debts of the month closures at the times ts and life support of ndays from curr_t in one pass
+
+        As pay_salaries and pay_debts once per closure and pay_life_support once per month of the interval, but the log
+        gets one entry per kind (at curr_t) and the ledger one per kind and month. life_support: cost of n days (see
+        BbwSpaceShip.var_life_support). Return [[what, n months, amount]] for the summary
+        """
+        ans = []
+        if ndays > 0 and life_support is not None:
+            # days of every month of the interval: full months cost the same
+            days = [t1 - t0 for t0, t1 in zip([curr_t, *ts], [*ts, curr_t + ndays]) if t1 > t0]
+            costs = {d: life_support(d) for d in set(days)}
+            t = curr_t
+            for d in days:
+                self.ledger().add_entry(t, "life support", -costs[d])
+                t += d
+            tot = sum(costs[d] for d in days)
+            log.add_entry(f"life support ({ndays} days)", curr_t, -tot)
+            ans.append(["life support", len(days), -tot])
+
+        n = len(ts)
+        if n == 0:
+            return ans
+
+        tot, tot_not_reinvested, no_reinvest_crew = BbwCompany._salaries(crew)
+        log.add_entry(f"salaries for the crew ({n} months)", curr_t, tot * n)
+        if tot_not_reinvested:
+            crew_line = "\n".join([i.name() for i in no_reinvest_crew])
+            log.add_entry(f"safeguard salaries ({n} months) for:\n{crew_line}", curr_t, -tot_not_reinvested * n)
+        for t in ts:
+            self.ledger().add_entry(t, "salary", tot)
+        ans.append(["salaries", n, tot * n])
+
+        for name in list(self.debts().keys()):
+            debt = self.debts()[name]
+            amount, n_paid = debt.capacity(), 0
+            for t in ts:
+                self.ledger().add_entry(t, "debt", amount, name=name)
+                n_paid += 1
+                if not self._next_instalment(debt):
+                    break
+
+            log.add_entry(f"debt: {name} ({n_paid} instalments)", curr_t, amount * n_paid)
+            ans.append([f"debt: {name}", n_paid, amount * n_paid])
+
+        return ans
+
     def money(self):
         return self._money
 
     def set_money(self, v):
         v = int(v)
         BbwUtils.test_geq("money", v, 0)
+        self._will_change()
         self._money = v
+        self._touch()
 
     def add_money(self, value):
         value = int(value)
@@ -14,8 +14,9 @@
 # from utils.argparser import argparse
 # from utils.constants import SKILL_NAMES
 # from utils.dice import PersistentRollContext, VerboseMDStringifier
-from utils.dice import VerboseMDStringifier
+from utils.dice import PersistentRollContext, VerboseMDStringifier
 from utils.functions import search_and_select, try_delete
+from cogst5.utils import BbwUtils
 from .inline import InlineRoller
 from .utils import string_search_adv
 
@@ -96,7 +97,7 @@ async def roll_cmd(self, ctx, *, dice: str = "1d20"):
 
         dice, adv = string_search_adv(dice)
 
-        res = d20.roll(dice, advantage=adv, allow_comments=True, stringifier=VerboseMDStringifier())
+        res = BbwUtils.roll(dice, advantage=adv, allow_comments=True, stringifier=VerboseMDStringifier())
         out = f"{ctx.author.mention}  :game_die:\n{str(res)}"
         if len(out) > 1999:
             out = f"{ctx.author.mention}  :game_die:\n{str(res)[:100]}...\n**Total**: {res.total}"
@@ -127,16 +128,9 @@ async def _roll_many(ctx, iterations, roll_str, dc=None, adv=None):
             return await ctx.send("Too many or too few iterations.")
         if adv is None:
             adv = d20.AdvType.NONE
-        results = []
-        successes = 0
-        ast = d20.parse(roll_str, allow_comments=True)
-        roller = d20.Roller(context=PersistentRollContext())
-
-        for _ in range(iterations):
-            res = roller.roll(ast, advantage=adv)
-            if dc is not None and res.total >= dc:
-                successes += 1
-            results.append(res)
+        ast = BbwUtils.parse_roll(roll_str, allow_comments=True)
+        results = BbwUtils.roll_many(ast, iterations, advantage=adv, roller=d20.Roller(context=PersistentRollContext()))
+        successes = sum(1 for o in results if dc is not None and o.total >= dc)
 
         if dc is None:
             header = f"Rolling {iterations} iterations..."
@@ -7,6 +7,7 @@
 import utils.settings
 from cogst5.models import embeds
 from cogst5.models.errors import BambleweenyException, InvalidArgument, NoCharacter
+from cogst5.utils import BbwUtils
 from utils import constants
 from utils.aldclient import discord_user_to_dict
 from utils.dice import PersistentRollContext
@@ -110,7 +111,7 @@ async def do_inline_rolls(self, message):
             try:
                 expr, char_comment = await char_replacer.replace(expr)
                 expr, adv = string_search_adv(expr)
-                result = roller.roll(expr, advantage=adv, allow_comments=True)
+                result = BbwUtils.roll(expr, allow_comments=True, advantage=adv, roller=roller)
                 if result.comment:
                     out.append(f"**{result.comment.strip()}**: {result.result}")
                 elif char_comment:
@@ -0,0 +1,105 @@
+import bisect
+import itertools
+import math
+from fractions import Fraction
+
+
+class BbwDist:
+    """Exact discrete distribution: {value: probability}
+
+    Probabilities are Fractions, so means, variances and percentiles are exact (no Monte Carlo noise). Dice are
+    convolved, tables are applied with map and rolls that depend on other rolls (e.g. roll the number of dice given by
+    a table) with bind
+    """
+
+    def __init__(self, d=None):
+        self._d = {0: Fraction(1)} if d is None else d
+
+    @staticmethod
+    def const(v):
+        return BbwDist({v: Fraction(1)})
+
+    @staticmethod
+    def dice(n, sides=6):
+        """n d sides"""
+        n = int(n)
+        if n < 0:
+            return BbwDist.dice(-n, sides) * -1
+
+        ans = BbwDist()
+        die = BbwDist({i: Fraction(1, sides) for i in range(1, sides + 1)})
+        for _ in range(n):
+            ans += die
+        return ans
+
+    def items(self):
+        return sorted(self._d.items())
+
+    def _combine(self, o, f):
+        if type(o) is not BbwDist:
+            return self.map(lambda k: f(k, o))
+
+        ans = {}
+        for (k0, v0), (k1, v1) in itertools.product(self._d.items(), o._d.items()):
+            k = f(k0, k1)
+            ans[k] = ans.get(k, 0) + v0 * v1
+        return BbwDist(ans)
+
+    def __add__(self, o):
+        """Sum of independent variables or shift by a number"""
+        return self._combine(o, lambda a, b: a + b)
+
+    def __radd__(self, o):
+        return self.__add__(o)
+
+    def __sub__(self, o):
+        return self + (o * -1)
+
+    def __mul__(self, o):
+        """Product of independent variables or scaling by a number"""
+        return self._combine(o, lambda a, b: a * b)
+
+    def __rmul__(self, o):
+        return self.__mul__(o)
+
+    def map(self, f):
+        ans = {}
+        for k, v in self._d.items():
+            k = f(k)
+            ans[k] = ans.get(k, 0) + v
+        return BbwDist(ans)
+
+    def bind(self, f):
+        """f(value) -> BbwDist. Compound distribution"""
+        ans = {}
+        for k0, v0 in self._d.items():
+            for k1, v1 in f(k0)._d.items():
+                ans[k1] = ans.get(k1, 0) + v0 * v1
+        return BbwDist(ans)
+
+    def prob(self, f=lambda x: True):
+        return sum((v for k, v in self._d.items() if f(k)), Fraction(0))
+
+    def mean(self):
+        return sum((k * v for k, v in self._d.items()), Fraction(0))
+
+    def var(self):
+        m = self.mean()
+        return sum(((k - m) ** 2 * v for k, v in self._d.items()), Fraction(0))
+
+    def std(self):
+        return math.sqrt(self.var())
+
+    def percentile(self, q):
+        """Smallest value x such that P(X <= x) >= q/100"""
+        l = self.items()
+        cdf = list(itertools.accumulate(v for _, v in l))
+        return l[min(bisect.bisect_left(cdf, Fraction(q) / 100), len(l) - 1)][0]
+
+    def summary(self, percentiles=(10, 50, 90)):
+        """[mean, std, *percentiles] as floats"""
+        return [float(self.mean()), self.std(), *[float(self.percentile(i)) for i in percentiles]]
+
+    def __str__(self):
+        p10, p50, p90 = (self.percentile(i) for i in (10, 50, 90))
+        return f"{float(self.mean()):.2f} ± {self.std():.2f} (10%: {p10}, 50%: {p50}, 90%: {p90})"
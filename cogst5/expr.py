@@ -2,24 +2,39 @@
 
 
 class BbwExpr:
+    """Sum of (description, value) terms
+
+    +, -, += and -= give a new expression: the expressions that are handed out never change. A chain of modifiers is
+    built with extend, so that n modifiers cost O(n)
+    """
+
     def __init__(self, l=[], q=None):
         if q is not None:
             l = [(l, q)]
         self._l = []
         if type(l) is list:
-            self._l = l
+            self._l = list(l)
         else:
-            self._l = (BbwExpr() + l)._l
+            self._l = list(BbwExpr._terms(l))
 
-    def __add__(self, o):
+    @staticmethod
+    def _terms(o):
         if type(o) is BbwExpr:
-            return BbwExpr([*self._l, *o._l])
+            return o._l
         if type(o) is tuple:
-            return BbwExpr([*self._l, o])
+            return [o]
         if type(o) is d20.dice.RollResult:
-            return BbwExpr([*self._l, (o, o.total)])
+            return [(o, o.total)]
         raise ValueError(f"{o} must be of type tuple, BbwExpr or d20.dice.RollResult")
 
+    def __add__(self, o):
+        return BbwExpr([*self._l, *BbwExpr._terms(o)])
+
+    def extend(self, o):
+        """Add o to this expression in place. Only for an expression that was not handed out yet. Return self"""
+        self._l.extend(BbwExpr._terms(o))
+        return self
+
     def __sub__(self, o):
         return self + (o * -1)
 
@@ -0,0 +1,147 @@
+import collections
+import copy
+
+
+class BbwHistory:
+    """Undo/redo of the commands of a campaign
+
+    Ships, worlds, the wishlist, the company, the calendar and the log are copied while a command runs, right before
+    the first change in them (see BbwObj._will_change and BbwPart). The current ship and world are two names: they are
+    kept at the beginning of the command and compared at the end. The old states of the parts that changed are the
+    undo record of the command. Undo swaps them with the parts in the
+    session data: the parts that go out are the redo record. Nothing is copied for what does not change and everything
+    else is shared, so undoing a command costs what it changed. A new command drops the redo records.
+
+    The history is not saved: it is lost when the campaign is dropped from memory
+    """
+
+    _max_size = 50
+    _containers = ["fleet", "charted_space"]
+
+    def __init__(self):
+        self._undo = collections.deque(maxlen=BbwHistory._max_size)
+        self._redo = []
+        self._session_data = None
+        self._name = ""
+        self._before = {}
+        self._curr = None
+
+    def __len__(self):
+        return len(self._undo)
+
+    def n_redo(self):
+        return len(self._redo)
+
+    def names(self):
+        """Names of the commands that can be undone, the most recent last"""
+        return [name for name, _ in self._undo]
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+
+    def is_recording(self):
+        return self._session_data is not None
+
+    def _hooks(self, session_data):
+        """[(object, on_change)]"""
+        company = session_data.subtree(("company",))
+        ans = [
+            (session_data.subtree((k,)), lambda _, k=k: self._will_change((k,)))
+            for k in ["wishlist", "calendar", "log"]
+        ]
+        # the ledger and the debts are part of the company
+        ans.extend((i, lambda _: self._will_change(("company",))) for i in [company, company.ledger(), company.debts()])
+        for k in BbwHistory._containers:
+            ans.append((session_data.subtree((k,)), lambda i, k=k: i is not None and self._will_change((k, i))))
+        return ans
+
+    def begin(self, session_data, name=""):
+        """Record the changes to session_data from now on"""
+        if self.is_recording():
+            self.end()
+
+        self._session_data = session_data
+        self._name = name
+        self._before = {}
+        self._curr = session_data.subtree(("curr",))
+        for c, on_change in self._hooks(session_data):
+            c._cache().on_change = on_change
+
+    def _will_change(self, k):
+        if k in self._before:
+            return
+
+        try:
+            v = self._session_data.subtree(k)
+        except KeyError:
+            self._before[k] = (None, None, None)
+            return
+
+        self._before[k] = (copy.deepcopy(v), v, v._version())
+
+    @staticmethod
+    def _is_changed(session_data, k, before):
+        v0, v, version = before
+        try:
+            v1 = session_data.subtree(k)
+        except KeyError:
+            v1 = None
+
+        if v0 is None or v1 is None:
+            return v0 is not v1
+        return v1 is not v or v1._version() != version
+
+    def end(self, session_data=None):
+        """Stop recording. If something changed the command can be undone. Returns True if something changed
+
+        If the session data was replaced in the meantime (a save was loaded) the history is dropped
+        """
+        if not self.is_recording():
+            return False
+
+        sd, self._session_data = self._session_data, None
+        for c, _ in self._hooks(sd):
+            c._cache().on_change = None
+
+        if session_data is not None and session_data is not sd:
+            self.clear()
+            return False
+
+        record = [(k, v[0]) for k, v in sorted(self._before.items()) if BbwHistory._is_changed(sd, k, v)]
+        self._before = {}
+        if sd.subtree(("curr",)) != self._curr:
+            record.append((("curr",), self._curr))
+
+        if not len(record):
+            return False
+
+        self._undo.append((self._name, record))
+        self._redo.clear()
+        return True
+
+    @staticmethod
+    def _swap(session_data, record):
+        return [(k, session_data.swap_subtree(k, v)) for k, v in record]
+
+    def _move(self, session_data, n, from_stack, to_stack):
+        recording, name = self.is_recording(), self._name
+        self.end(session_data)
+
+        ans = []
+        for _ in range(min(int(n), len(from_stack))):
+            i_name, record = from_stack.pop()
+            to_stack.append((i_name, BbwHistory._swap(session_data, record)))
+            ans.append(i_name)
+
+        if recording:
+            self.begin(session_data, name)
+        return ans
+
+    def undo(self, session_data, n=1):
+        """Undo the last n commands. Returns their names, the most recent first"""
+        return self._move(session_data, n, self._undo, self._redo)
+
+    def redo(self, session_data, n=1):
+        """Redo the last n undone commands. Returns their names"""
+        return self._move(session_data, n, self._redo, self._undo)
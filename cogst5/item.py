@@ -14,7 +14,8 @@ def __init__(self, TL=None, value=None, armour=0, damage: str = "", price_multi:
 
     def set_armour(self, v: int = 0):
         BbwUtils.test_geq("armour", v, 0)
-        self._armour = v
+        with self._update_parent():
+            self._armour = v
 
     def set_armor(self, v: int = 0):
         self.set_armour(v)
@@ -114,64 +115,76 @@ def _header(detail_lvl=0):
 class BbwItemFactory:
     _tickets = [1000, 1600, 2600, 4400, 8500, 32000]
 
-    _lib = [
-        BbwItem(name="luggage, high", capacity=1, count=1, TL=0, value=0),
-        BbwItem(name="luggage, middle", capacity=0.1, count=1, TL=0, value=0),
-        BbwItem(name="mail", capacity=5, count=1, TL=0, value=25000),
-        BbwItem(name="freight, major", capacity=10, count=1, TL=0, value=0),
-        BbwItem(name="freight, minor", capacity=5, count=1, TL=0, value=0),
-        BbwItem(name="freight, incidental", capacity=1, count=1, TL=0, value=0),
-        BbwItem(name="fuel, refined", capacity=1, count=1, TL=0, value=500),
-        BbwItem(name="fuel, unrefined", capacity=1, count=1, TL=0, value=100),
-        BbwItem(name="common electronics, spt", capacity=1, count=1, TL=0, value=20000),
-        BbwItem(name="common industrial goods, spt", capacity=1, count=1, TL=0, value=10000),
-        BbwItem(name="common manufactured goods, spt", capacity=1, count=1, TL=0, value=20000),
-        BbwItem(name="common raw materials, spt", capacity=1, count=1, TL=0, value=5000),
-        BbwItem(name="common consumables, spt", value=500, capacity=1, count=1, TL=0),
-        BbwItem(name="common ore, spt", value=1000, capacity=1, count=1, TL=0),
-        BbwItem(name="advanced electronics, spt", value=100000, capacity=1, count=1, TL=0),
-        BbwItem(name="advanced machine parts, spt", value=75000, capacity=1, count=1, TL=0),
-        BbwItem(name="advanced manufactured goods, spt", value=100000, capacity=1, count=1, TL=0),
-        BbwItem(name="advanced weapons, spt", value=150000, capacity=1, count=1, TL=0),
-        BbwItem(name="advanced vehicles, spt", value=180000, capacity=1, count=1, TL=0),
-        BbwItem(name="biochemicals, spt", value=50000, capacity=1, count=1, TL=0),
-        BbwItem(name="crystals and gems, spt", value=20000, capacity=1, count=1, TL=0),
-        BbwItem(name="cybernetics, spt", value=250000, capacity=1, count=1, TL=0),
-        BbwItem(name="live animals, spt", value=10000, capacity=1, count=1, TL=0),
-        BbwItem(name="luxury consumables, spt", value=20000, capacity=1, count=1, TL=0),
-        BbwItem(name="luxury goods, spt", value=200000, capacity=1, count=1, TL=0),
-        BbwItem(name="medical supplies, spt", value=50000, capacity=1, count=1, TL=0),
-        BbwItem(name="petrochemicals, spt", value=10000, capacity=1, count=1, TL=0),
-        BbwItem(name="pharmaceuticals, spt", value=100000, capacity=1, count=1, TL=0),
-        BbwItem(name="polymers, spt", value=7000, capacity=1, count=1, TL=0),
-        BbwItem(name="precious metals, spt", value=50000, capacity=1, count=1, TL=0),
-        BbwItem(name="radioactives, spt", value=1000000, capacity=1, count=1, TL=0),
-        BbwItem(name="robots, spt", value=400000, capacity=1, count=1, TL=0),
-        BbwItem(name="spices, spt", value=6000, capacity=1, count=1, TL=0),
-        BbwItem(name="textiles, spt", value=3000, capacity=1, count=1, TL=0),
-        BbwItem(name="uncommon ore, spt", value=5000, capacity=1, count=1, TL=0),
-        BbwItem(name="uncommon raw materials, spt", value=20000, capacity=1, count=1, TL=0),
-        BbwItem(name="wood, spt", value=1000, capacity=1, count=1, TL=0),
-        BbwItem(name="vehicles, spt", value=15000, capacity=1, count=1, TL=0),
-        BbwItem(name="biochemicals, illegal, spt", value=50000, capacity=1, count=1, TL=0),
-        BbwItem(name="cybernetics, illegal, spt", value=250000, capacity=1, count=1, TL=0),
-        BbwItem(name="drugs, illegal, spt", value=100000, capacity=1, count=1, TL=0),
-        BbwItem(name="luxuries, illegal, spt", value=50000, capacity=1, count=1, TL=0),
-        BbwItem(name="weapons, illegal, spt", value=150000, capacity=1, count=1, TL=0),
-        BbwItem(name="exotics, illegal, spt", value=1, capacity=1, count=1, TL=0),
-    ]
+    # (name, capacity, value)
+    _lib = None
+    _lib_data = (
+        ("luggage, high", 1, 0),
+        ("luggage, middle", 0.1, 0),
+        ("mail", 5, 25000),
+        ("freight, major", 10, 0),
+        ("freight, minor", 5, 0),
+        ("freight, incidental", 1, 0),
+        ("fuel, refined", 1, 500),
+        ("fuel, unrefined", 1, 100),
+        ("common electronics, spt", 1, 20000),
+        ("common industrial goods, spt", 1, 10000),
+        ("common manufactured goods, spt", 1, 20000),
+        ("common raw materials, spt", 1, 5000),
+        ("common consumables, spt", 1, 500),
+        ("common ore, spt", 1, 1000),
+        ("advanced electronics, spt", 1, 100000),
+        ("advanced machine parts, spt", 1, 75000),
+        ("advanced manufactured goods, spt", 1, 100000),
+        ("advanced weapons, spt", 1, 150000),
+        ("advanced vehicles, spt", 1, 180000),
+        ("biochemicals, spt", 1, 50000),
+        ("crystals and gems, spt", 1, 20000),
+        ("cybernetics, spt", 1, 250000),
+        ("live animals, spt", 1, 10000),
+        ("luxury consumables, spt", 1, 20000),
+        ("luxury goods, spt", 1, 200000),
+        ("medical supplies, spt", 1, 50000),
+        ("petrochemicals, spt", 1, 10000),
+        ("pharmaceuticals, spt", 1, 100000),
+        ("polymers, spt", 1, 7000),
+        ("precious metals, spt", 1, 50000),
+        ("radioactives, spt", 1, 1000000),
+        ("robots, spt", 1, 400000),
+        ("spices, spt", 1, 6000),
+        ("textiles, spt", 1, 3000),
+        ("uncommon ore, spt", 1, 5000),
+        ("uncommon raw materials, spt", 1, 20000),
+        ("wood, spt", 1, 1000),
+        ("vehicles, spt", 1, 15000),
+        ("biochemicals, illegal, spt", 1, 50000),
+        ("cybernetics, illegal, spt", 1, 250000),
+        ("drugs, illegal, spt", 1, 100000),
+        ("luxuries, illegal, spt", 1, 50000),
+        ("weapons, illegal, spt", 1, 150000),
+        ("exotics, illegal, spt", 1, 1),
+    )
+
+    @staticmethod
+    def lib():
+        """Templates of make. Built from _lib_data on first use"""
+        if BbwItemFactory._lib is None:
+            BbwItemFactory._lib = [
+                BbwItem(name=name, capacity=capacity, count=1, TL=0, value=value)
+                for name, capacity, value in BbwItemFactory._lib_data
+            ]
+        return BbwItemFactory._lib
 
     @staticmethod
     def make(name, n_sectors=1, count=None, TL=None, value=None, capacity=None, price_multi=None):
         if count == 0:
             return None
 
-        item = copy.deepcopy(BbwUtils.get_objs(raw_list=BbwItemFactory._lib, name=name, only_one=True)[0])
+        item = copy.deepcopy(BbwUtils.get_objs(raw_list=BbwItemFactory.lib(), name=name, only_one=True)[0])
         if "luggage" in item.name():
             item.set_name(f"{item.name()} (ns: {n_sectors})")
 
         if "freight" in item.name():
-            v = d20.roll("1d6").total * item.capacity(is_per_obj=True)
+            v = BbwUtils.roll("1d6").total * item.capacity(is_per_obj=True)
             item.set_size(0)
             item.set_capacity(v)
             item.set_size(v)
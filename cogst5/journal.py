@@ -0,0 +1,190 @@
+import os
+
+import jsonpickle
+
+from cogst5.base import BbwObj, BbwPart
+
+
+class BbwJournal:
+    """Append-only persistence for the session data
+
+    The snapshot is the usual jsonpickle dump of the whole session data. After every command only the parts of the
+    session data that changed (a ship, a world, the company, ...) are appended to the journal. Loading replays the
+    journal on top of the snapshot. Every record replaces a whole part, so replaying a record twice is harmless.
+
+    A part changed if its version did (see BbwObj._touch and BbwPart): nothing is encoded to find what changed. The
+    current ship and world are two names and are compared as they are.
+
+    Compaction seals the journal (new records go to a fresh one), writes a new snapshot and drops the sealed journal.
+    """
+
+    _max_records = 200
+    _containers = ["fleet", "charted_space"]
+    _parts = [("wishlist",), ("company",), ("calendar",), ("log",), ("curr",)]
+
+    def __init__(self, path):
+        self._path = path
+        self._n_records = 0
+        # what is persisted: {container: (version, {name: stamp})} and {part: stamp}. See _stamp
+        self._seen = {k: (None, {}) for k in BbwJournal._containers}
+        self._stamps = {}
+
+    def path(self):
+        return self._path
+
+    def size(self):
+        """Bytes on disk: snapshot + journals"""
+        paths = [self.path(), self.sealed_path(), self.journal_path()]
+        return sum(os.path.getsize(i) for i in paths if os.path.exists(i))
+
+    def _makedirs(self):
+        d = os.path.dirname(self.path())
+        if d:
+            os.makedirs(d, exist_ok=True)
+
+    def journal_path(self):
+        return f"{os.path.splitext(self.path())[0]}.journal"
+
+    def sealed_path(self):
+        return f"{self.journal_path()}.1"
+
+    def n_records(self):
+        return self._n_records
+
+    def needs_compaction(self):
+        return self.n_records() >= BbwJournal._max_records
+
+    @staticmethod
+    def _stamp(v):
+        """(object, version) or v itself if it has no version (the current ship and world)"""
+        if isinstance(v, (BbwObj, BbwPart)):
+            return v, v._version()
+        return v
+
+    @staticmethod
+    def _is_same(stamp0, stamp1):
+        if type(stamp0) is not tuple or type(stamp1) is not tuple:
+            return stamp0 == stamp1
+        return stamp0[0] is stamp1[0] and stamp0[1] == stamp1[1]
+
+    def sync(self, session_data):
+        """Record what is already persisted"""
+        for k in BbwJournal._containers:
+            c = session_data.subtree((k,))
+            self._seen[k] = (c._cache().version, {i: BbwJournal._stamp(v) for i, v in c.items()})
+        self._stamps = {k: BbwJournal._stamp(session_data.subtree(k)) for k in BbwJournal._parts}
+
+    def deltas(self, session_data):
+        """Records of the parts that changed and of the ones marked dirty (see BbwSessionData.mark_dirty)"""
+        dirty = session_data.pop_dirty()
+        ans = []
+        for k in BbwJournal._containers:
+            c = session_data.subtree((k,))
+            version, seen = self._seen[k]
+            if c._cache().version == version and not any(i[0] == k for i in dirty):
+                continue
+
+            ans.extend({"op": "del", "k": [k, i]} for i in sorted(seen.keys() - c.keys()))
+            stamps = {i: BbwJournal._stamp(v) for i, v in c.items()}
+            changed = [i for i, v in stamps.items() if (k, i) in dirty or not BbwJournal._is_same(seen.get(i), v)]
+            ans.extend({"op": "set", "k": [k, i], "v": c[i]} for i in sorted(changed))
+            self._seen[k] = (c._cache().version, stamps)
+
+        for k in BbwJournal._parts:
+            v = session_data.subtree(k)
+            stamp = BbwJournal._stamp(v)
+            if k in dirty or not BbwJournal._is_same(self._stamps.get(k, None), stamp):
+                ans.append({"op": "set", "k": list(k), "v": v})
+                self._stamps[k] = stamp
+
+        return ans
+
+    def append(self, session_data):
+        """Append the changes since the last call. Returns the number of records written"""
+        records = self.deltas(session_data)
+        if not len(records):
+            return 0
+
+        self._makedirs()
+        with open(self.journal_path(), "a") as f:
+            f.write("".join(f"{jsonpickle.encode(i)}\n" for i in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._n_records += len(records)
+        return len(records)
+
+    def seal(self, session_data):
+        """Flush, seal the current journal and return the encoded snapshot. Call write_snapshot to finish the job"""
+        self.append(session_data)
+
+        if os.path.exists(self.journal_path()):
+            if os.path.exists(self.sealed_path()):
+                # a previous compaction did not finish. Keep the records in order
+                with open(self.journal_path(), "r") as f_from, open(self.sealed_path(), "a") as f_to:
+                    f_to.write(f_from.read())
+                os.remove(self.journal_path())
+            else:
+                os.replace(self.journal_path(), self.sealed_path())
+        self._n_records = 0
+
+        return jsonpickle.encode(session_data)
+
+    def write_snapshot(self, enc_data, backup_path=None):
+        """Heavy IO. It is safe to run it in a separate thread"""
+        self._makedirs()
+        tmp_path = f"{self.path()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(enc_data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path())
+
+        if backup_path is not None:
+            with open(backup_path, "w") as f:
+                f.write(enc_data)
+
+        if os.path.exists(self.sealed_path()):
+            os.remove(self.sealed_path())
+
+    @staticmethod
+    def _read_records(path):
+        if not os.path.exists(path):
+            return []
+
+        ans = []
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    ans.append(jsonpickle.decode(line))
+                except (ValueError, TypeError):
+                    # a crash in the middle of a write leaves a truncated last line
+                    break
+        return ans
+
+    def load(self, default=None):
+        """Snapshot + sealed journal + journal
+
+        If there is no snapshot yet the journal is replayed on default() (it must be the state the journal started from)
+        """
+        if default is not None and not os.path.exists(self.path()):
+            session_data = default()
+        else:
+            with open(self.path(), "r") as f:
+                session_data = jsonpickle.decode(f.read())
+
+        n = 0
+        for p in [self.sealed_path(), self.journal_path()]:
+            for i in BbwJournal._read_records(p):
+                if i["op"] == "set":
+                    session_data.set_subtree(tuple(i["k"]), i["v"])
+                else:
+                    session_data.del_subtree(tuple(i["k"]))
+                n += 1
+
+        # older snapshots have the dirty parts in the session data
+        session_data.__dict__.pop("_dirty", None)
+        session_data.pop_dirty()
+        self.sync(session_data)
+        self._n_records = n
+        return session_data
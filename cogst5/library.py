@@ -1,42 +1,204 @@
-from cogst5.library_data import LibraryData
+import collections
+import difflib
+import importlib
+import importlib.util
+import json
+import mmap
+import os
 
 
 class Library:
-    def __init__(self):
-        libraryData = "None"
+    """Ship's library
 
-    def search(self, term):
-        # Check first for exact matches
-        exact_match = [k for key, k in enumerate(LibraryData) if term.lower() == k.lower()]
+    The entries ({title: text}) come from cogst5.library_data. They are compiled in two files: <path>.dat with the
+    texts one after the other and <path>.idx with the titles, where their texts are and an inverted index of the
+    n-grams of the titles. The files are rebuilt when the data module is newer. Nothing is read before the first
+    search. The texts are memory-mapped and only the ones that are shown are decoded
+    """
 
-        # Otherwise, make a list of partial matches
-        partial_match = [k for key, k in enumerate(LibraryData) if term.lower() in k.lower()]
+    _module = "cogst5.library_data"
+    _n = 3
+    _max_matches = 10
+    _max_fuzzy = 5
+    _fuzzy_candidates = 50
+    _fuzzy_cutoff = 0.6
 
-        if len(partial_match) == 0:
-            return f"Library search for `{term}`: data is not available."
+    def __init__(self, path=None, module=_module):
+        if path is None:
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "library")
+        self._path = path
+        self._module = module
+        self._keys = None
+        self._lower = None
+        self._exact = None
+        self._ngrams = None
+        self._texts = None
 
-        if len(partial_match) == 1:
-            return (
-                f"**Information.** Library data available on **{partial_match[0]}**:\n{LibraryData[partial_match[0]]}"
-            )
+    @staticmethod
+    def ngrams(s, n=_n):
+        """All the n-grams of s up to length n"""
+        return {s[i : i + k] for k in range(1, n + 1) for i in range(len(s) - k + 1)}
+
+    @staticmethod
+    def compile(data):
+        """texts, [[title, offset, length]], {n-gram: [title ids]}"""
+        texts, keys, ngrams = bytearray(), [], {}
+        for i, (k, v) in enumerate(data.items()):
+            b = str(v).encode("utf-8")
+            keys.append([k, len(texts), len(b)])
+            texts += b
+            for g in Library.ngrams(k.lower()):
+                ngrams.setdefault(g, []).append(i)
+        return bytes(texts), keys, ngrams
+
+    @staticmethod
+    def build(data, path):
+        """Compile data in path.dat and path.idx. The index is written last: if it is there the files are complete"""
+        texts, keys, ngrams = Library.compile(data)
+        with open(f"{path}.dat", "wb") as f:
+            f.write(texts)
+        with open(f"{path}.idx.tmp", "w", encoding="utf-8") as f:
+            json.dump({"keys": keys, "ngrams": ngrams}, f, separators=(",", ":"))
+        os.replace(f"{path}.idx.tmp", f"{path}.idx")
+
+    def _source(self):
+        """Path of the data module, None if there is none"""
+        if self._module is None:
+            return None
+        try:
+            spec = importlib.util.find_spec(self._module)
+        except ModuleNotFoundError:
+            return None
+        return spec.origin if spec is not None else None
+
+    def _set(self, keys, ngrams, texts):
+        self._keys = keys
+        self._lower = [k.lower() for k, _, _ in keys]
+        self._exact = {k: i for i, k in enumerate(self._lower)}
+        self._ngrams = ngrams
+        self._texts = texts
+
+    def load(self):
+        if self._keys is not None:
+            return
+
+        idx, dat = f"{self._path}.idx", f"{self._path}.dat"
+        src = self._source()
+        if src is not None and (not os.path.exists(idx) or os.path.getmtime(src) > os.path.getmtime(idx)):
+            data = importlib.import_module(self._module).LibraryData
+            try:
+                Library.build(data, self._path)
+            except OSError:
+                # read-only installation: keep it in memory
+                texts, keys, ngrams = Library.compile(data)
+                self._set(keys, ngrams, texts)
+                return
+
+        if not os.path.exists(idx):
+            self._set([], {}, b"")
+            return
+
+        with open(idx, "r", encoding="utf-8") as f:
+            d = json.load(f)
+        texts = b""
+        if os.path.getsize(dat):
+            with open(dat, "rb") as f:
+                texts = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._set(d["keys"], d["ngrams"], texts)
+
+    def __len__(self):
+        self.load()
+        return len(self._keys)
+
+    def title(self, i):
+        return self._keys[i][0]
+
+    def text(self, i):
+        _, offset, length = self._keys[i]
+        return self._texts[offset : offset + length].decode("utf-8")
+
+    def _postings(self, term, n=_n):
+        """Posting lists of the longest n-grams (up to n) of term, shortest first"""
+        k = min(len(term), n)
+        grams = {term[i : i + k] for i in range(len(term) - k + 1)}
+        return sorted((self._ngrams.get(g, []) for g in grams), key=len)
 
-        if len(exact_match) == 1:
-            partial_match.remove(exact_match[0])
-            all_matches = "\n • ".join(partial_match)
-            see_also = "\n**See also:**" if (LibraryData[exact_match[0]].find("See also:") == -1) else ""
+    def matches(self, term):
+        """Ids of the titles that contain term, best first: exact match, prefix, word prefix, shortest"""
+        self.load()
+        term = term.lower()
+        if not len(term):
+            return list(range(len(self._keys)))
+
+        postings = self._postings(term)
+        ans = set(postings[0])
+        for i in postings[1:]:
+            if not len(ans):
+                break
+            ans.intersection_update(i)
+
+        # the n-grams are a filter: "abab" and "bab a" share all of them
+        ans = [i for i in ans if term in self._lower[i]]
+        return sorted(ans, key=lambda i: (self._rank(term, self._lower[i]), len(self._lower[i]), i))
+
+    @staticmethod
+    def _rank(term, title):
+        if title == term:
+            return 0
+        if title.startswith(term):
+            return 1
+        if f" {term}" in title or f"-{term}" in title or f"({term}" in title:
+            return 2
+        return 3
+
+    def fuzzy(self, term):
+        """Ids of the titles that look like term (typos), best first
+
+        The candidates share the most bigrams with it: a typo breaks up to 3 trigrams, too many for short words
+        """
+        self.load()
+        term = term.lower()
+        if not len(term):
+            return []
+
+        shared = collections.Counter(i for p in self._postings(term, 2) for i in p)
+        candidates = [i for i, _ in shared.most_common(Library._fuzzy_candidates)]
+        ratios = [(difflib.SequenceMatcher(None, term, self._lower[i]).ratio(), i) for i in candidates]
+        ratios = sorted((-r, i) for r, i in ratios if r >= Library._fuzzy_cutoff)
+        return [i for _, i in ratios[: Library._max_fuzzy]]
+
+    def search(self, term):
+        matches = self.matches(term)
+
+        if len(matches) == 0:
+            ans = f"Library search for `{term}`: data is not available."
+            fuzzy = self.fuzzy(term)
+            if len(fuzzy):
+                all_matches = "\n • ".join(self.title(i) for i in fuzzy)
+                ans += f" Did you mean:\n • {all_matches}"
+            return ans
+
+        if len(matches) == 1:
+            return f"**Information.** Library data available on **{self.title(matches[0])}**:\n{self.text(matches[0])}"
+
+        exact = self._exact.get(term.lower(), None)
+        if exact is not None:
+            text = self.text(exact)
+            all_matches = "\n • ".join(self.title(i) for i in matches if i != exact)
+            see_also = "\n**See also:**" if (text.find("See also:") == -1) else ""
             return (
-                "**Information.** Library data available on"
-                f" **{exact_match[0]}**:\n{LibraryData[exact_match[0]]}{see_also}\n • {all_matches}"
+                f"**Information.** Library data available on **{self.title(exact)}**:\n{text}{see_also}\n •"
+                f" {all_matches}"
             )
 
-        if len(partial_match) > 10:
+        if len(matches) > Library._max_matches:
             return (
-                f"**Information.** Library contains {len(partial_match)} data items pertaining to `{term}`. Please be"
+                f"**Information.** Library contains {len(matches)} data items pertaining to `{term}`. Please be"
                 " more specific."
             )
-        else:
-            all_matches = "\n • ".join(partial_match)
-            return (
-                f"**Information.** Library contains {len(partial_match)} data items pertaining to `{term}`. Please"
-                f" specify:\n • {all_matches}"
-            )
+
+        all_matches = "\n • ".join(self.title(i) for i in matches)
+        return (
+            f"**Information.** Library contains {len(matches)} data items pertaining to `{term}`. Please"
+            f" specify:\n • {all_matches}"
+        )
@@ -1,20 +1,149 @@
+import collections
+import itertools
+import json
+import os
+
+import jsonpickle
+
 from cogst5.base import *
 from cogst5.calendar import *
 from cogst5.utils import *
 
 
-class BbwLog(list):
+class BbwLogArchive:
+    """Append-only file with all the entries of a log. One json record per line
+
+    The index (time, is transaction, offset of the line) is built when the archive is first used and kept up to date
+    by append and undo. Queries look at the index first and read only the lines they need, from the most recent one
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._index = None
+
+    def path(self):
+        return self._path
+
+    def exists(self):
+        return os.path.exists(self.path())
+
+    def index(self):
+        """[(t, is transaction, offset)]"""
+        if self._index is not None:
+            return self._index
+
+        self._index = []
+        if not self.exists():
+            return self._index
+
+        with open(self.path(), "rb") as f:
+            offset = 0
+            for line in f:
+                try:
+                    r = json.loads(line)
+                except ValueError:
+                    # a crash in the middle of a write leaves a truncated last line
+                    break
+                if r["op"] == "undo":
+                    if len(self._index):
+                        self._index.pop()
+                else:
+                    value, description, t = r["e"]
+                    self._index.append((t, BbwLog.is_transaction(value, description), offset))
+                offset += len(line)
+
+        return self._index
+
+    def __len__(self):
+        return len(self.index())
+
+    def _write(self, r):
+        d = os.path.dirname(self.path())
+        if d:
+            os.makedirs(d, exist_ok=True)
+
+        with open(self.path(), "ab") as f:
+            offset = f.tell()
+            f.write(f"{json.dumps(r)}\n".encode("utf-8"))
+        return offset
+
+    def append(self, entry):
+        index = self.index()
+        value, description, t = entry
+        offset = self._write({"op": "add", "e": list(entry)})
+        index.append((t, BbwLog.is_transaction(value, description), offset))
+
+    def undo(self):
+        index = self.index()
+        if not len(index):
+            return
+        self._write({"op": "undo"})
+        index.pop()
+
+    def entries(self, transactions=0, t_min=None, t_max=None):
+        """Entries from the most recent one. Time and transactions are filtered with the index only"""
+        index = self.index()
+        if not len(index):
+            return
+
+        with open(self.path(), "rb") as f:
+            for t, is_transaction, offset in reversed(index):
+                if not BbwLog.ck_transaction(is_transaction, transactions):
+                    continue
+                if (t_min is not None and (t is None or t < t_min)) or (t_max is not None and (t is None or t > t_max)):
+                    continue
+
+                f.seek(offset)
+                yield json.loads(f.readline())["e"]
+
+
+class BbwLog(BbwPart):
+    """Log of the session: [value, description, t] entries
+
+    The recent entries are in a ring buffer that goes with the session data. If an archive is set all the entries are
+    also appended to it and the views are taken from there
+    """
+
     _max_size = 100
 
     def __init__(self, name=""):
         self.set_name(name)
+        self._entries = collections.deque(maxlen=BbwLog._max_size)
+        self._archive = None
+        # entries in the archive when this log was in the session data and the ones it took out of it. See replace
+        self._n_archived = 0
+        self._tail = []
 
     def set_name(self, v):
+        self._will_change()
         self._name = v
+        self._touch()
 
     def name(self):
         return self._name
 
+    def entries(self):
+        return self._entries
+
+    def __len__(self):
+        return len(self.entries())
+
+    def __iter__(self):
+        return iter(self.entries())
+
+    def __getitem__(self, idx):
+        return self.entries()[idx]
+
+    def archive(self):
+        return self._archive
+
+    def set_archive(self, v):
+        """Archive of all the entries. An empty archive starts with what is in the ring buffer"""
+        self._archive = v
+        if v is not None and not len(v):
+            for i in self.entries():
+                v.append(i)
+
     def add_entry(self, description="", t=None, value=0):
         if t is not None:
             t = int(t)
@@ -22,56 +151,124 @@ def add_entry(self, description="", t=None, value=0):
         if value is not None:
             value = int(value)
 
-        self.append([value, description, t])
-        if len(self) > BbwLog._max_size:
-            self.pop(0)
+        entry = [value, description, t]
+        self._will_change()
+        self.entries().append(entry)
+        self._touch()
+        if self.archive() is not None:
+            self.archive().append(entry)
 
     def undo(self):
-        self.pop()
+        self._will_change()
+        self.entries().pop()
+        self._touch()
+        if self.archive() is not None:
+            self.archive().undo()
+
+    def __deepcopy__(self, memo):
+        """The archive is a file: the copy shares it and remembers how many entries it had. See replace"""
+        ans = BbwLog(self.name())
+        ans.entries().extend(list(i) for i in self.entries())
+        ans._archive = self.archive()
+        ans.set_n_archived(len(self.archive()) if self.archive() is not None else 0)
+        return ans
+
+    def set_n_archived(self, v):
+        """Entries in the archive when this log was in the session data. See replace"""
+        self._n_archived = v
+
+    def replace(self, old):
+        """This log (a copy, see __deepcopy__) takes the place of old (undo/redo). The archive goes back to how it was
+
+        The entries dropped from the archive go with old, so that it can take the place back
+        """
+        a = None if old is None else old.archive()
+        self._archive = a
+        if a is None:
+            return
+
+        old._n_archived = len(a)
+        n = len(a) - self._n_archived
+        if n > 0:
+            old._tail = list(itertools.islice(a.entries(), n))[::-1]
+            for _ in range(n):
+                a.undo()
+        elif n < 0:
+            for i in self._tail[n:]:
+                a.append(i)
+
+    @staticmethod
+    def is_transaction(value, description):
+        return bool(value) or "buy" in description or "sell" in description
+
+    @staticmethod
+    def ck_transaction(is_transaction, transactions):
+        """transactions: 0 -> all, 1 -> only transactions, 2 -> no transactions"""
+        if transactions == 1:
+            return is_transaction
+        if transactions == 2:
+            return not is_transaction
+        return True
+
+    def query(self, log_lines=10, name="", transactions=0, t_min=None, t_max=None):
+        """Last log_lines entries that match, oldest first. From the archive if there is one"""
+        log_lines, transactions = int(log_lines), int(transactions)
+
+        if self.archive() is not None and self.archive().exists():
+            l = self.archive().entries(transactions, t_min, t_max)
+        else:
+            l = (
+                i
+                for i in reversed(self.entries())
+                if BbwLog.ck_transaction(BbwLog.is_transaction(i[0], i[1]), transactions)
+                and (t_min is None or (i[2] is not None and i[2] >= t_min))
+                and (t_max is None or (i[2] is not None and i[2] <= t_max))
+            )
+
+        ans = list(itertools.islice((i for i in l if name in i[1]), max(log_lines, 0)))
+        ans.reverse()
+        return ans
 
     @staticmethod
     def _header(detail_lvl=0):
         return ["in", "out", "description", "time"]
 
-    def _str_table(self, log_lines=10, name="", transactions=0):
-        log_lines = int(log_lines)
-        transactions = int(transactions)
-
-        def filter(val, des):
-            if name not in des:
-                return False
-            if transactions == 0:
-                return True
-            if transactions == 1:
-                return bool(val) or "buy" in des or "sell" in des
-            if transactions == 2:
-                return not (bool(val) or "buy" in des or "sell" in des)
-            return True
-
-        t = [
+    def _str_table(self, log_lines=10, name="", transactions=0, t_min=None, t_max=None):
+        return [
             [
                 str(i[0]) if i[0] > 0 else "",
                 str(i[0]) if i[0] < 0 else "",
                 str(i[1]),
                 str(BbwCalendar(i[2]).date()) if i[2] is not None else "",
             ]
-            for i in self
-            if filter(i[0], i[1])
+            for i in self.query(log_lines=log_lines, name=name, transactions=transactions, t_min=t_min, t_max=t_max)
         ]
 
-        if len(t) < log_lines:
-            return t
-
-        return t[-log_lines:]
-
-    def __str__(self, detail_lvl=1, log_lines=10, name="", transactions=0):
+    def __str__(self, detail_lvl=1, log_lines=10, name="", transactions=0, t_min=None, t_max=None):
         return BbwUtils.print_table(
-            self._str_table(log_lines=log_lines, name=name, transactions=transactions),
+            self._str_table(log_lines=log_lines, name=name, transactions=transactions, t_min=t_min, t_max=t_max),
             self._header(),
             detail_lvl=detail_lvl,
         )
 
 
+class BbwLogHandler(jsonpickle.handlers.BaseHandler):
+    """Same format as when BbwLog was a list: the ring buffer goes in py/seq. The archive stays out"""
+
+    def flatten(self, obj, data):
+        data["_name"] = obj.name()
+        data["py/seq"] = [list(i) for i in obj.entries()]
+        return data
+
+    def restore(self, data):
+        ans = BbwLog(data.get("_name", ""))
+        ans.entries().extend(data.get("py/seq", []))
+        return ans
+
+
+jsonpickle.handlers.register(BbwLog, BbwLogHandler)
+
+
 # a = BbwLog("log")
 # a.add_entry("aieie")
 # a.add_entry("aieie")
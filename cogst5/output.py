@@ -0,0 +1,68 @@
+import contextvars
+import io
+
+import discord
+
+from cogst5.utils import *
+
+
+class BbwOutput:
+    """Output of the running command
+
+    Between begin and flush the messages of a command are only collected. flush sends them joined in as few messages
+    as possible. If that is more than _max_messages the output goes in a file instead (Discord allows 5 messages per 5
+    seconds in a channel). The messages are sent one after the other, so the client can follow the rate limit buckets.
+    Every command runs in its own task, so they do not interfere
+    """
+
+    _max_messages = 2
+    _filename = "output.md"
+    _buffer = contextvars.ContextVar("bbw_output", default=None)
+
+    @staticmethod
+    def begin():
+        BbwOutput._buffer.set([])
+
+    @staticmethod
+    def write(msg):
+        """Collect msg. False if we are not collecting"""
+        buffer = BbwOutput._buffer.get()
+        if buffer is None:
+            return False
+
+        buffer.append(msg)
+        return True
+
+    @staticmethod
+    def join(msgs):
+        """Every message starts on a new line, as if it was sent on its own"""
+        return "".join(i if i.endswith("\n") else f"{i}\n" for i in msgs)
+
+    @staticmethod
+    def chunks(msgs):
+        return BbwUtils.split_md_compatible(BbwOutput.join(msgs))
+
+    @staticmethod
+    async def send(ctx, msgs):
+        if not len(msgs):
+            return
+
+        chunks = BbwOutput.chunks(msgs)
+        if len(chunks) > BbwOutput._max_messages:
+            s = BbwOutput.join(msgs)
+            await ctx.send(
+                f"{chunks[0]}\n... output too long (`{len(s)}` characters). Full output attached",
+                file=discord.File(io.BytesIO(s.encode("utf-8")), filename=BbwOutput._filename),
+            )
+            return
+
+        for i in chunks:
+            await ctx.send(i)
+
+    @staticmethod
+    async def flush(ctx):
+        """Send what was collected and stop collecting"""
+        msgs = BbwOutput._buffer.get()
+        BbwOutput._buffer.set(None)
+        if msgs is not None:
+            await BbwOutput.send(ctx, msgs)
@@ -14,11 +14,54 @@ def __init__(self, info: str, diff: int, stats: list, time: tuple = None):
         self._info = info
 
 
+class BbwSkillTrie:
+    """Trie of all the suffixes of the lower case names of a list (skills and specialities: "pilot, small craft")
+
+    Walking down a string gives the ids of the names that contain it, case-insensitive: a superset of the matches of
+    BbwUtils.get_objs. The names that were resolved are remembered
+    """
+
+    def __init__(self, names=()):
+        self._root = {}
+        self._n = 0
+        self._found = {}
+        for i, name in enumerate(names):
+            l = name.lower()
+            for j in range(len(l)):
+                node = self._root
+                for c in l[j:]:
+                    node = node.setdefault(c, {})
+                    node.setdefault(None, set()).add(i)
+            self._n += 1
+
+    def substring_matches(self, k):
+        if not len(k):
+            return list(range(self._n))
+
+        node = self._root
+        for c in k.lower():
+            node = node.get(c, None)
+            if node is None:
+                return []
+        return sorted(node[None])
+
+    def get(self, raw_list, name):
+        """As BbwSkill._get_skill(raw_list, name). raw_list must be the list of the names of the trie"""
+        if name not in self._found:
+            self._found[name] = BbwSkill._get_skill(raw_list=raw_list, name=name, candidates=self.substring_matches)
+        return self._found[name]
+
+
 @BbwUtils.for_all_methods(BbwUtils.type_sanitizer_decor)
 class BbwSkill:
     @staticmethod
-    def _get_skill(raw_list, name):
-        res = BbwUtils.get_objs(raw_list=raw_list, name=name)
+    def _get_skill(raw_list, name, candidates=None):
+        """Only match of name, or of the part before the comma. None if there is none
+
+        candidates(name): ids of raw_list that may match name. All of them by default
+        """
+        l = raw_list if candidates is None else [raw_list[i] for i in candidates(name)]
+        res = BbwUtils.get_objs(raw_list=l, name=name)
 
         if len(res) > 1:
             print(res)
@@ -27,7 +70,7 @@ def _get_skill(raw_list, name):
             return res[0]
         q = name.split(",")
         if len(q) > 1:
-            return BbwSkill._get_skill(raw_list=raw_list, name=q[0].strip())
+            return BbwSkill._get_skill(raw_list=raw_list, name=q[0].strip(), candidates=candidates)
 
         return None
 
@@ -45,19 +88,19 @@ def fallback_skill(self):
 
     def base_roll(self, skill_name, skill, stat_name, stat, roll=None, diff=0):
         r = BbwExpr()
-        r += (skill_name, skill)
-        r += (stat_name, stat)
+        r.extend((skill_name, skill))
+        r.extend((stat_name, stat))
 
         if diff:
-            r += ("diff", -diff)
+            r.extend(("diff", -diff))
         if roll:
-            r += roll
+            r.extend(roll)
 
         return r
 
     def roll(self, person, skill_name, skill, chosen_stat: str = None, roll: str = "2d6"):
         if roll:
-            roll = d20.roll(f"{roll} [roll]")
+            roll = BbwUtils.roll(f"{roll} [roll]")
 
         if chosen_stat:
             stat_list = [i for i in dir(person) if i.isupper() and len(i) == 3]
@@ -79,7 +122,7 @@ def roll(self, person, skill_name, skill, chosen_stat: str = None, roll: str = "
 
             if spec._time:
                 t = BbwExpr()
-                t += d20.roll(spec._time[0])
+                t.extend(BbwUtils.roll(spec._time[0]))
                 t = f"**T**: {t} {spec._time[1]}"
             else:
                 t = ""
@@ -104,697 +147,379 @@ class BbwPerson(BbwObj):
     ]
     _soc_2_capacity = [[11, 100], [2, 4]]
 
-    _skills = [
-        BbwSkill(
+    # (name, ((info, diff, stats, time), ...), is_general). Only literals: the table is a constant in the .pyc
+    _skills = None
+    _skills_trie = None
+    _skills_data = (
+        (
             "admin",
-            [
-                BbwSkillSpeciality("avoiding close examination of papers", 8, ["SOC", "EDU"], ("1d6*10", "sec")),
-                BbwSkillSpeciality("dealing with police harassment", 10, ["SOC", "EDU"], ("1d6*10", "min")),
-            ],
+            (
+                ("avoiding close examination of papers", 8, ("SOC", "EDU"), ("1d6*10", "sec")),
+                ("dealing with police harassment", 10, ("SOC", "EDU"), ("1d6*10", "min")),
+            ),
         ),
-        BbwSkill(
+        (
             "advocate",
-            [
-                BbwSkillSpeciality("arguing in court", 8, ["SOC", "EDU"], ("1d6", "days")),
-                BbwSkillSpeciality("debating an argument", 8, ["INT"], ("1d6*10", "min")),
-            ],
-        ),
-        BbwSkill(
-            "animals",
-            [
-                BbwSkillSpeciality("", 8, ["DEX", "EDU", "INT"], None),
-            ],
-            is_general=True,
-        ),
-        BbwSkill(
-            "animals, handling",
-            [
-                BbwSkillSpeciality("riding a horse into battle", 10, ["DEX"], ("1d6", "sec")),
-            ],
+            (
+                ("arguing in court", 8, ("SOC", "EDU"), ("1d6", "days")),
+                ("debating an argument", 8, ("INT",), ("1d6*10", "min")),
+            ),
         ),
-        BbwSkill(
+        ("animals", (("", 8, ("DEX", "EDU", "INT"), None),), True),
+        ("animals, handling", (("riding a horse into battle", 10, ("DEX",), ("1d6", "sec")),)),
+        (
             "animals, veterinary",
-            [
-                BbwSkillSpeciality("first aid", 8, ["EDU"], ("1d6", "rounds")),
-                BbwSkillSpeciality("treat poison or disease", 8, ["EDU"], ("1d6", "hours")),
-                BbwSkillSpeciality("long-term care", 8, ["EDU"], ("1", "day")),
-            ],
-        ),
-        BbwSkill(
-            "animals, training",
-            [
-                BbwSkillSpeciality("taming a strange alien creature", 14, ["INT"], ("1d6", "days")),
-            ],
-        ),
-        BbwSkill(
-            "art",
-            [
-                BbwSkillSpeciality("", 8, ["DEX", "EDU", "INT"], None),
-            ],
-            is_general=True,
-        ),
-        BbwSkill(
+            (
+                ("first aid", 8, ("EDU",), ("1d6", "rounds")),
+                ("treat poison or disease", 8, ("EDU",), ("1d6", "hours")),
+                ("long-term care", 8, ("EDU",), ("1", "day")),
+            ),
+        ),
+        ("animals, training", (("taming a strange alien creature", 14, ("INT",), ("1d6", "days")),)),
+        ("art", (("", 8, ("DEX", "EDU", "INT"), None),), True),
+        (
             "art, performer",
-            [
-                BbwSkillSpeciality("performing a play", 8, ["EDU"], ("1d6", "hours")),
-                BbwSkillSpeciality(
-                    "convincing a person you are actually someone else (vs recon/INT)", 8, ["INT"], None
-                ),
-            ],
+            (
+                ("performing a play", 8, ("EDU",), ("1d6", "hours")),
+                ("convincing a person you are actually someone else (vs recon/INT)", 8, ("INT",), None),
+            ),
         ),
-        BbwSkill(
+        (
             "art, holography",
-            [
-                BbwSkillSpeciality(
-                    "surreptitiously switching on your recorder while in a secret meeting", 14, ["DEX"], ("1d6", "sec")
-                ),
-            ],
-        ),
-        BbwSkill(
-            "art, instrument",
-            [
-                BbwSkillSpeciality("playing a concerto", 10, ["EDU"], ("1d6*10", "min")),
-            ],
-        ),
-        BbwSkill(
-            "art, visual media",
-            [
-                BbwSkillSpeciality("making a statue of someone", 10, ["INT"], ("1d6", "days")),
-            ],
+            (("surreptitiously switching on your recorder while in a secret meeting", 14, ("DEX",), ("1d6", "sec")),),
         ),
-        BbwSkill(
+        ("art, instrument", (("playing a concerto", 10, ("EDU",), ("1d6*10", "min")),)),
+        ("art, visual media", (("making a statue of someone", 10, ("INT",), ("1d6", "days")),)),
+        (
             "art, write",
-            [
-                BbwSkillSpeciality(
+            (
+                (
                     "rousing the people of a planet by exposing their government's corruption",
                     10,
-                    ["INT", "EDU"],
+                    ("INT", "EDU"),
                     ("1d6", "hours"),
                 ),
-                BbwSkillSpeciality("writing an update of traveller", 14, ["INT"], ("1d6", "months")),
-            ],
+                ("writing an update of traveller", 14, ("INT",), ("1d6", "months")),
+            ),
         ),
-        BbwSkill(
+        (
             "astrogation",
-            [
-                BbwSkillSpeciality(
+            (
+                (
                     "plotting course to a target world using a gas giant for a gravity slingshot",
                     10,
-                    ["EDU"],
+                    ("EDU",),
                     ("1d6*10", "min"),
                 ),
-                BbwSkillSpeciality("plotting a standard jump (-DM jump sectors)", 4, ["EDU"], ("1d6*10", "min")),
-            ],
-        ),
-        BbwSkill(
-            "athletics",
-            [
-                BbwSkillSpeciality("", 8, ["DEX", "STR", "END"], None),
-            ],
-            is_general=True,
+                ("plotting a standard jump (-DM jump sectors)", 4, ("EDU",), ("1d6*10", "min")),
+            ),
         ),
-        BbwSkill(
+        ("athletics", (("", 8, ("DEX", "STR", "END"), None),), True),
+        (
             "athletics, dexterity",
-            [
-                BbwSkillSpeciality(
-                    "climbing",
-                    8,
-                    [
-                        "DEX",
-                    ],
-                    ("1d6*10", "sec"),
-                ),
-                BbwSkillSpeciality(
-                    "sprinting (covers 24 + effect meters every check)",
-                    8,
-                    [
-                        "DEX",
-                    ],
-                    ("1d6", "sec"),
-                ),
-                BbwSkillSpeciality(
-                    "high jumping (effect/2 meters up)",
-                    8,
-                    [
-                        "DEX",
-                    ],
-                    ("1d6", "sec"),
-                ),
-                BbwSkillSpeciality(
-                    "long jumping (effect meters long with running start)",
-                    8,
-                    [
-                        "DEX",
-                    ],
-                    ("1d6", "sec"),
-                ),
-                BbwSkillSpeciality(
+            (
+                ("climbing", 8, ("DEX",), ("1d6*10", "sec")),
+                ("sprinting (covers 24 + effect meters every check)", 8, ("DEX",), ("1d6", "sec")),
+                ("high jumping (effect/2 meters up)", 8, ("DEX",), ("1d6", "sec")),
+                ("long jumping (effect meters long with running start)", 8, ("DEX",), ("1d6", "sec")),
+                (
                     "righting yourself when artificial gravity suddenly fails on board a ship",
                     8,
-                    [
-                        "DEX",
-                    ],
+                    ("DEX",),
                     ("1d6", "sec"),
                 ),
-            ],
+            ),
         ),
-        BbwSkill(
-            "athletics, endurance",
-            [
-                BbwSkillSpeciality(
-                    "long-distance running/swimming",
-                    8,
-                    [
-                        "END",
-                    ],
-                    ("1d6*10", "min"),
-                ),
-            ],
-        ),
-        BbwSkill(
+        ("athletics, endurance", (("long-distance running/swimming", 8, ("END",), ("1d6*10", "min")),)),
+        (
             "athletics, strength",
-            [
-                BbwSkillSpeciality(
-                    "arm-wrestling (vs athletics, strength/STR)",
-                    8,
-                    [
-                        "END",
-                    ],
-                    ("1d6", "min"),
-                ),
-                BbwSkillSpeciality(
-                    "feats of strength",
-                    8,
-                    [
-                        "END",
-                    ],
-                    ("1d6*10", "sec"),
-                ),
-                BbwSkillSpeciality(
-                    "performing a complicated task in a high gravity environment",
-                    10,
-                    [
-                        "END",
-                    ],
-                    ("1d6", "sec"),
-                ),
-            ],
+            (
+                ("arm-wrestling (vs athletics, strength/STR)", 8, ("END",), ("1d6", "min")),
+                ("feats of strength", 8, ("END",), ("1d6*10", "sec")),
+                ("performing a complicated task in a high gravity environment", 10, ("END",), ("1d6", "sec")),
+            ),
         ),
-        BbwSkill(
+        (
             "broker",
-            [
-                BbwSkillSpeciality(
-                    "negotiating a deal",
-                    8,
-                    [
-                        "INT",
-                    ],
-                    ("1d6", "hours"),
-                ),
-                BbwSkillSpeciality(
-                    "finding a buyer",
-                    8,
-                    [
-                        "SOC",
-                    ],
-                    ("1d6", "hours"),
-                ),
-            ],
+            (
+                ("negotiating a deal", 8, ("INT",), ("1d6", "hours")),
+                ("finding a buyer", 8, ("SOC",), ("1d6", "hours")),
+            ),
         ),
-        BbwSkill(
+        (
             "carouse",
-            [
-                BbwSkillSpeciality(
-                    "drinking someone under the table (vs carouse/END)",
-                    8,
-                    [
-                        "END",
-                    ],
-                    ("1d6", "hours"),
-                ),
-                BbwSkillSpeciality(
-                    "gathering rumors at a party",
-                    8,
-                    [
-                        "SOC",
-                    ],
-                    ("1d6", "hours"),
-                ),
-            ],
+            (
+                ("drinking someone under the table (vs carouse/END)", 8, ("END",), ("1d6", "hours")),
+                ("gathering rumors at a party", 8, ("SOC",), ("1d6", "hours")),
+            ),
         ),
-        BbwSkill(
+        (
             "deception",
-            [
-                BbwSkillSpeciality(
-                    "convincing a guard to let you pass without ID (possible vs recon/DEX)",
-                    12,
-                    [
-                        "INT",
-                    ],
-                    ("1d6", "min"),
-                ),
-                BbwSkillSpeciality(
-                    "palming a credit chit",
-                    8,
-                    [
-                        "DEX",
-                    ],
-                    ("1d6", "sec"),
-                ),
-                BbwSkillSpeciality(
+            (
+                ("convincing a guard to let you pass without ID (possible vs recon/DEX)", 12, ("INT",), ("1d6", "min")),
+                ("palming a credit chit", 8, ("DEX",), ("1d6", "sec")),
+                (
                     "disguising yourself as a wealthy nobel to fool a client (possible vs recon/DEX)",
                     10,
-                    ["INT", "SOC"],
+                    ("INT", "SOC"),
                     ("1d6*10", "min"),
                 ),
-            ],
+            ),
         ),
-        BbwSkill(
+        (
             "diplomat",
-            [
-                BbwSkillSpeciality(
-                    "greeting the emperor properly",
-                    10,
-                    [
-                        "SOC",
-                    ],
-                    ("1d6", "min"),
-                ),
-                BbwSkillSpeciality(
-                    "negotiating a peace treaty",
-                    8,
-                    [
-                        "EDU",
-                    ],
-                    ("1d6", "days"),
-                ),
-                BbwSkillSpeciality(
-                    "transmitting a formal surrender",
-                    8,
-                    [
-                        "INT",
-                    ],
-                    ("1d6*10", "sec"),
-                ),
-            ],
-        ),
-        BbwSkill(
-            "drive",
-            [
-                BbwSkillSpeciality("", 8, ["INT", "DEX"], None),
-            ],
-            is_general=True,
-        ),
-        BbwSkill(
-            "drive, hovercraft",
-            [
-                BbwSkillSpeciality("maneuvering a hovercraft through a tight canal", 10, ["DEX"], ("1d6", "min")),
-            ],
-        ),
-        BbwSkill(
+            (
+                ("greeting the emperor properly", 10, ("SOC",), ("1d6", "min")),
+                ("negotiating a peace treaty", 8, ("EDU",), ("1d6", "days")),
+                ("transmitting a formal surrender", 8, ("INT",), ("1d6*10", "sec")),
+            ),
+        ),
+        ("drive", (("", 8, ("INT", "DEX"), None),), True),
+        ("drive, hovercraft", (("maneuvering a hovercraft through a tight canal", 10, ("DEX",), ("1d6", "min")),)),
+        (
             "drive, mole",
-            [
-                BbwSkillSpeciality("surfacing in the right place", 8, ["INT"], ("1d6*10", "min")),
-                BbwSkillSpeciality(
-                    "precisely controlling a dig to expose a vein of minerals", 10, ["DEX"], ("1d6*10", "min")
-                ),
-            ],
+            (
+                ("surfacing in the right place", 8, ("INT",), ("1d6*10", "min")),
+                ("precisely controlling a dig to expose a vein of minerals", 10, ("DEX",), ("1d6*10", "min")),
+            ),
         ),
-        BbwSkill(
+        (
             "drive, track",
-            [
-                BbwSkillSpeciality("maneuvering/smashing through a forest", 10, ["DEX"], ("1d6", "min")),
-                BbwSkillSpeciality("driving a tank into a cargo bay", 8, ["DEX"], ("1d6*10", "sec")),
-            ],
-        ),
-        BbwSkill(
-            "drive, walker",
-            [
-                BbwSkillSpeciality("negotiating rough terrain", 10, ["DEX"], ("1d6", "min")),
-            ],
+            (
+                ("maneuvering/smashing through a forest", 10, ("DEX",), ("1d6", "min")),
+                ("driving a tank into a cargo bay", 8, ("DEX",), ("1d6*10", "sec")),
+            ),
         ),
-        BbwSkill(
+        ("drive, walker", (("negotiating rough terrain", 10, ("DEX",), ("1d6", "min")),)),
+        (
             "drive, wheel",
-            [
-                BbwSkillSpeciality(
-                    "driving a groundcar in a short race (vs drive, wheel/DEX)", 8, ["DEX"], ("1d6", "min")
-                ),
-                BbwSkillSpeciality(
-                    "driving a groundcar in a long race (vs drive, wheel/END)", 8, ["END"], ("1d6", "hours")
-                ),
-                BbwSkillSpeciality("avoiding an unexpected obstacle on the road", 8, ["DEX"], ("1d6", "sec")),
-            ],
-        ),
-        BbwSkill(
-            "electronics",
-            [
-                BbwSkillSpeciality("", 8, ["EDU", "INT", "DEX"], None),
-            ],
-            is_general=True,
+            (
+                ("driving a groundcar in a short race (vs drive, wheel/DEX)", 8, ("DEX",), ("1d6", "min")),
+                ("driving a groundcar in a long race (vs drive, wheel/END)", 8, ("END",), ("1d6", "hours")),
+                ("avoiding an unexpected obstacle on the road", 8, ("DEX",), ("1d6", "sec")),
+            ),
         ),
-        BbwSkill(
+        ("electronics", (("", 8, ("EDU", "INT", "DEX"), None),), True),
+        (
             "electronics, comms",
-            [
-                BbwSkillSpeciality("requesting landing privileges at a starport", 6, ["EDU"], ("1d6", "min")),
-                BbwSkillSpeciality(
-                    "accessing publicly available but obscure data over comms", 8, ["EDU"], ("1d6*10", "min")
-                ),
-                BbwSkillSpeciality(
-                    "bouncing a signal off orbiting satellite to hide your transmitter", 10, ["INT"], ("1d6*10", "min")
-                ),
-                BbwSkillSpeciality(
+            (
+                ("requesting landing privileges at a starport", 6, ("EDU",), ("1d6", "min")),
+                ("accessing publicly available but obscure data over comms", 8, ("EDU",), ("1d6*10", "min")),
+                ("bouncing a signal off orbiting satellite to hide your transmitter", 10, ("INT",), ("1d6*10", "min")),
+                (
                     "jamming a comms system (vs electronics, comms/INT). DM -2/-4 for laser/maser respectively. DM+1"
                     " for each TL difference",
                     10,
-                    ["INT"],
+                    ("INT",),
                     ("1d6", "min"),
                 ),
-            ],
+            ),
         ),
-        BbwSkill(
+        (
             "electronics, computers",
-            [
-                BbwSkillSpeciality("accessing public available data", 4, ["EDU", "INT"], ("1d6", "min")),
-                BbwSkillSpeciality(
-                    "activating a computer program on a ship's computer", 6, ["EDU", "INT"], ("1d6*10", "sec")
-                ),
-                BbwSkillSpeciality(
-                    "searching a corporate database for evidence of illegal activity", 10, ["INT"], ("1d6", "hours")
-                ),
-                BbwSkillSpeciality(
+            (
+                ("accessing public available data", 4, ("EDU", "INT"), ("1d6", "min")),
+                ("activating a computer program on a ship's computer", 6, ("EDU", "INT"), ("1d6*10", "sec")),
+                ("searching a corporate database for evidence of illegal activity", 10, ("INT",), ("1d6", "hours")),
+                (
                     "hacking into a secure computer network. DM for hacking a security programs. Failure means that the"
                     " targeted system may be able to trace the hacking attempt",
                     14,
-                    ["INT"],
+                    ("INT",),
                     ("1d6*10", "hours"),
                 ),
-            ],
-        ),
-        BbwSkill(
-            "electronics, remote ops",
-            [
-                BbwSkillSpeciality("using a mining drone to excavate an asteroid", 6, ["DEX"], ("1d6", "hours")),
-            ],
+            ),
         ),
-        BbwSkill(
+        ("electronics, remote ops", (("using a mining drone to excavate an asteroid", 6, ("DEX",), ("1d6", "hours")),)),
+        (
             "electronics, sensors",
-            [
-                BbwSkillSpeciality("making a detailed sensor scan", 6, ["INT", "EDU"], ("1d6*10", "min")),
-                BbwSkillSpeciality("analizing sensor data", 8, ["INT"], ("1d6", "hours")),
-            ],
-        ),
-        BbwSkill(
-            "engineer",
-            [
-                BbwSkillSpeciality("", 8, ["EDU", "INT"], None),
-            ],
-            is_general=True,
+            (
+                ("making a detailed sensor scan", 6, ("INT", "EDU"), ("1d6*10", "min")),
+                ("analizing sensor data", 8, ("INT",), ("1d6", "hours")),
+            ),
         ),
-        BbwSkill(
+        ("engineer", (("", 8, ("EDU", "INT"), None),), True),
+        (
             "engineer, m-drive",
-            [
-                BbwSkillSpeciality(
-                    "overcharging a thruster plate to increase a ship's agility", 10, ["INT"], ("1d6", "min")
-                ),
-                BbwSkillSpeciality(
-                    "estimating a ship's tonnage from its observed performance", 8, ["INT"], ("1d6*10", "sec")
-                ),
-            ],
-        ),
-        BbwSkill(
-            "engineer, j-drive",
-            [
-                BbwSkillSpeciality("making a jump", 4, ["EDU"], ("1d6*10", "min")),
-            ],
+            (
+                ("overcharging a thruster plate to increase a ship's agility", 10, ("INT",), ("1d6", "min")),
+                ("estimating a ship's tonnage from its observed performance", 8, ("INT",), ("1d6*10", "sec")),
+            ),
         ),
-        BbwSkill(
+        ("engineer, j-drive", (("making a jump", 4, ("EDU",), ("1d6*10", "min")),)),
+        (
             "engineer, life support",
-            [
-                BbwSkillSpeciality(
-                    "safely reducing power to life support to prolong a ship's battery life", 8, ["EDU"], ("1d6", "min")
-                ),
-            ],
+            (("safely reducing power to life support to prolong a ship's battery life", 8, ("EDU",), ("1d6", "min")),),
         ),
-        BbwSkill(
+        (
             "engineer, power",
-            [
-                BbwSkillSpeciality(
-                    "monitoring a ship's power output to determine its capabilities", 10, ["INT"], ("1d6", "min")
-                ),
-            ],
+            (("monitoring a ship's power output to determine its capabilities", 10, ("INT",), ("1d6", "min")),),
         ),
-        BbwSkill(
+        (
             "explosives",
-            [
-                BbwSkillSpeciality("planting charges to collapse a wall in a building", 8, ["EDU"], ("1d6*10", "min")),
-                BbwSkillSpeciality(
-                    "planting a breaching charge. Dmg multiplied by the effect", 8, ["EDU"], ("1d6*10", "sec")
-                ),
-                BbwSkillSpeciality(
-                    "disarming a bomb equipped with anti-tamper trembler detonators", 14, ["DEX"], ("1d6", "min")
-                ),
-            ],
+            (
+                ("planting charges to collapse a wall in a building", 8, ("EDU",), ("1d6*10", "min")),
+                ("planting a breaching charge. Dmg multiplied by the effect", 8, ("EDU",), ("1d6*10", "sec")),
+                ("disarming a bomb equipped with anti-tamper trembler detonators", 14, ("DEX",), ("1d6", "min")),
+            ),
         ),
-        BbwSkill(
+        (
             "flyer",
-            [
-                BbwSkillSpeciality("landing safely", 6, ["DEX"], ("1d6", "min")),
-                BbwSkillSpeciality("racing another flyer (vs flyer/DEX)", 8, ["DEX"], ("1d6*10", "min")),
-            ],
-            is_general=True,
+            (
+                ("landing safely", 6, ("DEX",), ("1d6", "min")),
+                ("racing another flyer (vs flyer/DEX)", 8, ("DEX",), ("1d6*10", "min")),
+            ),
+            True,
         ),
-        BbwSkill(
+        (
             "gambler",
-            [
-                BbwSkillSpeciality("a casual game of poker (vs gambler/INT)", 8, ["INT"], ("1d6", "hours")),
-                BbwSkillSpeciality("picking the right horse to bet on", 8, ["INT"], ("1d6", "min")),
-            ],
-        ),
-        BbwSkill(
-            "gunner",
-            [
-                BbwSkillSpeciality("", 8, ["INT", "DEX"], None),
-            ],
-            is_general=True,
-        ),
-        BbwSkill(
-            "gunner, turret",
-            [
-                BbwSkillSpeciality("firing a turret at an enemy ship", 8, ["DEX"], ("1d6", "sec")),
-            ],
-        ),
-        BbwSkill(
-            "gunner, ortillery",
-            [
-                BbwSkillSpeciality("planetary bombardment/stationary targets", 8, ["INT"], ("1d6", "min")),
-            ],
-        ),
-        BbwSkill(
-            "gunner, screen",
-            [
-                BbwSkillSpeciality("activating a screen to intercept enemy fire", 10, ["DEX"], ("1d6", "sec")),
-            ],
-        ),
-        BbwSkill(
-            "gunner, capital",
-            [
-                BbwSkillSpeciality("firing a spinal mount weapon", 8, ["INT"], ("1d6", "min")),
-            ],
-        ),
-        BbwSkill(
-            "gun combat",
-            [
-                BbwSkillSpeciality("", 8, ["DEX"], ("1d6", "sec")),
-            ],
-            is_general=True,
-        ),
-        BbwSkill(
+            (
+                ("a casual game of poker (vs gambler/INT)", 8, ("INT",), ("1d6", "hours")),
+                ("picking the right horse to bet on", 8, ("INT",), ("1d6", "min")),
+            ),
+        ),
+        ("gunner", (("", 8, ("INT", "DEX"), None),), True),
+        ("gunner, turret", (("firing a turret at an enemy ship", 8, ("DEX",), ("1d6", "sec")),)),
+        ("gunner, ortillery", (("planetary bombardment/stationary targets", 8, ("INT",), ("1d6", "min")),)),
+        ("gunner, screen", (("activating a screen to intercept enemy fire", 10, ("DEX",), ("1d6", "sec")),)),
+        ("gunner, capital", (("firing a spinal mount weapon", 8, ("INT",), ("1d6", "min")),)),
+        ("gun combat", (("", 8, ("DEX",), ("1d6", "sec")),), True),
+        (
             "heavy weapons",
-            [
-                BbwSkillSpeciality("firing an artillery piece at a visible target", 8, ["DEX"], ("1d6", "sec")),
-                BbwSkillSpeciality("firing an artillery piece using indirect fire", 10, ["INT"], ("1d6*10", "sec")),
-            ],
-            is_general=True,
+            (
+                ("firing an artillery piece at a visible target", 8, ("DEX",), ("1d6", "sec")),
+                ("firing an artillery piece using indirect fire", 10, ("INT",), ("1d6*10", "sec")),
+            ),
+            True,
         ),
-        BbwSkill(
+        (
             "investigate",
-            [
-                BbwSkillSpeciality("searching a crime scene for clues", 8, ["INT"], ("1d6*10", "min")),
-                BbwSkillSpeciality(
+            (
+                ("searching a crime scene for clues", 8, ("INT",), ("1d6*10", "min")),
+                (
                     "watching a bank of security monitors in a starport, waiting for a specific criminal",
                     10,
-                    ["INT"],
+                    ("INT",),
                     ("1d6", "hours"),
                 ),
-            ],
-        ),
-        BbwSkill(
-            "jack-of-all-trades",
-            [
-                BbwSkillSpeciality("", 8, ["STR", "DEX", "END", "INT", "EDU", "SOC"], None),
-            ],
+            ),
         ),
-        BbwSkill(
+        ("jack-of-all-trades", (("", 8, ("STR", "DEX", "END", "INT", "EDU", "SOC"), None),)),
+        (
             "language",
-            [
-                BbwSkillSpeciality("ordering a meal, asking for basic directions", 6, ["EDU"], ("1d6", "sec")),
-                BbwSkillSpeciality("holding a simple conversation", 8, ["EDU"], ("1d6*10", "sec")),
-                BbwSkillSpeciality("understanding a complex technical document or report", 12, ["EDU"], ("1d6", "min")),
-            ],
-            is_general=True,
+            (
+                ("ordering a meal, asking for basic directions", 6, ("EDU",), ("1d6", "sec")),
+                ("holding a simple conversation", 8, ("EDU",), ("1d6*10", "sec")),
+                ("understanding a complex technical document or report", 12, ("EDU",), ("1d6", "min")),
+            ),
+            True,
         ),
-        BbwSkill(
+        (
             "leadership",
-            [
-                BbwSkillSpeciality("shouting an order", 8, ["SOC"], ("1d6", "sec")),
-                BbwSkillSpeciality("rallying shaken troops", 10, ["SOC"], ("1d6", "sec")),
-            ],
-        ),
-        BbwSkill(
-            "mechanic",
-            [
-                BbwSkillSpeciality("reparing a damaged system in the field", 8, ["INT", "EDU"], ("1d6", "min")),
-            ],
+            (
+                ("shouting an order", 8, ("SOC",), ("1d6", "sec")),
+                ("rallying shaken troops", 10, ("SOC",), ("1d6", "sec")),
+            ),
         ),
-        BbwSkill(
+        ("mechanic", (("reparing a damaged system in the field", 8, ("INT", "EDU"), ("1d6", "min")),)),
+        (
             "medic",
-            [
-                BbwSkillSpeciality("first aid", 8, ["EDU"], ("1d6", "rounds")),
-                BbwSkillSpeciality("treat poison or disease", 8, ["EDU"], ("1d6", "hours")),
-                BbwSkillSpeciality("long-term care", 8, ["EDU"], ("1", "day")),
-            ],
-        ),
-        BbwSkill(
-            "melee",
-            [
-                BbwSkillSpeciality("swinging an object", 8, ["STR", "DEX"], ("1d6", "sec")),
-            ],
-            is_general=True,
+            (
+                ("first aid", 8, ("EDU",), ("1d6", "rounds")),
+                ("treat poison or disease", 8, ("EDU",), ("1d6", "hours")),
+                ("long-term care", 8, ("EDU",), ("1", "day")),
+            ),
         ),
-        BbwSkill(
+        ("melee", (("swinging an object", 8, ("STR", "DEX"), ("1d6", "sec")),), True),
+        (
             "navigation",
-            [
-                BbwSkillSpeciality(
-                    "plotting a course using an orbiting satellite beacon", 6, ["INT", "EDU"], ("1d6*10", "min")
-                ),
-                BbwSkillSpeciality("avoiding getting lost in a thick jungle", 10, ["INT"], ("1d6", "hours")),
-            ],
+            (
+                ("plotting a course using an orbiting satellite beacon", 6, ("INT", "EDU"), ("1d6*10", "min")),
+                ("avoiding getting lost in a thick jungle", 10, ("INT",), ("1d6", "hours")),
+            ),
         ),
-        BbwSkill(
+        (
             "persuade",
-            [
-                BbwSkillSpeciality(
-                    "bluffing your way past a guard (vs persuade/INT or SOC)", 8, ["INT", "SOC"], ("1d6", "min")
-                ),
-                BbwSkillSpeciality("haggling in a bazaar (vs persuade/INT or SOC)", 8, ["INT", "SOC"], ("1d6", "min")),
-                BbwSkillSpeciality("intimidating a thug (vs persuade/INT or SOC)", 8, ["STR", "SOC"], ("1d6", "min")),
-                BbwSkillSpeciality("asking the alien space princess to marry you", 14, ["SOC"], ("1d6*10", "min")),
-            ],
-        ),
-        BbwSkill(
-            "pilot",
-            [
-                BbwSkillSpeciality("", 8, ["DEX"], None),
-            ],
-            is_general=True,
-        ),
-        BbwSkill(
-            "profession",
-            [
-                BbwSkillSpeciality("", 8, ["EDU", "INT", "STR"], None),
-            ],
-            is_general=True,
-        ),
-        BbwSkill(
+            (
+                ("bluffing your way past a guard (vs persuade/INT or SOC)", 8, ("INT", "SOC"), ("1d6", "min")),
+                ("haggling in a bazaar (vs persuade/INT or SOC)", 8, ("INT", "SOC"), ("1d6", "min")),
+                ("intimidating a thug (vs persuade/INT or SOC)", 8, ("STR", "SOC"), ("1d6", "min")),
+                ("asking the alien space princess to marry you", 14, ("SOC",), ("1d6*10", "min")),
+            ),
+        ),
+        ("pilot", (("", 8, ("DEX",), None),), True),
+        ("profession", (("", 8, ("EDU", "INT", "STR"), None),), True),
+        (
             "recon",
-            [
-                BbwSkillSpeciality("working out the routine of a trio of guard patrols", 8, ["INT"], ("1d6*10", "min")),
-                BbwSkillSpeciality(
-                    "spotting the sniper before they shoot you (vs stealth/DEX)", 8, ["INT"], ("1d6*10", "sec")
-                ),
-            ],
+            (
+                ("working out the routine of a trio of guard patrols", 8, ("INT",), ("1d6*10", "min")),
+                ("spotting the sniper before they shoot you (vs stealth/DEX)", 8, ("INT",), ("1d6*10", "sec")),
+            ),
         ),
-        BbwSkill(
+        (
             "science",
-            [
-                BbwSkillSpeciality("remember a commonly known fact", 6, ["EDU"], ("1d6", "min")),
-                BbwSkillSpeciality("researching a problem related to a field of science", 8, ["INT"], ("1d6", "days")),
-            ],
-            is_general=True,
-        ),
-        BbwSkill(
-            "seafarer",
-            [
-                BbwSkillSpeciality("", 8, ["DEX"], None),
-            ],
-            is_general=True,
-        ),
-        BbwSkill(
-            "seafarer, personal",
-            [
-                BbwSkillSpeciality("controlling a canoe in a violent storm", 14, ["END"], ("1d6", "hours")),
-            ],
-        ),
-        BbwSkill(
+            (
+                ("remember a commonly known fact", 6, ("EDU",), ("1d6", "min")),
+                ("researching a problem related to a field of science", 8, ("INT",), ("1d6", "days")),
+            ),
+            True,
+        ),
+        ("seafarer", (("", 8, ("DEX",), None),), True),
+        ("seafarer, personal", (("controlling a canoe in a violent storm", 14, ("END",), ("1d6", "hours")),)),
+        (
             "stealth",
-            [
-                BbwSkillSpeciality("sneaking past the guard (vs recon/INT)", 8, ["DEX"], ("1d6*10", "sec")),
-                BbwSkillSpeciality("avoiding detection by security patrol (vs recon/INT)", 8, ["DEX"], ("1d6", "min")),
-            ],
+            (
+                ("sneaking past the guard (vs recon/INT)", 8, ("DEX",), ("1d6*10", "sec")),
+                ("avoiding detection by security patrol (vs recon/INT)", 8, ("DEX",), ("1d6", "min")),
+            ),
         ),
-        BbwSkill(
+        (
             "steward",
-            [
-                BbwSkillSpeciality("cooking a fine meal", 8, ["EDU"], ("1d6", "hours")),
-                BbwSkillSpeciality(
+            (
+                ("cooking a fine meal", 8, ("EDU",), ("1d6", "hours")),
+                (
                     "calming down an angry duke who has just been told he will not be jumping to his destination on"
                     " time",
                     10,
-                    ["SOC"],
+                    ("SOC",),
                     ("1d6", "min"),
                 ),
-            ],
+            ),
         ),
-        BbwSkill(
+        (
             "streetwise",
-            [
-                BbwSkillSpeciality(
-                    "finding a dealer in illegal materials or technologies", 8, ["INT"], ("1d6*10", "hours")
-                ),
-                BbwSkillSpeciality("evade a police search (vs recon/INT)", 8, ["INT"], ("1d6*10", "min")),
-            ],
+            (
+                ("finding a dealer in illegal materials or technologies", 8, ("INT",), ("1d6*10", "hours")),
+                ("evade a police search (vs recon/INT)", 8, ("INT",), ("1d6*10", "min")),
+            ),
         ),
-        BbwSkill(
+        (
             "survival",
-            [
-                BbwSkillSpeciality(
-                    "gathering supplies in the wilderness to survive for a week", 8, ["EDU"], ("1d6", "days")
-                ),
-                BbwSkillSpeciality("identifying a poisonous plant", 8, ["INT", "EDU"], ("1d6*10", "seconds")),
-            ],
-        ),
-        BbwSkill(
-            "tactics",
-            [
-                BbwSkillSpeciality(
-                    "developing a strategy for attacking an enemy base", 8, ["INT"], ("1d6*10", "hours")
-                ),
-            ],
-            is_general=True,
-        ),
-        BbwSkill(
-            "vacc suit",
-            [
-                BbwSkillSpeciality("performing a system check on battle dress", 8, ["EDU"], ("1d6", "min")),
-            ],
-        ),
-        BbwSkill(
-            "0G",
-            [
-                BbwSkillSpeciality("", 8, ["DEX"], None),
-            ],
+            (
+                ("gathering supplies in the wilderness to survive for a week", 8, ("EDU",), ("1d6", "days")),
+                ("identifying a poisonous plant", 8, ("INT", "EDU"), ("1d6*10", "seconds")),
+            ),
         ),
-    ]
+        ("tactics", (("developing a strategy for attacking an enemy base", 8, ("INT",), ("1d6*10", "hours")),), True),
+        ("vacc suit", (("performing a system check on battle dress", 8, ("EDU",), ("1d6", "min")),)),
+        ("0G", (("", 8, ("DEX",), None),)),
+    )
+
+    @staticmethod
+    def skills():
+        """Table of the skills. Built from _skills_data on first use"""
+        if BbwPerson._skills is None:
+            BbwPerson._skills = [
+                BbwSkill(i[0], [BbwSkillSpeciality(*j) for j in i[1]], *i[2:]) for i in BbwPerson._skills_data
+            ]
+        return BbwPerson._skills
+
+    @staticmethod
+    def skills_trie():
+        """BbwSkillTrie of the table of the skills"""
+        if BbwPerson._skills_trie is None:
+            BbwPerson._skills_trie = BbwSkillTrie(i.name() for i in BbwPerson.skills())
+        return BbwPerson._skills_trie
 
     def __init__(self, upp=None, salary_ticket=None, reinvest=True, skill_rank={}, *args, **kwargs):
         self._size = 0
@@ -819,8 +544,10 @@ def get_obj_capacity(self, i, is_per_obj=False):
     def set_skill(self, name, value=None):
         if value is None:
             name, value = eval(name)
+        self._will_change()
         if value is None:
             del self._skill_rank[name]
+            self._skills_changed()
             return
         if type(value) is str:
             value = int(value, 36)
@@ -828,8 +555,9 @@ def set_skill(self, name, value=None):
         BbwUtils.test_geq("skill", value, 0)
         BbwUtils.test_leq("skill", value, 4)
         self._skill_rank[name] = value
+        self._skills_changed()
 
-        general_skills = list(i.name() for i in BbwPerson._skills if i._is_general)
+        general_skills = list(i.name() for i in BbwPerson.skills() if i._is_general)
 
         for i in general_skills:
             if i in name:
@@ -849,9 +577,10 @@ def set_capacity(self, v: float = None):
                 v = BbwUtils.get_modifier(int(self.SOC()[0], 36), BbwPerson._soc_2_capacity)
             else:
                 v = 2
-        self._capacity = v
-        self.set_size()
-        super().set_capacity(v)
+        with self._update_parent():
+            self._capacity = v
+            self.set_size()
+            super().set_capacity(v)
 
     def set_size(self, v: float = None):
         if v is None:
@@ -861,8 +590,10 @@ def set_size(self, v: float = None):
     def set_rank(self, name, value=None):
         if value is None:
             name, value = eval(name)
+        self._will_change()
         if value is None:
             del self._skill_rank[name]
+            self._skills_changed()
             return
         if type(value) is str:
             value = int(value, 36)
@@ -870,6 +601,7 @@ def set_rank(self, name, value=None):
         BbwUtils.test_geq("skill/rank", value, 0)
         BbwUtils.test_leq("skill/rank", value, 6)
         self._skill_rank[name] = value
+        self._skills_changed()
 
     def set_skill_rank(self, skill_rank={}):
         if type(skill_rank) is str:
@@ -878,6 +610,7 @@ def set_skill_rank(self, skill_rank={}):
             raise InvalidArgument(f"{skill_rank}: must be a dict!")
 
         self._skill_rank = {}
+        self._skills_changed()
         for k, v in skill_rank.items():
             if v > 4:
                 self.set_rank(k, v)
@@ -890,6 +623,17 @@ def set_skill_rank(self, skill_rank={}):
     def skill_rank(self):
         return self._skill_rank
 
+    def _skills_changed(self):
+        self._cache().skill_index = None
+        self._touch()
+
+    def skill_index(self):
+        """{name: name of the skill or rank it resolves to (None if none)}. Rebuilt when the skills change"""
+        c = self._cache()
+        if c.skill_index is None:
+            c.skill_index = {k: k for k in self.skill_rank()}
+        return c.skill_index
+
     # def skill(self, name):
     #     # the unskilled base value cannot surpass 0
     #     joat = max(min(self.rank(name="jack-of-all-trades", default_value=-3)[0][1], 3), 0)
@@ -905,13 +649,17 @@ def skill(self, name):
         return self.rank(name=name, default_value=joat - 3)
 
     def rank(self, name, default_value=0):
-        res = BbwSkill._get_skill(raw_list=list(self.skill_rank().items()), name=name)
+        idx = self.skill_index()
+        if name not in idx:
+            res = BbwSkill._get_skill(raw_list=list(self.skill_rank().keys()), name=name)
+            idx[name] = res
 
-        return res if res else (name, default_value)
+        k = idx[name]
+        return (k, self.skill_rank()[k]) if k is not None else (name, default_value)
 
     def skill_check(self, skill, roll: str = "2d6", chosen_stat: str = None):
         skill_name, skill_value = self.skill(skill)
-        skill_obj = BbwSkill._get_skill(raw_list=BbwPerson._skills, name=skill_name)
+        skill_obj = BbwPerson.skills_trie().get(BbwPerson.skills(), skill_name)
 
         if not skill_obj:
             raise InvalidArgument(f"{skill_name} skill not found!")
@@ -1093,6 +841,7 @@ def _str_table(self, detail_lvl: int = 0):
                 self.info(),
             ]
 
+    @BbwObjCache.render_cache_decor
     def __str__(self, detail_lvl: int = 0):
         s = BbwUtils.print_table(self._str_table(detail_lvl), headers=self._header(detail_lvl), detail_lvl=detail_lvl)
 
@@ -1145,6 +894,38 @@ def _header(detail_lvl=0):
             ]
 
 
+class BbwCrewProfile:
+    """Best skills, ranks and stats of a crew. Every answer is remembered
+
+    The vehicle keeps its profile until the vehicle or something in it changes (see BbwVehicle.crew_profile)
+    """
+
+    def __init__(self, crew):
+        self._crew = crew
+        self._max = {}
+
+    def crew(self):
+        return self._crew
+
+    def _get_max(self, f, name):
+        k = (f, name)
+        if k not in self._max:
+            self._max[k] = getattr(BbwPerson, f"max_{f}")(self.crew(), name)
+        return self._max[k]
+
+    def max_skill(self, skill):
+        """As BbwPerson.max_skill on the crew"""
+        return self._get_max("skill", skill)
+
+    def max_rank(self, rank):
+        """As BbwPerson.max_rank on the crew"""
+        return self._get_max("rank", rank)
+
+    def max_stat(self, stat):
+        """As BbwPerson.max_stat on the crew"""
+        return self._get_max("stat", stat)
+
+
 class BbwSupplier(BbwPerson):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -1210,27 +991,39 @@ class BbwPersonFactory:
         "passenger, low": [700, 1300, 2200, 3900, 7200, 27000],
     }
 
-    _lib = [
-        BbwPerson(name="passenger, high", capacity=4, reinvest=False),
-        BbwPerson(name="passenger, middle", capacity=4, reinvest=False),
-        BbwPerson(name="passenger, basic", capacity=2, reinvest=False),
-        BbwPerson(name="passenger, low", capacity=2, reinvest=False),
-        BbwPerson(name="crew, pilot", capacity=2, salary_ticket=-6000, reinvest=False),
-        BbwPerson(name="crew, astrogator", capacity=2, salary_ticket=-5000, reinvest=False),
-        BbwPerson(name="crew, engineer", capacity=2, salary_ticket=-4000, reinvest=False),
-        BbwPerson(name="crew, steward", capacity=2, salary_ticket=-2000, reinvest=False),
-        BbwPerson(name="crew, medic", capacity=2, salary_ticket=-3000, reinvest=False),
-        BbwPerson(name="crew, gunner", capacity=2, salary_ticket=-1000, reinvest=False),
-        BbwPerson(name="crew, marine", capacity=2, salary_ticket=-1000, reinvest=False),
-        BbwPerson(name="crew, other", capacity=2, salary_ticket=-1000, reinvest=False),
-    ]
+    # (name, capacity, salary ticket)
+    _lib = None
+    _lib_data = (
+        ("passenger, high", 4, None),
+        ("passenger, middle", 4, None),
+        ("passenger, basic", 2, None),
+        ("passenger, low", 2, None),
+        ("crew, pilot", 2, -6000),
+        ("crew, astrogator", 2, -5000),
+        ("crew, engineer", 2, -4000),
+        ("crew, steward", 2, -2000),
+        ("crew, medic", 2, -3000),
+        ("crew, gunner", 2, -1000),
+        ("crew, marine", 2, -1000),
+        ("crew, other", 2, -1000),
+    )
+
+    @staticmethod
+    def lib():
+        """Templates of make. Built from _lib_data on first use"""
+        if BbwPersonFactory._lib is None:
+            BbwPersonFactory._lib = [
+                BbwPerson(name=name, capacity=capacity, salary_ticket=salary_ticket, reinvest=False)
+                for name, capacity, salary_ticket in BbwPersonFactory._lib_data
+            ]
+        return BbwPersonFactory._lib
 
     @staticmethod
     def make(name, n_sectors=1, count=None, salary_ticket=None, capacity=None):
         if count == 0:
             return None
 
-        item = copy.deepcopy(BbwUtils.get_objs(raw_list=BbwPersonFactory._lib, name=name, only_one=True)[0])
+        item = copy.deepcopy(BbwUtils.get_objs(raw_list=BbwPersonFactory.lib(), name=name, only_one=True)[0])
 
         if item.name() in BbwPersonFactory._tickets.keys():
             item.set_salary_ticket(BbwPersonFactory._tickets[item.name()][int(n_sectors) - 1])
@@ -0,0 +1,183 @@
+import heapq
+import math
+
+from cogst5.base import BbwObj
+from cogst5.item import BbwItemFactory
+from cogst5.vehicle import BbwSpaceShip
+from cogst5.world import BbwHexIndex, BbwWorld
+from cogst5.utils import *
+
+
+class BbwRoute:
+    """Multi-jump route planner
+
+    The state is (world, fuel) where fuel is counted in jump units (the fuel required for 1 parsec). At every world the
+    ship can refuel (see refuel_options) or jump to a world within min(j drive, fuel) parsecs. The cheapest path is
+    found with Dijkstra on the (world, fuel) graph (A* when we optimize for time). The jump graph of a container of
+    worlds is built with its BbwHexIndex and kept with it, until a world is added, removed or moved
+    """
+
+    _objectives = ["time", "fuel"]
+
+    @staticmethod
+    def graph(worlds, max_jump):
+        """Jump graph: (worlds, cube coords, adjacency lists [[(idx, parsecs)]])
+
+        worlds: a container (the charted space) or a list of worlds. Graphs of lists are not cached
+        """
+        if isinstance(worlds, BbwObj):
+            hex_index = BbwHexIndex.of(worlds)
+            if max_jump in hex_index.graphs:
+                return hex_index.graphs[max_jump]
+            worlds = [i for i in worlds.values() if isinstance(i, BbwWorld)]
+        else:
+            worlds = list(worlds)
+            hex_index = BbwHexIndex(worlds)
+
+        idx = {id(w): i for i, w in enumerate(worlds)}
+        cubes = [w.cube() for w in worlds]
+        adj = [[(idx[id(j)], d) for j, d in hex_index.worlds_within(w, max_jump) if d > 0] for w in worlds]
+
+        ans = (worlds, cubes, adj)
+        hex_index.graphs[max_jump] = ans
+        return ans
+
+    @staticmethod
+    def refuel_options(cs, w):
+        """[(source, price per ton, refining time per ton)] available to the ship on the world"""
+        ans = []
+        refiner_time = 1 / cs.fuel_refiner_speed() if cs.fuel_refiner_speed() > 0 else None
+        sp_idx = w.SP()[1]
+        if sp_idx in [0, 1]:
+            ans.append(("refined", BbwItemFactory.make(name="fuel, refined", count=1).value(), 0))
+        if sp_idx in [2, 3] and refiner_time is not None:
+            ans.append(("unrefined", BbwItemFactory.make(name="fuel, unrefined", count=1).value(), refiner_time))
+        if cs.has_fuel_scoop() and refiner_time is not None:
+            if w.gas_giants() > 0:
+                ans.append(("gas giant", 0, refiner_time))
+            if w.HYDRO()[1] > 0:
+                ans.append(("world", 0, refiner_time))
+        return ans
+
+    @staticmethod
+    def plan(cs, worlds, w0, w1, objective: str = "time", avoid_red: bool = True):
+        """Plan the route from w0 to w1
+
+        worlds: the charted space or a list of worlds (see graph)
+
+        objective: "time" minimizes the travel time (average jump time + refining time), "fuel" the fuel costs.
+        Ties are broken by the other one. Red zones are avoided as intermediate stops if avoid_red
+
+        Return: list of legs [(world from, world to, parsecs, refuel source, refuel tons, refuel cost, days)] or None if
+        there is no route
+        """
+        objective = BbwUtils.get_objs(raw_list=BbwRoute._objectives, name=objective, only_one=True)[0]
+
+        j_drive = cs.j_drive()
+        unit = BbwSpaceShip.j_drive_required_fuel(1)
+        max_fuel = int(cs.fuel_tank_capacity() // unit)
+        if j_drive <= 0 or max_fuel <= 0:
+            return None if w0 is not w1 else []
+
+        worlds, cubes, adj = BbwRoute.graph(worlds, j_drive)
+        idx = {id(w): i for i, w in enumerate(worlds)}
+        if id(w0) not in idx or id(w1) not in idx:
+            raise InvalidArgument(f"`{w0.name()}` and `{w1.name()}` must be in the charted space!")
+        start, end = idx[id(w0)], idx[id(w1)]
+
+        jump_time = BbwSpaceShip.j_drive_avg_time()
+
+        def cost(days, credits):
+            return (days, credits) if objective == "time" else (credits, days)
+
+        def h(i):
+            if objective != "time":
+                return 0
+            return math.ceil(BbwUtils.distance(*cubes[i], *cubes[end]) / j_drive) * jump_time
+
+        # best refuel option per world, the cost is linear in the tons
+        refuel = {}
+
+        def best_refuel(i):
+            if i not in refuel:
+                l = BbwRoute.refuel_options(cs, worlds[i])
+                refuel[i] = min(l, key=lambda x: cost(x[2], x[1])) if len(l) else None
+            return refuel[i]
+
+        s0 = (start, min(int(cs.refined_fuel() // unit), max_fuel))
+        best = {s0: (0, 0)}
+        prev = {}
+        q = [(h(start), cost(0, 0), s0)]
+        while len(q):
+            _, c, s = heapq.heappop(q)
+            days, credits = (c[0], c[1]) if objective == "time" else (c[1], c[0])
+            if best.get(s, None) != (days, credits):
+                continue
+            i, fuel = s
+            if i == end:
+                break
+
+            next_states = []
+            r = best_refuel(i)
+            if r is not None:
+                for f in range(fuel + 1, max_fuel + 1):
+                    tons = (f - fuel) * unit
+                    next_states.append(((i, f), days + tons * r[2], credits + tons * r[1], ("refuel", tons)))
+            for j, d in adj[i]:
+                if d > fuel:
+                    continue
+                if avoid_red and j != end and worlds[j].zone() == "red":
+                    continue
+                next_states.append(((j, fuel - d), days + jump_time, credits, ("jump", j, d)))
+
+            for ns, nd, nc, action in next_states:
+                if ns in best and cost(*best[ns]) <= cost(nd, nc):
+                    continue
+                best[ns] = (nd, nc)
+                prev[ns] = (s, action)
+                heapq.heappush(q, (cost(nd, nc)[0] + h(ns[0]), cost(nd, nc), ns))
+
+        ends = [s for s in best if s[0] == end]
+        if not len(ends):
+            return None
+        s = min(ends, key=lambda x: cost(*best[x]))
+
+        actions = []
+        while s in prev:
+            s, action = prev[s]
+            actions.append((s[0], action))
+
+        # refuels are merged with the following jump
+        ans = []
+        tons = 0
+        for i, action in reversed(actions):
+            if action[0] == "refuel":
+                tons += action[1]
+                continue
+            r = best_refuel(i)
+            source, price, t = (r[0], r[1] * tons, r[2] * tons) if tons else ("", 0, 0)
+            ans.append((worlds[i], worlds[action[1]], action[2], source, tons, price, t + jump_time))
+            tons = 0
+
+        return ans
+
+    @staticmethod
+    def table(legs):
+        """Header and table of the legs with the totals in the last row"""
+        h = ["from", "to", "parsecs", "refuel", "refuel (tons)", "refuel cost", "time (~)"]
+        t = [
+            [w0.name(), w1.name(), d, source, tons, price, BbwUtils.conv_days_2_time(days)]
+            for w0, w1, d, source, tons, price, days in legs
+        ]
+        t.append(
+            [
+                "total",
+                f"{len(legs)} jumps",
+                sum(i[2] for i in legs),
+                "",
+                sum(i[4] for i in legs),
+                sum(i[5] for i in legs),
+                BbwUtils.conv_days_2_time(sum(i[6] for i in legs)),
+            ]
+        )
+        return h, t
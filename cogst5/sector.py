@@ -0,0 +1,125 @@
+import ast
+import os
+import re
+
+from cogst5.world import BbwWorld
+from cogst5.base import *
+
+
+class BbwSector:
+    """Import of sector files
+
+    Supported formats (as exported by travellermap): T5 tab delimited and T5 column (SEC). In the column format the
+    header is followed by a line of dashes that gives the widths of the columns. Rows are streamed one by one and the
+    worlds are put in the charted space in one go at the end
+    """
+
+    _aliases = {"Z": "Zone"}
+    _zones = {"A": "amber", "U": "amber", "R": "red", "F": "red"}
+    _required_columns = ["Hex", "UWP"]
+
+    @staticmethod
+    def read_rows(lines):
+        """Stream the rows of a sector file as {column name: value}"""
+        lines = iter(lines)
+        header, split = None, None
+        for line in lines:
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+
+            if header is None:
+                if "\t" in line:
+                    header = line.split("\t")
+                    split = lambda l: l.split("\t")
+                else:
+                    dashes = next(lines, "")
+                    spans = [[m.start(), m.end()] for m in re.finditer(r"-+", dashes)]
+                    if not len(spans):
+                        raise InvalidArgument(f"unknown sector file format! Header: `{line}`")
+                    spans[-1][1] = None
+                    header = [line[a:b] for a, b in spans]
+                    split = lambda l: [l[a:b] for a, b in spans]
+
+                header = [i.strip() for i in header]
+                header = [BbwSector._aliases.get(i, i) for i in header]
+                missing = [i for i in BbwSector._required_columns if i not in header]
+                if len(missing):
+                    raise InvalidArgument(f"missing columns: `{', '.join(missing)}` in the sector file!")
+                continue
+
+            yield {k: v.strip() for k, v in zip(header, split(line))}
+
+    @staticmethod
+    def make_world(row, sector):
+        """Unnamed worlds are named after their hex. The gas giants are the last digit of the PBG"""
+        hex = row["Hex"]
+        pbg = row.get("PBG", "")
+        return BbwWorld(
+            name=row.get("Name", "") or hex,
+            uwp=row["UWP"],
+            zone=BbwSector._zones.get(row.get("Zone", ""), "normal"),
+            hex=hex,
+            sector=sector,
+            gas_giants=int(pbg[2], 36) if len(pbg) == 3 and pbg[2].isalnum() else 0,
+        )
+
+    @staticmethod
+    def parse_sector(sector):
+        """(x, y) from a pair of ints or a string like "(-4, 1)". The string is parsed as a literal, never run"""
+        if type(sector) is str:
+            try:
+                sector = ast.literal_eval(sector)
+            except (ValueError, SyntaxError):
+                raise InvalidArgument(f"sector `{sector}` must be two integers: (x, y)!")
+
+        if type(sector) not in [tuple, list] or len(sector) != 2 or any(type(i) is not int for i in sector):
+            raise InvalidArgument(f"sector `{sector}` must be two integers: (x, y)!")
+        return tuple(sector)
+
+    @staticmethod
+    def find_file(filename, dirs):
+        """Path of filename in the first of dirs that has it
+
+        Only names relative to dirs are accepted: no absolute paths, no `..` and no links that lead outside
+        """
+        parts = filename.replace("\\", "/").split("/")
+        if os.path.isabs(filename) or ".." in parts:
+            raise InvalidArgument(f"`{filename}`: only files in the save directory can be imported!")
+
+        for d in dirs:
+            p = os.path.join(d, filename)
+            if os.path.isfile(p) and os.path.realpath(p).startswith(os.path.join(os.path.realpath(d), "")):
+                return p
+        raise InvalidArgument(f"sector file `{filename}` not found in: `{', '.join(dirs)}`")
+
+    @staticmethod
+    def import_sector(charted_space, lines, sector):
+        """Add the worlds of a sector file to the charted space
+
+        Worlds with a name that is already taken and rows that cannot be read (e.g. unknown UWP) are skipped
+
+        Return: BbwRes of the new worlds, [(name or hex, reason)] of the skipped rows
+        """
+        sector = BbwSector.parse_sector(sector)
+
+        worlds, skipped = {}, []
+        for row in BbwSector.read_rows(lines):
+            try:
+                w = BbwSector.make_world(row, sector)
+            except (BambleweenyException, AttributeError, ValueError) as e:
+                skipped.append((row.get("Name", "") or row.get("Hex", ""), str(e)))
+                continue
+
+            if w.name() in charted_space or w.name() in worlds:
+                skipped.append((w.name(), "name already taken"))
+                continue
+            worlds[w.name()] = w
+
+        return charted_space.move_objs(worlds.values()), skipped
+
+    @staticmethod
+    def import_sector_file(charted_space, path, sector):
+        """As import_sector on a local file"""
+        with open(path, "r", encoding="utf-8-sig") as f:
+            return BbwSector.import_sector(charted_space, f, sector)
@@ -23,10 +23,12 @@ def __init__(self):
 
     def set_ship_curr(self, v: str = ""):
         if v == "":
+            self.mark_dirty("curr")
             self._ship_curr = ""
             return
 
-        res = self.fleet().get_objs(name=v, only_one=True)
+        res = self.fleet().get_objs(name=v, only_one=True, recursive=False)
+        self.mark_dirty("curr")
         self._ship_curr = res.objs()[0][0].name()
 
     @BbwUtils.set_if_not_present_decor
@@ -37,7 +39,7 @@ def get_ship_curr(self):
         if not self.ship_curr():
             raise InvalidArgument("curr ship not set!")
 
-        return self.fleet().get_objs(name=self.ship_curr(), only_one=True)[0]
+        return self.fleet().get_objs(name=self.ship_curr(), only_one=True, recursive=False)[0]
 
     def charted_space(self):
         return self._charted_space
@@ -45,10 +47,12 @@ def charted_space(self):
     def set_world_curr(self, v):
         v = str(v)
         if v == "":
+            self.mark_dirty("curr")
             self._world_curr = ""
             return
 
-        res = self.charted_space().get_objs(name=v, only_one=True)
+        res = self.charted_space().get_objs(name=v, only_one=True, recursive=False)
+        self.mark_dirty("curr")
         self._world_curr = res.objs()[0][0].name()
 
     def world_curr(self):
@@ -64,8 +68,8 @@ def get_worlds(self, w_to_name, w_from_name=None):
         if w_from_name is None:
             w0 = self.get_world()
         else:
-            w0 = self.charted_space().get_objs(name=w_from_name, only_one=True).objs()[0][0]
-        w1 = self.charted_space().get_objs(name=w_to_name, only_one=True).objs()[0][0]
+            w0 = self.charted_space().get_objs(name=w_from_name, only_one=True, recursive=False).objs()[0][0]
+        w1 = self.charted_space().get_objs(name=w_to_name, only_one=True, recursive=False).objs()[0][0]
         return w0, w1
 
     def charted_space(self):
@@ -91,6 +95,70 @@ def log(self):
             self.set_log()
         return self._log
 
-    def add_log_entry(self, description, value=0):
+    def add_log_entry(self, description, value=0, kind=None, name="", tons=0, cost=0):
+        """Entries with money (or a kind) go in the ledger too. See BbwLedger.add_entry"""
         self.log().add_entry(description=description, value=value, t=self.calendar().t())
         self.company().add_money(value)
+        if value or kind is not None:
+            self.company().ledger().add_entry(
+                self.calendar().t(), "other" if kind is None else kind, value, name=name, tons=tons, cost=cost
+            )
+
+    def dirty(self):
+        """Parts of the session data that the journal writes at the next flush even if they look the same"""
+        c = self._cache()
+        if c.dirty is None:
+            c.dirty = set()
+        return c.dirty
+
+    def mark_dirty(self, *k):
+        """Call it before changing the part k (see subtree) in a way the journal cannot see (see BbwJournal.deltas)"""
+        self.dirty().add(k)
+
+    def pop_dirty(self):
+        ans = self.dirty()
+        self._cache().dirty = None
+        return ans
+
+    def subtree(self, k):
+        """Get a part of the session data. k is a tuple: ("fleet", ship name), ("company",), ..."""
+        if k[0] in ["fleet", "charted_space"]:
+            c = getattr(self, f"_{k[0]}")
+            return c[k[1]] if len(k) > 1 else c
+        if k[0] == "curr":
+            return {"ship_curr": self.ship_curr(), "world_curr": self.world_curr()}
+        if k[0] == "log" and not hasattr(self, "_log"):
+            self.set_log()
+
+        return getattr(self, f"_{k[0]}")
+
+    def set_subtree(self, k, v):
+        if k[0] in ["fleet", "charted_space"] and len(k) > 1:
+            getattr(self, f"_{k[0]}")[k[1]] = v
+            return
+        if k[0] == "curr":
+            self._ship_curr, self._world_curr = v["ship_curr"], v["world_curr"]
+            return
+
+        setattr(self, f"_{k[0]}", v)
+
+    def del_subtree(self, k):
+        c = getattr(self, f"_{k[0]}")
+        if k[1] in c:
+            del c[k[1]]
+
+    def swap_subtree(self, k, v):
+        """Put v in place of the part k and return what was there. None: nothing (ships and worlds only)"""
+        try:
+            ans = self.subtree(k)
+        except KeyError:
+            ans = None
+
+        if v is None:
+            self.del_subtree(k)
+        else:
+            if k[0] == "log":
+                v.replace(ans)
+            self.set_subtree(k, v)
+        self.mark_dirty(*k)
+        return ans
@@ -0,0 +1,173 @@
+import asyncio
+import collections
+import contextvars
+import os
+
+from cogst5.history import BbwHistory
+from cogst5.journal import BbwJournal
+from cogst5.log import BbwLogArchive
+from cogst5.session_data import BbwSessionData
+
+
+class BbwCampaign:
+    """Session data of a table with its journal and the undo history"""
+
+    def __init__(self, key, path):
+        self.key = key
+        self.journal = BbwJournal(path)
+        self.history = BbwHistory()
+        self.session_data = None
+        # offers rolled by load_ship: (ship, world from, world to), [(kind, obj)]. Kept until loaded or travel
+        self.offers = None
+        self.size = 0
+        self.n_users = 0
+        self.lock = asyncio.Lock()
+
+    def load(self):
+        self.session_data = self.journal.load(default=BbwSessionData)
+        self.size = self.journal.size()
+        self.set_log_archive()
+
+    def set_log_archive(self):
+        """The full log of the campaign goes in `<session data>.log` next to the journal"""
+        path = f"{os.path.splitext(self.journal.path())[0]}.log"
+        self.session_data.subtree(("log",)).set_archive(BbwLogArchive(path))
+
+    def seal(self):
+        enc_data = self.journal.seal(self.session_data)
+        self.size = len(enc_data)
+        return enc_data
+
+
+class BbwSessionManager:
+    """Campaigns by (guild, channel)
+
+    Campaigns are loaded lazily from their directory (`<root><guild>/<channel>/`) and kept in a LRU. The key
+    (None, None) is the campaign in `<root>` itself. Every command is journaled, so dropping a campaign from memory is
+    always safe. When the loaded campaigns exceed the budget, the least recently used ones are compacted in the
+    background and dropped. The memory of a campaign is estimated with the size of its files
+    """
+
+    _budget = 256 * 2**20
+    _max_campaigns = 200
+    _default_filename = "session_data.json"
+    _key = contextvars.ContextVar("bbw_campaign_key", default=(None, None))
+
+    def __init__(self, root="save/"):
+        self._root = root
+        self._campaigns = collections.OrderedDict()
+        self._flushing = {}
+
+    @staticmethod
+    def set_current(guild=None, channel=None):
+        """The campaign used by the running command. Every command runs in its own task, so they do not interfere"""
+        BbwSessionManager._key.set((guild, channel))
+
+    @staticmethod
+    def current():
+        return BbwSessionManager._key.get()
+
+    def root(self):
+        return self._root
+
+    def campaign_dir(self, key=None):
+        if key is None:
+            key = BbwSessionManager.current()
+        guild, channel = key
+        if channel is None:
+            return self.root()
+        return f"{self.root()}{'dm' if guild is None else guild}/{channel}/"
+
+    def size(self):
+        return sum(i.size for i in self._campaigns.values())
+
+    def __len__(self):
+        return len(self._campaigns)
+
+    def __contains__(self, key):
+        return key in self._campaigns
+
+    def campaign(self, key=None):
+        """Get the campaign, loading it if necessary"""
+        if key is None:
+            key = BbwSessionManager.current()
+
+        if key in self._campaigns:
+            self._campaigns.move_to_end(key)
+            return self._campaigns[key]
+
+        c = BbwCampaign(key, f"{self.campaign_dir(key)}{BbwSessionManager._default_filename}")
+        c.load()
+        self._campaigns[key] = c
+        return c
+
+    async def acquire(self, key=None, name=""):
+        """Load the campaign without blocking the loop. It is not evicted until release
+
+        The changes are recorded for undo until release. Concurrent commands on a campaign are undone together. name
+        is what is shown on undo
+        """
+        if key is None:
+            key = BbwSessionManager.current()
+
+        if key in self._flushing:
+            await asyncio.shield(self._flushing[key])
+
+        if key not in self._campaigns:
+            c = BbwCampaign(key, f"{self.campaign_dir(key)}{BbwSessionManager._default_filename}")
+            await asyncio.get_running_loop().run_in_executor(None, c.load)
+            # someone else may have loaded it in the meantime
+            self._campaigns.setdefault(key, c)
+
+        c = self.campaign(key)
+        c.n_users += 1
+        if c.n_users == 1:
+            c.history.begin(c.session_data, name)
+        return c
+
+    def release(self, key=None):
+        """Record for undo and journal what changed. Compact or evict in background if needed"""
+        c = self.campaign(key)
+        c.n_users = max(0, c.n_users - 1)
+        if not c.n_users:
+            c.history.end(c.session_data)
+
+        c.journal.append(c.session_data)
+        if c.journal.needs_compaction() and not c.lock.locked():
+            asyncio.create_task(self.compact(c))
+
+        self.evict()
+
+    async def compact(self, c, backup_path=None):
+        """Write a snapshot and drop the journal. The file is written in a separate thread"""
+        async with c.lock:
+            enc_data = c.seal()
+            await asyncio.get_running_loop().run_in_executor(None, c.journal.write_snapshot, enc_data, backup_path)
+
+    def evict(self):
+        """Drop the least recently used campaigns that are not in use until we are within the budget"""
+        for key in list(self._campaigns.keys()):
+            if len(self) <= BbwSessionManager._max_campaigns and self.size() <= BbwSessionManager._budget:
+                return
+
+            c = self._campaigns[key]
+            if c.n_users or c.lock.locked():
+                continue
+
+            del self._campaigns[key]
+            if not c.journal.n_records():
+                continue
+
+            task = asyncio.create_task(self.compact(c))
+            self._flushing[key] = task
+            task.add_done_callback(lambda _, key=key, task=task: self._drop_flushing(key, task))
+
+    def _drop_flushing(self, key, task):
+        if self._flushing.get(key, None) is task:
+            del self._flushing[key]
+
+    async def flush(self):
+        """Compact all the loaded campaigns and wait for the pending ones. To be used at shutdown"""
+        await asyncio.gather(
+            *self._flushing.values(), *[self.compact(i) for i in self._campaigns.values() if i.journal.n_records()]
+        )
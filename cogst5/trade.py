@@ -1,9 +1,13 @@
-import copy
+import itertools
+import math
 
 from cogst5.person import *
 from cogst5.item import *
 from cogst5.world import *
 from cogst5.expr import *
+from cogst5.distribution import BbwDist
+from cogst5.route import BbwRoute
+from cogst5.vehicle import BbwSpaceShip
 
 
 class Good:
@@ -27,7 +31,8 @@ def ton_multi(self):
     def tons(self):
         return self._tons
 
-    def roll_tons(self, w=None, reason=""):
+    def tons_stats(self, w=None):
+        """Roll of the tons available on w (without ton_multi) and its average, min and max"""
         s = self.tons()
         avg0, min0, max0 = BbwUtils.avg_min_max(s)
         if w is not None:
@@ -37,6 +42,10 @@ def roll_tons(self, w=None, reason=""):
             if w.POP()[1] >= 9:
                 s += "+3"
                 avg0, min0, max0 = avg0 + 3, min0 + 3, max0 + 3
+        return s, avg0, min0, max0
+
+    def roll_tons(self, w=None, reason=""):
+        s, avg0, min0, max0 = self.tons_stats(w)
 
         if self.ton_multi() != 1:
             s = f"({s})*{self.ton_multi()}"
@@ -44,7 +53,7 @@ def roll_tons(self, w=None, reason=""):
             s += f"[{reason}]"
 
         r = BbwExpr()
-        r += d20.roll(s)
+        r.extend(BbwUtils.roll(s))
         return r, avg0, min0, max0
 
     def buy_mods(self):
@@ -54,6 +63,61 @@ def sell_mods(self):
         return self._sell_mods
 
 
+class GoodsTable:
+    """Column form of a list of goods, built once
+
+    - names, idx (name -> position), base prices, average of the ton rolls and ton multipliers
+    - buy_dms, sell_dms: {trade code or zone: [DM of every good or None]}. The DM of a good on a world is the max of
+    the DMs of the trade codes and the zone of the world (0 if there are none), as in BbwTrade._get_mod_st
+
+    A goods-by-world evaluation is then a few element-wise operations on these lists
+    """
+
+    def __init__(self, goods):
+        self.goods = goods
+        self.names = [i.name() for i in goods]
+        self.idx = {v: i for i, v in enumerate(self.names)}
+        self.base_prices = [BbwItemFactory.make(name=i).value(is_per_obj=True) for i in self.names]
+        self.avg_rolls = [i.tons_stats()[1] for i in goods]
+        self.ton_multis = [i.ton_multi() for i in goods]
+        self.is_illegal = ["illegal" in i for i in self.names]
+
+        tags = sorted({k for i in goods for k in [*i.buy_mods(), *i.sell_mods()]})
+        self.buy_dms = {k: [i.buy_mods().get(k, None) for i in goods] for k in tags}
+        self.sell_dms = {k: [i.sell_mods().get(k, None) for i in goods] for k in tags}
+
+    def __len__(self):
+        return len(self.goods)
+
+    def dms(self, w):
+        """(buy DMs, sell DMs) of all the goods on w. No world: no DMs"""
+
+        def merge(a, b):
+            return b if a is None else a if b is None else max(a, b)
+
+        buy, sell = [None] * len(self), [None] * len(self)
+        if w is not None:
+            for k in w.trade_codes() | {w.zone()}:
+                if k in self.buy_dms:
+                    buy = list(map(merge, buy, self.buy_dms[k]))
+                    sell = list(map(merge, sell, self.sell_dms[k]))
+        return [i or 0 for i in buy], [i or 0 for i in sell]
+
+    def avg_tons(self, w=None):
+        """Average tons of every good on w, as Good.tons_stats"""
+        pop = 5 if w is None else w.POP()[1]
+        dm = -3 if pop <= 3 else 3 if pop >= 9 else 0
+        return [max(i + dm, 0) * m for i, m in zip(self.avg_rolls, self.ton_multis)]
+
+    def available(self, w, is_illegal=False):
+        """Goods that can always be found on w (availability restrictions)"""
+        codes = w.trade_codes()
+        return [
+            (is_illegal or not self.is_illegal[i]) and (len(v.aval_restr()) == 0 or len(v.aval_restr() & codes) > 0)
+            for i, v in enumerate(self.goods)
+        ]
+
+
 @BbwUtils.for_all_methods(BbwUtils.type_sanitizer_decor)
 class BbwTrade:
     _passenger_wp_table = [[1, 5, 7, 16], [-4, 0, 1, 3]]
@@ -148,8 +212,37 @@ class BbwTrade:
         "profit/\ncr",
         "avg. profit/\nton",
         "tons avg\n(max)",
+        "profit/ton std\n10%/90%",
+    ]
+
+    _expected_revenue_header = [
+        "kind",
+        "count\nmean ± std",
+        "count\n10%/50%/90%",
+        "revenue\nmean ± std",
+        "revenue\n10%/50%/90%",
+    ]
+
+    _trade_scan_header = [
+        "destination",
+        "parsecs",
+        "days (~)",
+        "spt\nprofit",
+        "passengers\nrevenue",
+        "mail, freight\nrevenue",
+        "fuel, docking\ncosts",
+        "profit",
+        "profit/\nday",
     ]
 
+    _cargo_plan_header = ["kind", "available", "accepted", "income"]
+
+    # GoodsTable of _speculative_trading_table, see goods_table
+    _goods_table = None
+    # price multiplier distributions by (buy or sell, roll modifier) and mean traffic by (table, roll modifier)
+    _price_multi = {}
+    _mean_traffic = {}
+
     _speculative_trading_modified_price_buy_table = [
         [*range(-3, 25), 1000],
         [3, 2.5, 2, 1.75, 1.5, 1.35, *[i / 100 for i in range(125, 10, -5)]],
@@ -181,7 +274,7 @@ def conv(rl):
 
         nrolls = w.POP()[1]
         tt = BbwTrade._speculative_trading_table
-        rl = [BbwExpr()] * len(tt)
+        rl = [BbwExpr() for _ in tt]
 
         nlegals = len([i for i in tt if ("illegal" not in i.name())])
 
@@ -190,7 +283,7 @@ def conv(rl):
                 rl[i] += tt[i].roll_tons(w, reason="std")[0]
 
         for i in range(nrolls):
-            i = d20.roll(f"1d{nlegals}").total - 1
+            i = BbwUtils.roll(f"1d{nlegals}").total - 1
             rl[i] += tt[i].roll_tons(w, reason="rnd")[0]
 
         if not is_illegal:
@@ -200,7 +293,7 @@ def conv(rl):
             if len(tt[i].aval_restr()) == 0 or len(tt[i].aval_restr().intersection(w.trade_codes())):
                 rl[i] += tt[i].roll_tons(w, reason="std")[0]
 
-        i = d20.roll(f"1d{len(tt)-nlegals}").total - 1 + nlegals
+        i = BbwUtils.roll(f"1d{len(tt)-nlegals}").total - 1 + nlegals
         rl[i] += tt[i].roll_tons(None if "exotics, illegal" in tt[i].name() else w, reason="rnd")[0]
 
         return conv(rl)
@@ -219,54 +312,105 @@ def _get_mod_st(m, w):
 
     @staticmethod
     def get_deal_spt(name, broker: int, w, roll: str = "3d6"):
+        """With roll None only the modifiers are returned"""
         broker = int(broker)
 
-        obj = copy.deepcopy(
-            BbwUtils.get_objs(raw_list=BbwTrade._speculative_trading_table, name=name, only_one=True)[0]
-        )
+        obj = BbwUtils.get_objs(raw_list=BbwTrade._speculative_trading_table, name=name, only_one=True)[0]
 
         buy_r = BbwExpr()
-        buy_r += d20.roll(f"{roll} [base]")
+        if roll is not None:
+            buy_r.extend(BbwUtils.roll(f"{roll} [base]"))
 
-        buy_r += ("broker", broker)
-        sell_r = copy.deepcopy(buy_r)
+        buy_r.extend(("broker", broker))
+        sell_r = BbwExpr(buy_r)
 
-        buy_r += BbwTrade._get_mod_st(obj.buy_mods(), w)
-        buy_r -= BbwTrade._get_mod_st(obj.sell_mods(), w)
+        buy_r.extend(BbwTrade._get_mod_st(obj.buy_mods(), w))
+        buy_r.extend(BbwTrade._get_mod_st(obj.sell_mods(), w) * -1)
 
         buy_multi = BbwUtils.get_modifier(int(buy_r), BbwTrade._speculative_trading_modified_price_buy_table)
 
-        sell_r += BbwTrade._get_mod_st(obj.sell_mods(), w)
-        sell_r -= BbwTrade._get_mod_st(obj.buy_mods(), w)
+        sell_r.extend(BbwTrade._get_mod_st(obj.sell_mods(), w))
+        sell_r.extend(BbwTrade._get_mod_st(obj.buy_mods(), w) * -1)
 
         sell_multi = BbwUtils.get_modifier(int(sell_r), BbwTrade._speculative_trading_modified_price_sell_table)
         return buy_multi, buy_r, sell_multi, sell_r
 
+    @staticmethod
+    def get_deal_spt_dist(name, broker: int, w):
+        """Exact distributions of the buy and sell price multipliers of get_deal_spt"""
+        _, buy_r, _, sell_r = BbwTrade.get_deal_spt(name=name, broker=broker, w=w, roll=None)
+        buy_multi, _ = BbwTrade.price_multi(int(buy_r), True)
+        sell_multi, _ = BbwTrade.price_multi(int(sell_r), False)
+        return buy_multi, buy_r, sell_multi, sell_r
+
+    @staticmethod
+    def goods_table():
+        if BbwTrade._goods_table is None:
+            BbwTrade._goods_table = GoodsTable(BbwTrade._speculative_trading_table)
+        return BbwTrade._goods_table
+
+    @staticmethod
+    def price_multi(m, is_buy):
+        """Exact distribution of the price multiplier of a 3d6 + m roll and its mean. Cached"""
+        k = (bool(is_buy), int(m))
+        if k not in BbwTrade._price_multi:
+            t = (
+                BbwTrade._speculative_trading_modified_price_buy_table
+                if is_buy
+                else BbwTrade._speculative_trading_modified_price_sell_table
+            )
+            d = (BbwDist.dice(3) + int(m)).map(lambda x: BbwUtils.get_modifier(x, t))
+            BbwTrade._price_multi[k] = (d, float(d.mean()))
+        return BbwTrade._price_multi[k]
+
+    @staticmethod
+    def spt_profits(w_buy, w_sells, broker):
+        """Mean profit per ton of every good bought in w_buy and sold in every world of w_sells: [[profit]]"""
+        gt = BbwTrade.goods_table()
+        broker = int(broker)
+        buy_dms, sell_dms = gt.dms(w_buy)
+        buy = [BbwTrade.price_multi(broker + b - s, True)[1] * p for b, s, p in zip(buy_dms, sell_dms, gt.base_prices)]
+
+        ans = []
+        for w in w_sells:
+            buy_dms, sell_dms = gt.dms(w)
+            ans.append(
+                [
+                    BbwTrade.price_multi(broker + s - b, False)[1] * p - bp
+                    for b, s, p, bp in zip(buy_dms, sell_dms, gt.base_prices, buy)
+                ]
+            )
+        return ans
+
     @staticmethod
     def _evaluate_good_st(v, w0, w1, max_broker):
-        buy_multi, buy_mods, _, _ = BbwTrade.get_deal_spt(name=v.name(), broker=max_broker, w=w0, roll=9.5)
-        _, _, sell_multi, sell_mods = BbwTrade.get_deal_spt(name=v.name(), broker=max_broker, w=w1, roll=9.5)
+        buy_multi, buy_mods, _, _ = BbwTrade.get_deal_spt_dist(name=v.name(), broker=max_broker, w=w0)
+        _, _, sell_multi, sell_mods = BbwTrade.get_deal_spt_dist(name=v.name(), broker=max_broker, w=w1)
 
-        _, avg_t_buy, _, max_t_buy = v.roll_tons(w0)
-        _, avg_t_sell, _, max_t_sell = v.roll_tons(w1)
+        _, avg_t_buy, _, max_t_buy = v.tons_stats(w0)
+        _, avg_t_sell, _, max_t_sell = v.tons_stats(w1)
 
-        avg_diff = sell_multi - buy_multi
-        base_price = BbwItemFactory.make(name=v.name()).value(is_per_obj=True)
-        profit_per_ton = base_price * avg_diff
+        # buy and sell are independent rolls
+        diff = sell_multi - buy_multi
+        base_price = BbwTrade.goods_table().base_prices[BbwTrade.goods_table().idx[v.name()]]
+        profit_per_ton = diff * base_price
 
         return [
             v.name().replace(" ", "\n"),
             f"{str(buy_mods).replace(' ', '').replace('`','')}\n{str(sell_mods).replace(' ', '').replace('`','')}",
             base_price,
-            avg_diff,
-            profit_per_ton,
+            float(diff.mean()),
+            float(profit_per_ton.mean()),
             f"{avg_t_buy} ({max_t_buy})\n{avg_t_sell} ({max_t_sell})",
+            (
+                f"{profit_per_ton.std():.0f}\n"
+                f"{float(profit_per_ton.percentile(10)):.0f}/{float(profit_per_ton.percentile(90)):.0f}"
+            ),
         ]
 
     @staticmethod
     def optimize_spt(cs, w_buy=None, w_sell=None, filter=None, is_sorted=True, limit=5000):
-        crew = cs.get_objs("crew")
-        broker = BbwPerson.max_skill(crew, "broker")[0][1]
+        broker = cs.crew_profile().max_skill("broker")[0][1]
 
         l = [
             i
@@ -276,14 +420,7 @@ def optimize_spt(cs, w_buy=None, w_sell=None, filter=None, is_sorted=True, limit
 
         l = [BbwTrade._evaluate_good_st(v, w_buy, w_sell, broker) for v in l]
 
-        h = [
-            f"goods ",
-            f"buy DMs, \nsell DMs",
-            "base price/\nton",
-            "profit/\ncr",
-            "avg. profit/\nton",
-            "tons avg\n(max)",
-        ]
+        h = BbwTrade._speculative_trading_recap_header
 
         if is_sorted:
             l = sorted([i for i in l if i[4] > limit], key=lambda x: -x[4])
@@ -292,8 +429,7 @@ def optimize_spt(cs, w_buy=None, w_sell=None, filter=None, is_sorted=True, limit
 
     @staticmethod
     def optimize_jump_st(w0, w1, cs, supplier=None):
-        crew = cs.get_objs("crew")
-        max_broker = BbwPerson.max_skill(crew, "broker")[0][1]
+        max_broker = cs.crew_profile().max_skill("broker")[0][1]
 
         filter = (
             set(i.name() for i in BbwTrade._speculative_trading_table)
@@ -311,6 +447,264 @@ def optimize_jump_st(w0, w1, cs, supplier=None):
 
         return BbwTrade._speculative_trading_recap_header, l
 
+    @staticmethod
+    def _traffic_mean(mods, table):
+        """Mean number of passengers/lots of a traffic roll: 2d6 - 8 + mods -> table -> that many d6"""
+        k = (id(table), int(mods))
+        if k not in BbwTrade._mean_traffic:
+            d = (BbwDist.dice(2) - 8 + int(mods)).map(lambda x: BbwUtils.get_modifier(x, table))
+            BbwTrade._mean_traffic[k] = 3.5 * float(d.mean())
+        return BbwTrade._mean_traffic[k]
+
+    @staticmethod
+    def _fill_cargo(lots, cargo_tons):
+        """Greedy fill with the lots [(profit per ton, tons)] that pay more per ton. Return the profit of every lot"""
+        ans = [0] * len(lots)
+        for i in sorted(range(len(lots)), key=lambda i: -lots[i][0]):
+            profit_per_ton, tons = lots[i]
+            if profit_per_ton <= 0 or cargo_tons <= 0:
+                break
+            tons = min(tons, cargo_tons)
+            ans[i] = profit_per_ton * tons
+            cargo_tons -= tons
+        return ans
+
+    @staticmethod
+    def trade_scan(cs, w0, worlds, carouse_or_broker_or_streetwise_mod, SOC_mod, n_jumps=1, cargo_tons=None):
+        """Expected profit of a trip to every world within n_jumps jumps, best profit per day first
+
+        worlds: the charted space or a list of worlds (see BbwRoute.graph). A world is reachable if BbwRoute.plan finds
+        a route with at most n_jumps jumps: intermediate stops, refuels and refining time count in the days.
+
+        Profit: speculative goods (legal, available in w0, average tons), passengers, mail and freight minus fuel and
+        docking fee. Passengers take the free staterooms (lowberths for low passengers) best ticket first and their
+        luggage goes in the cargo. The rest of the cargo hold is filled with what pays more per ton. World DMs are
+        computed once per world and price multipliers once per roll modifier
+        """
+        n_jumps = int(n_jumps)
+        BbwUtils.test_geq("n jumps", n_jumps, 1)
+        if cargo_tons is None:
+            cargo_tons = sum(i.free_space() for i, _ in cs.get_objs(name="cargo").objs())
+
+        broker = cs.crew_profile().max_skill("broker")[0][1]
+
+        gt = BbwTrade.goods_table()
+        tons = [i if a else 0 for i, a in zip(gt.avg_tons(w0), gt.available(w0))]
+
+        fuel_price = min(
+            [i[1] for i in BbwRoute.refuel_options(cs, w0)],
+            default=BbwItemFactory.make(name="fuel, refined").value(is_per_obj=True),
+        )
+        mail = BbwUtils.get_objs(raw_list=BbwItemFactory.lib(), name="mail", only_one=True)[0]
+        freight = [
+            BbwUtils.get_objs(raw_list=BbwItemFactory.lib(), name=f"freight, {i}", only_one=True)[0]
+            for i in ["major", "minor", "incidental"]
+        ]
+
+        if isinstance(worlds, BbwObj):
+            hex_index = BbwHexIndex.of(worlds)
+        else:
+            worlds = list(worlds)
+            hex_index = BbwHexIndex(worlds)
+
+        max_parsecs = min(n_jumps * cs.j_drive(), len(BbwItemFactory._tickets))
+        dests = []
+        for w1, d in hex_index.worlds_within(w0, max_parsecs):
+            legs = BbwRoute.plan(cs, worlds, w0, w1) if d > 0 else None
+            if legs is not None and len(legs) <= n_jumps:
+                dests.append((w1, d, legs))
+
+        rooms = BbwTrade._free_space(cs, with_any_tags={"stateroom"})
+        berths = BbwTrade._free_space(cs, with_any_tags={"lowberth"})
+
+        t = []
+        profits = BbwTrade.spt_profits(w0, [w1 for w1, _, _ in dests], broker)
+        for (w1, d, legs), spt_profits in zip(dests, profits):
+            # passengers first, best ticket first: their luggage takes the cargo before the lots
+            free = {"stateroom": rooms, "lowberth": berths, "cargo": cargo_tons}
+            passengers = 0
+            for kind in ["high", "middle", "basic", "low"]:
+                person, mods = BbwTrade._passenger_traffic_mods(
+                    cs, carouse_or_broker_or_streetwise_mod, SOC_mod, kind, w0, w1
+                )
+                n = BbwTrade._traffic_mean(mods, BbwTrade._passenger_traffic_table)
+                room = "lowberth" if BbwUtils.has_any_tags(person, "low") else "stateroom"
+                caps = [(room, person.capacity(is_per_obj=True)), ("cargo", BbwTrade._luggage_tons(person))]
+                for k, cap in caps:
+                    if cap > 0:
+                        n = min(n, max(free[k], 0) / cap)
+                for k, cap in caps:
+                    free[k] -= n * cap
+                passengers += n * person.salary_ticket(is_per_obj=True)
+
+            lots = list(zip(spt_profits, tons))
+
+            ticket = BbwItemFactory._tickets[d - 1]
+            for item in freight:
+                _, mods = BbwTrade._freight_traffic_mods(
+                    carouse_or_broker_or_streetwise_mod, SOC_mod, item.name(), w0, w1
+                )
+                n_lots = BbwTrade._traffic_mean(mods, BbwTrade._passenger_traffic_table)
+                lots.append((ticket, n_lots * 3.5 * item.capacity(is_per_obj=True)))
+
+            n_mail = BbwTrade.find_mail_dist(cs, carouse_or_broker_or_streetwise_mod, SOC_mod, w0, w1).mean()
+            lots.append((mail.value() / mail.capacity(), float(n_mail) * mail.capacity(is_per_obj=True)))
+
+            lot_profits = BbwTrade._fill_cargo(lots, free["cargo"])
+            spt, mail_and_freight = sum(lot_profits[: len(gt)]), sum(lot_profits[len(gt) :])
+
+            parsecs = sum(i[2] for i in legs)
+            costs = BbwSpaceShip.j_drive_required_fuel(parsecs) * fuel_price + w1.docking_fee()
+            profit = spt + passengers + mail_and_freight - costs
+            days = sum(i[6] for i in legs)
+            t.append([w1.name(), d, days, spt, passengers, mail_and_freight, costs, profit, profit / days])
+
+        t = sorted(t, key=lambda x: -x[-1])
+        t = [[*i[:2], BbwUtils.conv_days_2_time(i[2]), *[round(j) for j in i[3:]]] for i in t]
+        return BbwTrade._trade_scan_header, t
+
+    @staticmethod
+    def _free_space(cs, name=None, with_any_tags=set()):
+        return sum(i.free_space() for i, _ in cs.get_objs(name=name, with_any_tags=with_any_tags).objs())
+
+    @staticmethod
+    def _n_fit(count, space, cap):
+        if cap <= 0:
+            return int(count)
+        return max(0, min(int(count), int((space + 1e-9) // cap)))
+
+    @staticmethod
+    def _fit_in_order(spaces, lots):
+        """Place the lots [(size of one, count)] one after the other as dist_obj does: every container in turn takes
+        as many as fit. Return the counts placed"""
+        spaces, ans = list(spaces), []
+        for size, count in lots:
+            if size <= 0:
+                ans.append(count)
+                continue
+            n = 0
+            for i, space in enumerate(spaces):
+                k = BbwTrade._n_fit(count - n, space, size)
+                spaces[i] -= k * size
+                n += k
+            ans.append(n)
+        return ans
+
+    @staticmethod
+    def _luggage_tons(person):
+        for i in ["high", "middle"]:
+            if f"passenger, {i}" in person.name():
+                luggage = BbwUtils.get_objs(raw_list=BbwItemFactory.lib(), name=f"luggage, {i}", only_one=True)[0]
+                return luggage.capacity(is_per_obj=True)
+        return 0
+
+    @staticmethod
+    def plan_cargo(cs, offers):
+        """Choose the passengers, mail canisters and freight lots that give the highest income. Nothing is modified
+
+        offers: [(kind, obj)] with obj as returned by find_passengers, find_mail and find_freight (None: no offer).
+        Passengers need a stateroom (lowberth for low passengers) and high and middle passengers bring their luggage in
+        the cargo. Mail is all or nothing and freight lots cannot be split. Free space is summed over the containers.
+
+        Cargo is a knapsack over the tons (one group per offer). The passengers with luggage are enumerated and the
+        ones without fill the rooms that are left, best ticket per room first. A lot must fit in one cargo hold: the
+        choice is placed in the holds in the order of the offers, as it is loaded, and what does not fit is dropped
+
+        Return: [(kind, obj, accepted count, income)] in the order of offers
+        """
+        rooms = max(BbwTrade._free_space(cs, with_any_tags={"stateroom"}), 0)
+        berths = max(BbwTrade._free_space(cs, with_any_tags={"lowberth"}), 0)
+        holds = [i.free_space() for i, _ in cs.get_objs(name="cargo").objs()]
+        cargo = max(sum(holds), 0)
+
+        luggage_p, room_p, berth_p, lots = [], [], [], []
+        for idx, (_, obj) in enumerate(offers):
+            if obj is None or obj.count() == 0:
+                continue
+            if not isinstance(obj, BbwPerson):
+                lots.append(idx)
+            elif BbwUtils.has_any_tags(obj, "low"):
+                berth_p.append(idx)
+            elif BbwTrade._luggage_tons(obj):
+                luggage_p.append(idx)
+            else:
+                room_p.append(idx)
+
+        def per_obj(idx):
+            obj = offers[idx][1]
+            if isinstance(obj, BbwPerson):
+                return obj.capacity(is_per_obj=True), obj.salary_ticket(is_per_obj=True)
+            return math.ceil(obj.capacity(is_per_obj=True)), obj.value(is_per_obj=True)
+
+        def fill(idxs, space, ans):
+            income = 0
+            for idx in sorted(idxs, key=lambda i: -per_obj(i)[1] / max(per_obj(i)[0], 1e-9)):
+                cap, ticket = per_obj(idx)
+                ans[idx] = BbwTrade._n_fit(offers[idx][1].count(), space, cap)
+                space -= ans[idx] * cap
+                income += ans[idx] * ticket
+            return income
+
+        # cargo knapsack: best[c] is the best income with c tons
+        max_tons = int(min(cargo, sum(per_obj(idx)[0] * offers[idx][1].count() for idx in lots)) + 1e-9)
+        best, choices = [0] * (max_tons + 1), []
+        for idx in lots:
+            size, value = per_obj(idx)
+            count = int(offers[idx][1].count())
+            ks = [count] if "mail" in offers[idx][1].name() else range(1, count + 1)
+            new, choice = list(best), [0] * (max_tons + 1)
+            for k in ks:
+                w, v = k * size, k * value
+                for c in range(w, max_tons + 1):
+                    if best[c - w] + v > new[c]:
+                        new[c], choice[c] = best[c - w] + v, k
+            best = new
+            choices.append((idx, size, choice))
+
+        ans = [0] * len(offers)
+        best_income, best_ks = -1, None
+        ranges = [range(BbwTrade._n_fit(offers[idx][1].count(), rooms, per_obj(idx)[0]) + 1) for idx in luggage_p]
+        for ks in itertools.product(*ranges):
+            free_rooms = rooms - sum(k * per_obj(idx)[0] for idx, k in zip(luggage_p, ks))
+            free_tons = cargo - sum(k * BbwTrade._luggage_tons(offers[idx][1]) for idx, k in zip(luggage_p, ks))
+            if free_rooms < 0 or free_tons < -1e-9:
+                continue
+            income = sum(k * per_obj(idx)[1] for idx, k in zip(luggage_p, ks))
+            income += fill(room_p, free_rooms, ans) + best[int(min(max_tons, free_tons + 1e-9))]
+            if income > best_income:
+                best_income, best_ks = income, (ks, free_rooms, free_tons)
+
+        ks, free_rooms, free_tons = best_ks
+        for idx, k in zip(luggage_p, ks):
+            ans[idx] = k
+        fill(room_p, free_rooms, ans)
+        fill(berth_p, berths, ans)
+        c = int(min(max_tons, free_tons + 1e-9))
+        for idx, size, choice in reversed(choices):
+            ans[idx] = choice[c]
+            c -= choice[c] * size
+
+        # luggage goes in the holds with the passengers, lots in the order of offers
+        sizes = [0] * len(offers)
+        for idx, (_, obj) in enumerate(offers):
+            if ans[idx]:
+                sizes[idx] = obj.capacity(is_per_obj=True) if idx in lots else BbwTrade._luggage_tons(obj)
+        placed = BbwTrade._fit_in_order(holds, list(zip(sizes, ans)))
+        for idx, n in enumerate(placed):
+            if n < ans[idx]:
+                ans[idx] = 0 if "mail" in offers[idx][1].name() else n
+
+        return [
+            (kind, obj, ans[idx], ans[idx] * per_obj(idx)[1] if ans[idx] else 0)
+            for idx, (kind, obj) in enumerate(offers)
+        ]
+
+    @staticmethod
+    def plan_cargo_table(plan):
+        t = [[kind, 0 if obj is None else obj.count(), n, round(income)] for kind, obj, n, income in plan]
+        t.append(["total", sum(i[1] for i in t), sum(i[2] for i in t), sum(i[3] for i in t)])
+        return BbwTrade._cargo_plan_header, t
+
     @staticmethod
     def find_passengers(cs, carouse_or_broker_or_streetwise_mod, SOC_mod, kind, w0, w1):
         """
@@ -320,10 +714,37 @@ def find_passengers(cs, carouse_or_broker_or_streetwise_mod, SOC_mod, kind, w0,
         - w0: departure world data (pop, starport, zone)
         - w1: arrival world data (pop, starport, zone)
         """
+        person, mods = BbwTrade._passenger_traffic_mods(cs, carouse_or_broker_or_streetwise_mod, SOC_mod, kind, w0, w1)
+
+        r = BbwExpr()
+        r.extend(BbwUtils.roll("2d6-8 [avg. ck]"))
+        r.extend(mods)
+
+        nd = BbwUtils.get_modifier(int(r), BbwTrade._passenger_traffic_table)
+        nd = BbwExpr(BbwUtils.roll(f"{nd}d6"))
+
+        if int(nd) <= 0:
+            return None, r
+
+        person.set_count(int(nd))
+        return person, r
+
+    @staticmethod
+    def find_passengers_dist(cs, carouse_or_broker_or_streetwise_mod, SOC_mod, kind, w0, w1):
+        """Exact distribution of the number of passengers of find_passengers"""
+        person, mods = BbwTrade._passenger_traffic_mods(cs, carouse_or_broker_or_streetwise_mod, SOC_mod, kind, w0, w1)
+
+        nd = (BbwDist.dice(2) - 8 + int(mods)).map(
+            lambda x: BbwUtils.get_modifier(x, BbwTrade._passenger_traffic_table)
+        )
+        return person, nd.bind(BbwDist.dice)
+
+    @staticmethod
+    def _passenger_traffic_mods(cs, carouse_or_broker_or_streetwise_mod, SOC_mod, kind, w0, w1):
+        """Passenger (count not set) and modifiers of the passenger traffic roll"""
         carouse_or_broker_or_streetwise_mod, SOC_mod = int(carouse_or_broker_or_streetwise_mod), int(SOC_mod)
 
-        crew = cs.get_objs("crew")
-        max_steward = BbwPerson.max_skill(crew, "steward")[0][1]
+        max_steward = cs.crew_profile().max_skill("steward")[0][1]
 
         n_sectors = BbwWorld.distance(w0, w1)
         BbwUtils.test_geq("sectors", n_sectors, 1)
@@ -331,32 +752,24 @@ def find_passengers(cs, carouse_or_broker_or_streetwise_mod, SOC_mod, kind, w0,
         person = BbwPersonFactory.make(name=kind, n_sectors=n_sectors)
 
         r = BbwExpr()
-        r += d20.roll("2d6-8 [avg. ck]")
 
         if "high" in person.name():
-            r += ("base", -4)
+            r.extend(("base", -4))
 
         if "low" in person.name():
-            r += ("base", 1)
+            r.extend(("base", 1))
 
-        r += ("streetwise/carouse/broker", carouse_or_broker_or_streetwise_mod)
-        r += ("SOC", SOC_mod)
-        r += ("max steward", max_steward)
+        r.extend(("streetwise/carouse/broker", carouse_or_broker_or_streetwise_mod))
+        r.extend(("SOC", SOC_mod))
+        r.extend(("max steward", max_steward))
 
         for w in [w0, w1]:
-            r += (f"pop ({w.name()})", BbwUtils.get_modifier(w.POP()[1], BbwTrade._passenger_wp_table))
-            r += (f"starpt ({w.name()})", BbwUtils.get_modifier(w.SP()[1], BbwTrade._passenger_starport_table))
-            r += (f"zone ({w.name()})", BbwTrade._passenger_zone_dict[w.zone()])
-
-        r += ("dist.", (1 - n_sectors))
+            r.extend((f"pop ({w.name()})", BbwUtils.get_modifier(w.POP()[1], BbwTrade._passenger_wp_table)))
+            r.extend((f"starpt ({w.name()})", BbwUtils.get_modifier(w.SP()[1], BbwTrade._passenger_starport_table)))
+            r.extend((f"zone ({w.name()})", BbwTrade._passenger_zone_dict[w.zone()]))
 
-        nd = BbwUtils.get_modifier(int(r), BbwTrade._passenger_traffic_table)
-        nd = BbwExpr(d20.roll(f"{nd}d6"))
-
-        if int(nd) <= 0:
-            return None, r
+        r.extend(("dist.", (1 - n_sectors)))
 
-        person.set_count(int(nd))
         return person, r
 
     @staticmethod
@@ -368,6 +781,23 @@ def _freight_traffic_table_roll(brocker_or_streetwise_mod, SOC_mod, kind, w0, w1
         - w0: departure world data (pop, starport, TL, zone)
         - w1: arrival world data (pop, starport, TL, zone)
         """
+        n_sectors, mods = BbwTrade._freight_traffic_mods(brocker_or_streetwise_mod, SOC_mod, kind, w0, w1)
+
+        r = BbwExpr()
+        r.extend(BbwUtils.roll("2d6-8 [avg. ck]"))
+        r.extend(mods)
+
+        return n_sectors, r
+
+    @staticmethod
+    def _freight_traffic_table_dist(brocker_or_streetwise_mod, SOC_mod, kind, w0, w1):
+        """Exact distribution of the freight traffic roll"""
+        n_sectors, mods = BbwTrade._freight_traffic_mods(brocker_or_streetwise_mod, SOC_mod, kind, w0, w1)
+        return n_sectors, BbwDist.dice(2) - 8 + int(mods)
+
+    @staticmethod
+    def _freight_traffic_mods(brocker_or_streetwise_mod, SOC_mod, kind, w0, w1):
+        """Modifiers of the freight traffic roll"""
         brocker_or_streetwise_mod, SOC_mod = int(brocker_or_streetwise_mod), int(SOC_mod)
 
         n_sectors = BbwWorld.distance(w0, w1)
@@ -378,24 +808,23 @@ def _freight_traffic_table_roll(brocker_or_streetwise_mod, SOC_mod, kind, w0, w1
         )[0]
 
         r = BbwExpr()
-        r += d20.roll("2d6-8 [avg. ck]")
 
         if kind == "freight, major":
-            r += ("base", -4)
+            r.extend(("base", -4))
 
         if kind == "freight, incidental":
-            r += ("base", 2)
+            r.extend(("base", 2))
 
-        r += ("streetwise/broker", brocker_or_streetwise_mod)
-        r += ("SOC", SOC_mod)
+        r.extend(("streetwise/broker", brocker_or_streetwise_mod))
+        r.extend(("SOC", SOC_mod))
 
         for w in [w0, w1]:
-            r += (f"pop ({w.name()})", BbwUtils.get_modifier(w.POP()[1], BbwTrade._freight_wp_table))
-            r += (f"starpt ({w.name()})", BbwUtils.get_modifier(w.SP()[1], BbwTrade._freight_starport_table))
-            r += (f"zone ({w.name()})", BbwTrade._freight_zone_dict[w.zone()])
-            r += (f"TL ({w.name()})", BbwUtils.get_modifier(w.TL()[1], BbwTrade._freight_TL_table))
+            r.extend((f"pop ({w.name()})", BbwUtils.get_modifier(w.POP()[1], BbwTrade._freight_wp_table)))
+            r.extend((f"starpt ({w.name()})", BbwUtils.get_modifier(w.SP()[1], BbwTrade._freight_starport_table)))
+            r.extend((f"zone ({w.name()})", BbwTrade._freight_zone_dict[w.zone()]))
+            r.extend((f"TL ({w.name()})", BbwUtils.get_modifier(w.TL()[1], BbwTrade._freight_TL_table)))
 
-        r += ("dist.", 1 - n_sectors)
+        r.extend(("dist.", 1 - n_sectors))
 
         return n_sectors, r
 
@@ -415,29 +844,46 @@ def find_mail(
         - w1: arrival world data (pop, starport, TL, zone)
         """
 
-        crew = cs.get_objs("crew")
-        max_naval_or_scout_rank = max(BbwPerson.max_rank(crew, "navy")[0][1], BbwPerson.max_rank(crew, "scout")[0][1])
+        n_sectors, rft = BbwTrade._freight_traffic_table_roll(brocker_or_streetwise_mod, SOC_mod, "mail", w0, w1)
+        r = BbwExpr()
+        r.extend(BbwUtils.roll("2d6-12 [mail. ck]"))
+        r.extend(("freight table", BbwUtils.get_modifier(int(rft), BbwTrade._freight_traffic_table_2_mail_table)))
+        r.extend(BbwTrade._mail_mods(cs, SOC_mod, w0, w1))
 
-        max_SOC_mod = max(SOC_mod, BbwPerson.max_stat(crew, "SOC")[0][1])
+        if int(r) < 0:
+            return None, r, rft
+
+        nd = BbwExpr(BbwUtils.roll(f"1d6"))
+        return BbwItemFactory.make(name="mail", count=int(nd)), r, rft
+
+    @staticmethod
+    def find_mail_dist(cs, brocker_or_streetwise_mod, SOC_mod, w0, w1):
+        """Exact distribution of the number of mail canisters of find_mail (0: not qualified)"""
+        _, rft = BbwTrade._freight_traffic_table_dist(brocker_or_streetwise_mod, SOC_mod, "mail", w0, w1)
+        mods = int(BbwTrade._mail_mods(cs, SOC_mod, w0, w1))
+        ck = BbwDist.dice(2) - 12 + mods
+
+        r = rft.bind(lambda x: ck + BbwUtils.get_modifier(x, BbwTrade._freight_traffic_table_2_mail_table))
+        return r.map(lambda x: x >= 0).bind(lambda x: BbwDist.dice(1) if x else BbwDist.const(0))
+
+    @staticmethod
+    def _mail_mods(cs, SOC_mod, w0, w1):
+        crew = cs.crew_profile()
+        max_naval_or_scout_rank = max(crew.max_rank("navy")[0][1], crew.max_rank("scout")[0][1])
+
+        max_SOC_mod = max(SOC_mod, crew.max_stat("SOC")[0][1])
 
-        n_sectors, rft = BbwTrade._freight_traffic_table_roll(brocker_or_streetwise_mod, SOC_mod, "mail", w0, w1)
         r = BbwExpr()
-        r += d20.roll("2d6-12 [mail. ck]")
-        r += ("freight table", BbwUtils.get_modifier(int(rft), BbwTrade._freight_traffic_table_2_mail_table))
-        r += ("max SOC", max_SOC_mod)
-        r += ("max navy/scout", max_naval_or_scout_rank)
+        r.extend(("max SOC", max_SOC_mod))
+        r.extend(("max navy/scout", max_naval_or_scout_rank))
 
         for w in [w0, w1]:
-            r += (f"TL ({w.name()})", BbwUtils.get_modifier(w.TL()[1], BbwTrade._mail_TL_table))
+            r.extend((f"TL ({w.name()})", BbwUtils.get_modifier(w.TL()[1], BbwTrade._mail_TL_table)))
 
         if cs.is_armed():
-            r += ("armed", 2)
+            r.extend(("armed", 2))
 
-        if int(r) < 0:
-            return None, r, rft
-
-        nd = BbwExpr(d20.roll(f"1d6"))
-        return BbwItemFactory.make(name="mail", count=int(nd)), r, rft
+        return r
 
     @staticmethod
     def find_freight(
@@ -456,10 +902,58 @@ def find_freight(
         """
         n_sectors, r = BbwTrade._freight_traffic_table_roll(brocker_or_streetwise_mod, SOC_mod, kind, w0, w1)
         nd = BbwUtils.get_modifier(int(r), BbwTrade._passenger_traffic_table)
-        nd = BbwExpr(d20.roll(f"{nd}d6"))
+        nd = BbwExpr(BbwUtils.roll(f"{nd}d6"))
 
         return BbwItemFactory.make(name=kind, count=int(nd), n_sectors=n_sectors), r
 
+    @staticmethod
+    def find_freight_dist(brocker_or_streetwise_mod, SOC_mod, kind, w0, w1):
+        """Exact distributions of find_freight: number of lots, tons per lot and revenue"""
+        n_sectors, r = BbwTrade._freight_traffic_table_dist(brocker_or_streetwise_mod, SOC_mod, kind, w0, w1)
+        nd = r.map(lambda x: BbwUtils.get_modifier(x, BbwTrade._passenger_traffic_table)).bind(BbwDist.dice)
+
+        item = BbwUtils.get_objs(raw_list=BbwItemFactory.lib(), name=kind, only_one=True)[0]
+        tons_per_lot = BbwDist.dice(1) * item.capacity(is_per_obj=True)
+        # all the lots have the same size
+        revenue = nd * tons_per_lot * BbwItemFactory._tickets[int(n_sectors) - 1]
+        return nd, tons_per_lot, revenue
+
+    @staticmethod
+    def _expected_revenue_row(name, nd, revenue):
+        def pp(d):
+            return "/".join(f"{float(d.percentile(i)):.0f}" for i in [10, 50, 90])
+
+        return [
+            name,
+            f"{float(nd.mean()):.1f} ± {nd.std():.1f}",
+            pp(nd),
+            f"{float(revenue.mean()):.0f} ± {revenue.std():.0f}",
+            pp(revenue),
+        ]
+
+    @staticmethod
+    def expected_passengers(cs, carouse_or_broker_or_streetwise_mod, SOC_mod, w0, w1):
+        """Exact statistics of load_passengers, assuming that everybody can embark"""
+        t = []
+        for i in ["high", "middle", "basic", "low"]:
+            person, nd = BbwTrade.find_passengers_dist(cs, carouse_or_broker_or_streetwise_mod, SOC_mod, i, w0, w1)
+            t.append(BbwTrade._expected_revenue_row(i, nd, nd * person.salary_ticket(is_per_obj=True)))
+
+        return BbwTrade._expected_revenue_header, t
+
+    @staticmethod
+    def expected_mail_and_freight(cs, brocker_or_streetwise_mod, SOC_mod, w0, w1):
+        """Exact statistics of find_mail_and_freight, assuming that everything can be loaded"""
+        nd = BbwTrade.find_mail_dist(cs, brocker_or_streetwise_mod, SOC_mod, w0, w1)
+        mail = BbwUtils.get_objs(raw_list=BbwItemFactory.lib(), name="mail", only_one=True)[0]
+        t = [BbwTrade._expected_revenue_row("mail", nd, nd * mail.value(is_per_obj=True))]
+
+        for i in ["major", "minor", "incidental"]:
+            nd, _, revenue = BbwTrade.find_freight_dist(brocker_or_streetwise_mod, SOC_mod, i, w0, w1)
+            t.append(BbwTrade._expected_revenue_row(i, nd, revenue))
+
+        return BbwTrade._expected_revenue_header, t
+
 
 # w1 = BbwWorld(name="enope", uwp="C411988-7", zone="normal", hex="2205", sector=(-4, 1))
 # # # w0 = BbwWorld(name="boughene", uwp="A8B3531D", zone="normal", hex="1904", sector=(-4, 1))
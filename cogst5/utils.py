@@ -1,7 +1,9 @@
 from cogst5.models.errors import *
 from tabulate import tabulate
 
+import ast
 import bisect
+import functools
 import lorem
 import random
 import d20
@@ -13,6 +15,7 @@
 
 class BbwUtils:
     _msg_divisor = "__                                                                          __\n"
+    _roller = d20.Roller()
 
     @staticmethod
     def set_if_not_present_decor(func):
@@ -26,33 +29,67 @@ def wrapper(self, *args, **kwargs):
         return wrapper
 
     @staticmethod
-    def type_sanitizer_decor(func):
-        def wrapper(*args, **kwargs):
-            def convert(t, val):
-                if t is None or val is None or t is type(val):
-                    return val
+    def _sanitizer_converter(t):
+        """Converter for the annotation t. None if no conversion is needed"""
+        if t is None or t is str:
+            return None
 
-                if t is int:
-                    return int(val)
-                if t is float:
-                    return float(val)
-                if t is bool:
-                    if type(val) is str:
-                        if val.lower() == "true":
-                            return True
-                        if val.lower() == "false":
-                            return False
-                    return bool(int(val))
+        if t is int or t is float:
 
+            def convert(val):
+                return val if val is None or type(val) is t else t(val)
+
+        elif t is bool:
+
+            def convert(val):
+                if val is None or type(val) is bool:
+                    return val
                 if type(val) is str:
-                    return eval(val)
+                    if val.lower() == "true":
+                        return True
+                    if val.lower() == "false":
+                        return False
+                return bool(int(val))
 
+        else:
+
+            def convert(val):
+                if type(val) is str:
+                    return ast.literal_eval(val)
                 return val
 
-            args = [
-                convert(func.__annotations__.get(var, None), arg) for arg, var in zip(args, func.__code__.co_varnames)
-            ]
-            kwargs = {k: convert(func.__annotations__.get(k, None), v) for k, v in kwargs.items()}
+        return convert
+
+    @staticmethod
+    def type_sanitizer_decor(func):
+        """Convert the annotated arguments to their type (discord passes everything as strings)
+
+        The converters are built once, here. Functions without annotated arguments are returned as they are
+        """
+        annotations = {k: v for k, v in getattr(func, "__annotations__", {}).items() if k != "return"}
+        converters = {k: BbwUtils._sanitizer_converter(v) for k, v in annotations.items()}
+        converters = {k: v for k, v in converters.items() if v is not None}
+        if not len(converters):
+            return func
+
+        code = func.__code__
+        pos_converters = [
+            (i, converters[k]) for i, k in enumerate(code.co_varnames[: code.co_argcount]) if k in converters
+        ]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            n = len(args)
+            if pos_converters and n > pos_converters[0][0]:
+                args = list(args)
+                for i, convert in pos_converters:
+                    if i >= n:
+                        break
+                    args[i] = convert(args[i])
+            if kwargs:
+                for k, v in kwargs.items():
+                    if k in converters:
+                        kwargs[k] = converters[k](v)
             return func(*args, **kwargs)
 
         return wrapper
@@ -60,9 +97,11 @@ def convert(t, val):
     @staticmethod
     def for_all_methods(decorator):
         def decorate(cls):
-            for attr in cls.__dict__:  # there's propably a better way to do this
-                if callable(getattr(cls, attr)):
-                    setattr(cls, attr, decorator(getattr(cls, attr)))
+            for attr, v in list(cls.__dict__.items()):
+                if isinstance(v, (staticmethod, classmethod)):
+                    setattr(cls, attr, type(v)(decorator(v.__func__)))
+                elif callable(v):
+                    setattr(cls, attr, decorator(v))
             return cls
 
         return decorate
@@ -98,7 +137,7 @@ def test_hexstr(k, v, n):
             raise InvalidArgument(f"{k}: {v} must be a str!")
 
         if len(v) not in n:
-            raise InvalidArgument(f"{k}: {v} len must be {','.join(n)}!")
+            raise InvalidArgument(f"{k}: {v} len must be {','.join(str(i) for i in n)}!")
 
         for i in v:
             BbwUtils.test_geq(k, int(i, 36), 0)
@@ -166,6 +205,37 @@ def to_d20_roll(v: str):
             v = BbwUtils.conv_traveller_2_d20(v)
         return v
 
+    @staticmethod
+    @functools.lru_cache(maxsize=512)
+    def _parse_roll(expr, allow_comments):
+        return BbwUtils._roller.parse(expr, allow_comments=allow_comments)
+
+    @staticmethod
+    def parse_roll(expr: str, allow_comments=False):
+        """d20 AST of expr. Shared by everyone: the same expression is parsed once
+
+        d20 caches only the expressions without comments, per roller. The ASTs are never changed by a roll
+        """
+        return BbwUtils._parse_roll(expr, bool(allow_comments))
+
+    @staticmethod
+    def roll(expr, allow_comments=False, advantage=d20.AdvType.NONE, stringifier=None, roller=None):
+        """As d20.roll. expr can be a string or an AST"""
+        if roller is None:
+            roller = BbwUtils._roller
+        if type(expr) is str:
+            expr = BbwUtils.parse_roll(expr, allow_comments)
+        return roller.roll(expr, stringifier=stringifier, advantage=advantage)
+
+    @staticmethod
+    def roll_many(expr, n, allow_comments=False, advantage=d20.AdvType.NONE, stringifier=None, roller=None):
+        """Roll the same expression n times. It is parsed (and set up for advantage) only once"""
+        if type(expr) is str:
+            expr = BbwUtils.parse_roll(expr, allow_comments)
+        if advantage != d20.AdvType.NONE:
+            expr = d20.utils.ast_adv_copy(expr, advantage)
+        return [BbwUtils.roll(expr, stringifier=stringifier, roller=roller) for _ in range(int(n))]
+
     @staticmethod
     def print_code(i):
         if int(i, 36) >= 10:
@@ -301,7 +371,7 @@ def get_modifier(key, ll):
     @staticmethod
     def lore_ipsum_md(ns, m):
         def li16():
-            return "\n".join([lorem.sentence() for _ in range(d20.roll("1d6").total)])
+            return "\n".join([lorem.sentence() for _ in range(BbwUtils.roll("1d6").total)])
 
         sb = ["```\n" + li16() + "\n```" for _ in range(m)]
 
@@ -31,6 +31,13 @@ def __init__(
     def armour(self):
         return BbwUtils.secondary_armour(self)
 
+    def crew_profile(self):
+        """BbwCrewProfile of the crew on board. Rebuilt when people are added, removed or changed"""
+        c = self._cache()
+        if c.crew_profile is None or c.crew_profile[0] != c.version:
+            c.crew_profile = (c.version, BbwCrewProfile(self.get_objs("crew")))
+        return c.crew_profile[1]
+
     def armor(self):
         return self.armour()
 
@@ -89,6 +96,7 @@ def _str_table(self, is_compact=True):
 
         return s
 
+    @BbwObjCache.render_cache_decor
     def __str__(self, detail_lvl: int = 0):
         s = ""
         s += BbwUtils.print_table(
@@ -161,12 +169,23 @@ def j_drive_required_time(n_jumps=1):
             n_jumps = float(n_jumps)
         BbwUtils.test_geq("n_jumps", n_jumps, 0)
 
-        return (148 * n_jumps + d20.roll(f"{6*n_jumps}d6").total) / 24
+        return (148 * n_jumps + BbwUtils.roll(f"{6*n_jumps}d6").total) / 24
+
+    @staticmethod
+    def j_drive_avg_time(n_jumps=1):
+        """Average of j_drive_required_time"""
+        return (148 + 6 * 3.5) * n_jumps / 24
 
     @staticmethod
     def j_drive_required_fuel(n_sectors):
         return 20 * n_sectors
 
+    def fuel_tank_capacity(self):
+        return sum(i.capacity() for i in self.get_objs(name="fuel tank"))
+
+    def refined_fuel(self):
+        return self.get_objs(name="fuel, refined", cont="fuel tank").count()
+
     def ck_j_drive(self, w0, w1):
         n_sectors = BbwWorld.distance(w0, w1)
         ans = []
@@ -175,11 +194,11 @@ def ck_j_drive(self, w0, w1):
                 f"ship's j drive (`{self.j_drive()}`) < distance (`{n_sectors}`) between `{w1.name()}` and"
                 f" `{w0.name()}`. Too far!"
             )
-        res = self.get_objs(name="fuel, refined", cont="fuel tank")
-
         rs = BbwSpaceShip.j_drive_required_fuel(n_sectors)
-        if res.count() < rs:
-            ans.append(f"currently the ship holds `{res.count()}` tons of refined fuel. {rs} required for this jump!")
+        if self.refined_fuel() < rs:
+            ans.append(
+                f"currently the ship holds `{self.refined_fuel()}` tons of refined fuel. {rs} required for this jump!"
+            )
 
         return "\n".join(ans)
 
@@ -314,6 +333,7 @@ def _str_table(self, detail_lvl=0):
 
         return s
 
+    @BbwObjCache.render_cache_decor
     def __str__(self, detail_lvl=1):
         s = ""
         s += BbwUtils.print_table(
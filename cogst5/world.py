@@ -3,10 +3,17 @@
 
 
 class WorldCodes:
+    _uwp_digits = {"SIZE": 1, "ATM": 2, "HYDRO": 3, "POP": 4, "GOV": 5, "LAW": 6, "TL": 7}
+
     def __init__(self, name, description, restrictions):
         self._name = name
         self._description = description
         self._restrictions = restrictions
+        self._digits = [(WorldCodes._uwp_digits[k], frozenset(v)) for k, v in restrictions.items()]
+
+    def match_digits(self, digits):
+        """As __eq__ but on the uwp digits (base 36) of the world. No need to build the world"""
+        return all(digits[pos] in v for pos, v in self._digits)
 
     def __eq__(self, other):
         for k, v in self.restrictions().items():
@@ -164,7 +171,7 @@ class BbwWorld(BbwObj):
         "all weapons, all armour",
     ]
 
-    def __init__(self, uwp, zone, hex, sector, *args, **kwargs):
+    def __init__(self, uwp, zone, hex, sector, gas_giants=0, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.set_capacity("inf")
         self.set_size(0)
@@ -172,13 +179,14 @@ def __init__(self, uwp, zone, hex, sector, *args, **kwargs):
         self.set_zone(zone)
         self.set_hex(hex)
         self.set_sector(sector)
+        self.set_gas_giants(gas_giants)
         self.set_people()
         self.set_trade_codes()
         self.set_suppliers()
         self.set_docking_fee()
 
     def set_suppliers(self):
-        self.dist_obj(BbwObj(name="suppliers", capacity="inf", size=0))
+        self.move_obj(BbwObj(name="suppliers", capacity="inf", size=0))
 
     def set_supply(self, bbwtrade, t, names=""):
         obj = [i for i, _ in self.suppliers().get_objs(name=names).objs()]
@@ -190,7 +198,7 @@ def suppliers(self):
         return self.get_objs("suppliers").objs()[0][0]
 
     def set_people(self):
-        self.dist_obj(BbwObj(name="people", capacity="inf", size=0))
+        self.move_obj(BbwObj(name="people", capacity="inf", size=0))
 
     @BbwUtils.set_if_not_present_decor
     def people(self):
@@ -210,10 +218,12 @@ def set_trade_codes(self, d=None):
                 self.set_trade_code(k, 1)
             return
 
-        self._trade_codes = set()
-        for k, v in self._trade_code_table.items():
-            if v == self:
-                self.set_trade_code(k, 1)
+        self._trade_codes = BbwWorld.uwp_trade_codes(self.uwp())
+
+    @staticmethod
+    def uwp_trade_codes(uwp: str):
+        digits = [int(i, 36) for i in uwp.replace("-", "")]
+        return {k for k, v in BbwWorld._trade_code_table.items() if v.match_digits(digits)}
 
     def set_trade_code(self, name: str, value: int = None):
         if value is None:
@@ -223,11 +233,12 @@ def set_trade_code(self, name: str, value: int = None):
             raise InvalidArgument(
                 f"Unknown trade code `{name}`. Possible options: `{', '.join(BbwWorld._trade_code_table.keys())}`"
             )
+        self._will_change()
         if value is None:
             self.trade_codes().discard(name)
-            return
-
-        self.trade_codes().add(name)
+        else:
+            self.trade_codes().add(name)
+        self._touch()
 
     @BbwUtils.set_if_not_present_decor
     def trade_codes(self):
@@ -242,6 +253,15 @@ def set_sector(self, x=(0, 0)):
             x = eval(x)
 
         self._sector = x
+        self._moved()
+
+    def set_gas_giants(self, v: int = 0):
+        BbwUtils.test_geq("gas giants", v, 0)
+        self._gas_giants = v
+
+    @BbwUtils.set_if_not_present_decor
+    def gas_giants(self):
+        return self._gas_giants
 
     def set_uwp(self, v: str = "A0000000"):
         v = v.replace("-", "")
@@ -266,6 +286,7 @@ def set_hex(self, v: str = "0000"):
         col = int(v[0:2])
         row = int(v[2:4])
         self._hex = v
+        self._moved()
 
     @BbwUtils.set_if_not_present_decor
     def hex(self):
@@ -290,7 +311,7 @@ def _get_SP_table_entry(self, table):
 
     def set_docking_fee(self, v: int = None):
         if v is None:
-            v = self._get_SP_table_entry(BbwWorld._SP_docking_fee_table) * d20.roll("1d6").total
+            v = self._get_SP_table_entry(BbwWorld._SP_docking_fee_table) * BbwUtils.roll("1d6").total
 
         v = int(v)
         self._docking_fee = v
@@ -353,22 +374,25 @@ def LAW(self):
     def TL(self):
         return self.uwp()[7], int(self.uwp()[7], 36)
 
+    def global_hex(self):
+        return BbwUtils.local_2_global(self.hex_x(), self.hex_y(), self.sec_x(), self.sec_y())
+
+    def cube(self):
+        """Global cube coordinates. Cached: they are needed for every distance"""
+        c = self._cache()
+        if c.cube is None:
+            c.cube = BbwUtils.hex_2_cube(*self.global_hex())
+        return c.cube
+
+    def _moved(self):
+        self._cache().cube = None
+        p = self.parent()
+        if p is not None:
+            p._cache().hex_index = None
+
     @staticmethod
     def distance(w0, w1):
-        x0, y0, xs0, ys0, x1, y1, xs1, ys1 = (
-            w0.hex_x(),
-            w0.hex_y(),
-            w0.sec_x(),
-            w0.sec_y(),
-            w1.hex_x(),
-            w1.hex_y(),
-            w1.sec_x(),
-            w1.sec_y(),
-        )
-        return BbwUtils.distance(
-            *BbwUtils.hex_2_cube(*BbwUtils.local_2_global(x0, y0, xs0, ys0)),
-            *BbwUtils.hex_2_cube(*BbwUtils.local_2_global(x1, y1, xs1, ys1)),
-        )
+        return BbwUtils.distance(*w0.cube(), *w1.cube())
 
     def _str_table(self, detail_lvl: int = 0):
         if detail_lvl == 0:
@@ -376,6 +400,7 @@ def _str_table(self, detail_lvl: int = 0):
         else:
             return [self.name(), self.uwp(), self.d_km(), self.zone(), self.hex(), str(self.sector())]
 
+    @BbwObjCache.render_cache_decor
     def __str__(self, detail_lvl: int = 0):
         s = BbwUtils.print_table(
             self._str_table(detail_lvl), headers=BbwWorld._header(detail_lvl), detail_lvl=detail_lvl
@@ -396,6 +421,7 @@ def __str__(self, detail_lvl: int = 0):
                 "TL",
                 BbwUtils.print_code(self.TL()[0]),
             ],
+            ["gas giants", self.gas_giants(), ""],
         ]
         s += BbwUtils.print_table(t, headers=h, detail_lvl=1)
 
@@ -416,3 +442,63 @@ def _header(detail_lvl: int = 0):
             return ["name", "uwp"]
         else:
             return ["name", "uwp", "d_km", "zone", "hex", "sector"]
+
+
+class BbwHexIndex:
+    """Worlds of a container bucketed on the global hex grid
+
+    Buckets are squares of _bucket_size hexes. A world within n parsecs is at most n columns and n rows away, so a
+    radius query checks only the buckets that intersect that square. Get it with BbwHexIndex.of: it is kept in the cache
+    of the container and built again after worlds are added, removed or moved
+    """
+
+    _bucket_size = 8
+
+    def __init__(self, worlds=()):
+        self._buckets = {}
+        self._bbox = None
+        # {max jump: jump graph} of BbwRoute.graph. They go with the index
+        self.graphs = {}
+        s = BbwHexIndex._bucket_size
+        for w in worlds:
+            x, y = w.global_hex()
+            self._buckets.setdefault((x // s, y // s), []).append(w)
+            if self._bbox is None:
+                self._bbox = [x, y, x, y]
+            self._bbox = [min(self._bbox[0], x), min(self._bbox[1], y), max(self._bbox[2], x), max(self._bbox[3], y)]
+
+    @staticmethod
+    def of(cont):
+        c = cont._cache()
+        if c.hex_index is None:
+            c.hex_index = BbwHexIndex([i for i in cont.values() if isinstance(i, BbwWorld)])
+        return c.hex_index
+
+    def worlds_within(self, w, n, self_included=False):
+        """[(world, distance)] within n parsecs of w, sorted by distance"""
+        x, y = w.global_hex()
+        s = BbwHexIndex._bucket_size
+        ans = []
+        for bx in range((x - n) // s, (x + n) // s + 1):
+            for by in range((y - n) // s, (y + n) // s + 1):
+                for i in self._buckets.get((bx, by), []):
+                    d = BbwWorld.distance(w, i)
+                    if d <= n and (self_included or i is not w):
+                        ans.append((i, d))
+
+        return sorted(ans, key=lambda i: i[1])
+
+    def nearest(self, w, predicate=lambda x: True, self_included=False):
+        """(world, distance) of the closest world that satisfies predicate or None. The radius doubles at every try"""
+        if self._bbox is None:
+            return None
+
+        x, y = w.global_hex()
+        x0, y0, x1, y1 = self._bbox
+        max_n = max(abs(x - x0), abs(x - x1)) + max(abs(y - y0), abs(y - y1))
+        n = BbwHexIndex._bucket_size
+        while True:
+            ans = [i for i in self.worlds_within(w, min(n, max_n), self_included) if predicate(i[0])]
+            if len(ans) or n >= max_n:
+                return ans[0] if len(ans) else None
+            n *= 2
@@ -5,6 +5,13 @@
 from cogst5.base import BbwObj
 
 
+@pytest.fixture(autouse=True)
+def ck_cache():
+    BbwObj._ck_cache = True
+    yield
+    BbwObj._ck_cache = False
+
+
 @pytest.fixture
 def max_detail_level():
     return 2
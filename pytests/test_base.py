@@ -4,6 +4,8 @@
 import pytest
 
 from cogst5.base import BbwObj, BbwRes
+from cogst5.expr import BbwExpr
+from cogst5.utils import BbwUtils
 from cogst5.models.errors import *
 
 
@@ -221,6 +223,178 @@ def test_res():
     assert res0.objs()[0][1].name() == "c1"
 
 
+def test_accumulate():
+    o0, o1 = BbwObj("o0", capacity=1), BbwObj("o1", capacity=1)
+    res = BbwRes()
+    objs = res.objs()
+    assert res.extend(BbwRes(count=1, objs=[(o0, None)])) is res
+    res.extend(BbwRes(count=2, objs=(o1, None)))
+    assert res.objs() is objs and res.count() == 3 and [i.name() for i in res] == ["o0", "o1"]
+    assert BbwRes().objs() == []
+
+    a = res + BbwRes(count=1, objs=[(o0, None)])
+    assert a.count() == 4 and res.count() == 3
+
+    # += does not change a result that somebody else holds
+    held = res
+    res += BbwRes(count=1, objs=[(o0, None)])
+    assert res is not held and res.count() == 4 and held.count() == 3 and len(held) == 2
+    with pytest.raises(InvalidArgument):
+        res.extend(1)
+
+    # results handed out by the containers
+    c = BbwObj("c", capacity="inf", size=0)
+    c.dist_obj(BbwObj("o0", capacity=1, count=2))
+    res = c.get_objs(name="o0")
+    held = res
+    res += c.get_objs(name="o0")
+    assert held.count() == 2 and res.count() == 4
+
+    r = BbwExpr()
+    l = r._l
+    r.extend(("a", 1))
+    r.extend(BbwExpr("b", 2))
+    r.extend(BbwExpr("c", 4) * -1)
+    assert r._l is l and int(r) == -1 and str(r) == "1 [a] + 2 [b] -4 [c] = -1"
+    assert BbwExpr()._l == []
+
+    r2 = BbwExpr(r)
+    r2.extend(("d", 1))
+    assert int(r) == -1 and int(r2) == 0
+
+    held = r
+    r += ("d", 1)
+    r -= BbwExpr("e", 1)
+    assert int(held) == -1 and int(r) == -1 and len(r._l) == 5
+
+
+def test_name_index():
+    c0 = BbwObj("c0", "inf", size=0)
+    for i in ["Crew, pilot", "crew, engineer", "cargo, main", "cargo", "CARGO", "box", "Box, main", "fuel tank"]:
+        c0.dist_obj(BbwObj(i, capacity=1))
+
+    def ck(name, **kwargs):
+        ans = c0.get_objs(name=name, recursive=False, self_included=True, **kwargs)
+        expected = BbwUtils.get_objs([c0, *c0.values()], name=name, **kwargs)
+        assert [i.name() for i in ans] == [i.name() for i in expected]
+
+    for i in ["cargo", "Cargo", "carg", "crew", "CREW, ENG", "box", "bo", "x", "c", "c0", "main", "nothing", "", None]:
+        ck(i)
+        ck(i, with_any_tags={"main"})
+        ck(i, without_tags={"main"})
+
+    c0.rename_obj("fuel tank", "tank, fuel")
+    c0.del_obj("CARGO")
+    c0.dist_obj(BbwObj("cargo, new", capacity=1))
+    assert c0.name_index().is_valid(c0)
+    for i in ["cargo", "CARGO", "fuel", "tank", "new"]:
+        ck(i)
+    assert c0.get_objs("fuel tank").count() == 0
+    with pytest.raises(SelectionException):
+        c0.get_objs("cargo, ", only_one=True, recursive=False)
+    assert c0.get_objs("cargo, ne", only_one=True).count() == 1
+
+
+def test_used_space_cache():
+    c0 = BbwObj("c0", 10, size=0)
+    c1 = BbwObj("c1", 5, size=0)
+    c0.dist_obj(c1)
+    assert c0.used_space() == 5
+    for _ in range(10):
+        c0.dist_obj(BbwObj("o", capacity=0.1), cont="c1")
+    assert c0.get_objs("c1").objs()[0][0].free_space() == 4
+    c1 = c0.get_objs("c1").objs()[0][0]
+    assert c1.parent() is c0
+    c1["o"].set_count(5)
+    assert c1.used_space() == 0.5
+    c0.del_obj("o", 2)
+    assert c1.used_space() == pytest.approx(0.3)
+    c1.set_capacity(6)
+    assert c0.used_space() == 6
+    assert c0.free_space() == 4
+    c0.del_obj("c1")
+    assert c0.used_space() == 0
+    assert c1.parent() is None
+    c2 = BbwObj("c2", "inf", size=0)
+    c2.dist_obj(c0)
+    c2.dist_obj(BbwObj("inf", capacity="inf"))
+    assert c2.used_space() == float("inf")
+    c2.del_obj("inf")
+    assert c2.used_space() == 10
+
+
+def test_move_obj():
+    c0 = BbwObj("c0", 10, size=0)
+    c0.dist_obj(BbwObj("box0", 5, size=0))
+    c0.dist_obj(BbwObj("box1", 5, size=0))
+    c0.dist_obj(BbwObj("backpack", 2, size=0), cont="box0")
+    c0.dist_obj(BbwObj("stone", capacity=0.5, count=2), cont="backpack")
+    backpack = c0.get_objs("backpack", only_one=True)[0]
+
+    res = c0.del_obj("backpack")
+    assert res[0] is backpack
+    assert backpack.parent() is None
+    assert c0.get_objs("box0", only_one=True)[0].used_space() == 0
+
+    res = c0.move_obj(backpack, cont="box1")
+    assert res.count() == 1
+    assert c0.get_objs("backpack", only_one=True)[0] is backpack
+    assert backpack.parent() is c0.get_objs("box1", only_one=True)[0]
+    assert backpack["stone"].count() == 2
+    with pytest.raises(InvalidArgument):
+        c0.move_obj(backpack)
+
+    # the lot is split: the part that does not fit is a copy
+    stones = BbwObj("stones", capacity=1, count=8)
+    res = c0.move_obj(stones, cont="box")
+    assert res.count() == 8
+    assert [i.count() for i, _ in res.objs()] == [5, 3]
+    assert [i is stones for i, _ in res.objs()] == [False, True]
+
+    res = c0.move_obj(BbwObj("rocks", capacity=1, count=2), cont="box")
+    assert res.count() == 0
+
+    rename = c0.rename_obj("stones", "pebbles", cont="box1")
+    assert rename[0] is stones
+
+    res = BbwRes(count=4, objs=[(backpack, None), (backpack, None), (stones, None)])
+    res.__str__(detail_lvl=1)
+    assert backpack.parent().name() == "box1"
+    assert backpack["stone"].parent() is backpack
+
+
+def test_render_cache(cs, p0):
+    ck = BbwObj._ck_cache
+    BbwObj._ck_cache = False
+    try:
+        s = cs.__str__(detail_lvl=2)
+        assert cs.__str__(detail_lvl=2) is s
+        assert cs.__str__(detail_lvl=1) is not s
+
+        # changes deep down in the tree show up
+        room = cs.get_objs("stateroom, main", only_one=True)[0]
+        res = room.dist_obj(p0)
+        assert res.count() == 1
+        p = res[0]
+        s1 = cs.__str__(detail_lvl=2)
+        assert s1 != s
+        assert room.__str__(detail_lvl=1) is room.__str__(detail_lvl=1)
+
+        ps = p.__str__(detail_lvl=1)
+        p.set_skill("broker", 2)
+        assert "broker" in p.__str__(detail_lvl=1)
+        p.set_skill('("broker", None)')
+        assert p.__str__(detail_lvl=1) == ps
+
+        # it is not in the ship anymore
+        room.del_obj(p.name())
+        s3 = cs.__str__(detail_lvl=2)
+        p.set_info("new info")
+        assert cs.__str__(detail_lvl=2) is s3
+    finally:
+        BbwObj._ck_cache = ck
+
+
 if __name__ == "__main__":
     test_setters_and_print(2)
     test_capacity_and_size()
@@ -229,3 +403,8 @@ def test_res():
     test_del_obj()
     test_free_space()
     test_res()
+    test_accumulate()
+    test_name_index()
+    test_used_space_cache()
+    test_move_obj()
+    # test_render_cache(cs, p0)
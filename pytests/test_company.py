@@ -0,0 +1,48 @@
+if __name__ == "__main__":
+    import __init__
+
+from cogst5.calendar import BbwCalendar
+from cogst5.company import BbwCompany
+from cogst5.log import BbwLog
+
+
+def test_close_months_life_support(cs):
+    crew = cs.get_objs(name="crew")
+
+    def life_support(ndays):
+        return cs.var_life_support(ndays)[1]
+
+    for t, ndays in [(0, 10), (20, 1000), (364, 29), (100, 56), (28, 1)]:
+        ts = BbwCalendar.month_starts(t, ndays)
+
+        # one month at a time
+        c0, log0, n_months = BbwCompany(), BbwLog(), 0
+        t0 = t
+        for t1 in ts:
+            c0.pay_life_support(log0, t0, life_support(t1 - t0))
+            c0.pay_salaries(crew, log0, t1)
+            t0, n_months = t1, n_months + 1
+        if t + ndays > t0:
+            c0.pay_life_support(log0, t0, life_support(t + ndays - t0))
+            n_months += 1
+
+        c1, log1 = BbwCompany(), BbwLog()
+        summary = c1.close_months(crew, log1, t, ts, ndays=ndays, life_support=life_support)
+
+        tot = c0.ledger().total("life support")
+        assert tot < 0 and c1.ledger().total("life support") == tot
+        assert summary[0] == ["life support", n_months, tot]
+        assert c1.ledger().table() == c0.ledger().table()
+        assert sum(i[0] for i in log1) == sum(i[0] for i in log0)
+        assert len(log1) == (2 if len(ts) else 1)
+
+    # no life support: as before
+    c = BbwCompany()
+    assert c.close_months(crew, BbwLog(), 0, [], ndays=10) == []
+
+
+if __name__ == "__main__":
+    from conftest import cs
+
+    cs = cs.__pytest_wrapped__.obj()
+    test_close_months_life_support(cs)
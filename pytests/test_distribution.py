@@ -0,0 +1,41 @@
+if __name__ == "__main__":
+    import __init__
+
+from fractions import Fraction
+
+from cogst5.distribution import BbwDist
+
+
+def test_dice():
+    d = BbwDist.dice(2)
+    assert d.prob() == 1
+    assert d.prob(lambda x: x == 7) == Fraction(1, 6)
+    assert d.mean() == 7
+    assert d.var() == Fraction(35, 6)
+    assert d.percentile(50) == 7
+    assert d.percentile(0) == 2 and d.percentile(100) == 12
+    assert BbwDist.dice(0).items() == [(0, 1)]
+    assert BbwDist.dice(3).mean() == Fraction(21, 2)
+
+
+def test_combine():
+    d = BbwDist.dice(1) - 1
+    assert d.mean() == Fraction(5, 2)
+    assert (d * 2).items() == [(i, Fraction(1, 6)) for i in range(0, 12, 2)]
+    assert (BbwDist.dice(1) - BbwDist.dice(1)).mean() == 0
+    assert (BbwDist.dice(1) * BbwDist.dice(1)).mean() == Fraction(49, 4)
+    # values that collide after scaling are merged
+    assert (BbwDist.dice(1) * 0).items() == [(0, 1)]
+
+    d = BbwDist.dice(2).map(lambda x: x >= 10)
+    assert d.prob(lambda x: x) == Fraction(1, 6)
+
+    # roll 1d6, then roll that many d6
+    d = BbwDist.dice(1).bind(BbwDist.dice)
+    assert d.prob() == 1
+    assert d.mean() == Fraction(49, 4)
+
+
+if __name__ == "__main__":
+    test_dice()
+    test_combine()
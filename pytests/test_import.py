@@ -0,0 +1,70 @@
+if __name__ == "__main__":
+    import __init__
+
+import os
+import statistics
+import subprocess
+import sys
+
+import pytest
+
+# cold start of the bot: own modules only, the dependencies (d20, discord, ...) are not ours to budget. Timings depend
+# on the machine: test_import_budget runs only if BBW_IMPORT_BUDGET is set
+_budget_us = 300000
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(code, *args):
+    return subprocess.run([sys.executable, *args, "-c", code], capture_output=True, text=True, cwd=_root, check=True)
+
+
+def import_times(module="cogst5.cog"):
+    """{module: (self, cumulative) [us]} of the import of module in a new interpreter"""
+    ans = {}
+    for line in _run(f"import {module}", "-X", "importtime").stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        ans[name.strip()] = (int(self_us), int(cumulative_us))
+    return ans
+
+
+def test_lazy_tables():
+    out = _run(
+        "import cogst5.cog\n"
+        "from cogst5.person import BbwPerson, BbwPersonFactory\n"
+        "from cogst5.item import BbwItemFactory\n"
+        "print(BbwPerson._skills, BbwPersonFactory._lib, BbwItemFactory._lib)\n"
+        "BbwPersonFactory.make('crew, pilot')\n"
+        "print(BbwPerson._skills, len(BbwPersonFactory._lib), BbwItemFactory._lib)\n"
+    ).stdout.splitlines()
+    assert out[0] == "None None None"
+    assert out[1] == "None 12 None"
+
+
+def median_import_times(n=10, module="cogst5.cog"):
+    """Medians of the cold import time of module and of its own modules [us]"""
+    own, total = [], []
+    for _ in range(n):
+        t = import_times(module)
+        own.append(sum(v[0] for k, v in t.items() if k.split(".")[0] == "cogst5"))
+        total.append(t[module][1])
+    return statistics.median(total), statistics.median(own)
+
+
+@pytest.mark.skipif(not os.environ.get("BBW_IMPORT_BUDGET"), reason="set BBW_IMPORT_BUDGET to check the import time")
+def test_import_budget():
+    _, own = median_import_times(5)
+    assert own <= _budget_us, f"cold import of cogst5.cog: {own / 1000:.1f}ms > {_budget_us / 1000:.0f}ms"
+
+
+def bench_import(n=10, module="cogst5.cog"):
+    """Cold import time of the bot. Run this file directly"""
+    total, own = median_import_times(n, module)
+    print(f"{module}: {total / 1000:.1f}ms, own modules: {own / 1000:.1f}ms (budget: {_budget_us / 1000:.0f}ms)")
+
+
+if __name__ == "__main__":
+    test_lazy_tables()
+    # test_import_budget()
+    bench_import()
@@ -0,0 +1,49 @@
+if __name__ == "__main__":
+    import __init__
+
+from cogst5.library import Library
+
+_data = {
+    "Regina": "Capital of the Regina subsector. See also: Spinward Marches",
+    "Regina (subsector)": "Subsector of the Spinward Marches.",
+    "Spinward Marches": "Sector on the spinward edge of the Imperium.",
+    "Vargr": "Major race descended from wolves.",
+    "Aslan": "Major race of carnivores.",
+}
+
+
+def test_library(tmp_path):
+    path = str(tmp_path / "library")
+    Library.build(_data, path)
+    l = Library(path=path, module=None)
+    assert l._keys is None
+    assert len(l) == len(_data)
+
+    assert [l.title(i) for i in l.matches("MARCH")] == ["Spinward Marches"]
+    assert [l.title(i) for i in l.matches("regina")] == ["Regina", "Regina (subsector)"]
+    assert [l.title(i) for i in l.matches("sector")] == ["Regina (subsector)"]
+    assert l.matches("xyz") == []
+    assert len(l.matches("")) == len(_data)
+    assert l.text(l.matches("vargr")[0]) == _data["Vargr"]
+
+    s = l.search("vargr")
+    assert "**Vargr**" in s and _data["Vargr"] in s
+    s = l.search("Regina")
+    assert _data["Regina"] in s and "See also" in s and "Regina (subsector)" in s
+    assert "Please specify" in l.search("r")
+
+    s = l.search("Vagr")
+    assert "not available" in s and "Vargr" in s
+    assert "Did you mean" not in l.search("qqqq")
+
+
+def test_library_empty(tmp_path):
+    l = Library(path=str(tmp_path / "none"), module=None)
+    assert len(l) == 0
+    assert "not available" in l.search("Regina")
+
+
+if __name__ == "__main__":
+    pass
+    # test_library()
+    # test_library_empty()
@@ -0,0 +1,61 @@
+if __name__ == "__main__":
+    import __init__
+
+import asyncio
+
+from cogst5.output import BbwOutput
+from cogst5.utils import BbwUtils
+
+
+class Ctx:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, msg=None, file=None):
+        self.sent.append((msg, file))
+
+
+def test_output():
+    async def command(ctx, msgs):
+        BbwOutput.begin()
+        for i in msgs:
+            assert BbwOutput.write(f"{BbwUtils._msg_divisor}{i}")
+        await BbwOutput.flush(ctx)
+
+    async def run():
+        ctx = Ctx()
+        # not collecting
+        assert not BbwOutput.write("a")
+
+        await command(ctx, [f"line {i}\n" for i in range(10)])
+        assert len(ctx.sent) == 1 and ctx.sent[0][0].count("line") == 10
+        assert not BbwOutput.write("a")
+
+        ctx = Ctx()
+        await command(ctx, [f"{'a' * 100}\n" for i in range(15)])
+        assert len(ctx.sent) == 2 and all(len(i) <= 2000 and f is None for i, f in ctx.sent)
+
+        ctx = Ctx()
+        await command(ctx, [f"{'a' * 100}\n" for i in range(100)])
+        assert len(ctx.sent) == 1 and ctx.sent[0][1] is not None
+        assert len(ctx.sent[0][0]) <= 2000
+
+        # every command has its own output
+        ctx0, ctx1 = Ctx(), Ctx()
+        await asyncio.gather(command(ctx0, ["a\n"] * 3), command(ctx1, ["b\n"] * 2))
+        assert ctx0.sent[0][0].count("a") == 3 and ctx1.sent[0][0].count("b") == 2
+
+        await BbwOutput.send(ctx, [])
+        assert len(ctx.sent) == 1
+
+        # messages without a trailing new line do not run into each other
+        ctx = Ctx()
+        await command(ctx, ["Date advanced by 400d", "```\ndate: 1-1-1\n```"])
+        assert f"400d\n{BbwUtils._msg_divisor}```" in ctx.sent[0][0]
+        assert BbwOutput.join(["a", "b\n", "```c```"]) == "a\nb\n```c```\n"
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_output()
@@ -91,6 +91,31 @@ def test_skills():
     pp.skill_check("flyer, rotor")
 
 
+def test_skill_index():
+    pp = BbwPerson(upp="37AEDC3", skill_rank={"seafarer, personal": 4, "jack-of-all-trades": 1, "art, holography": 1})
+    assert pp.skill("per") == ("seafarer, personal", 4)
+    assert pp.skill_index()["per"] == "seafarer, personal"
+    assert pp.skill("pilot") == ("pilot", -2)
+    assert pp.skill_index()["pilot"] is None
+
+    pp.set_skill("pilot, small craft", 2)
+    assert pp.skill("pilot") == ("pilot", 0)
+    assert pp.skill("pilot, small craft") == ("pilot, small craft", 2)
+    pp.set_rank("per", 5)
+    assert pp.rank("per") == ("per", 5)
+    pp.set_skill_rank({})
+    assert pp.skill("per") == ("per", -3)
+
+    trie = BbwPerson.skills_trie()
+    assert [BbwPerson.skills()[i].name() for i in trie.substring_matches("HOLOG")] == ["art, holography"]
+    assert len(trie.substring_matches("")) == len(BbwPerson.skills())
+    assert trie.substring_matches("zzz") == []
+    assert trie.get(BbwPerson.skills(), "art, holo").name() == "art, holography"
+    assert trie.get(BbwPerson.skills(), "art, xyz").name() == "art"
+    with pytest.raises(SelectionException):
+        trie.get(BbwPerson.skills(), "art, ")
+
+
 if __name__ == "__main__":
     from conftest import p0
 
@@ -101,3 +126,4 @@ def test_skills():
     # test_size_capacity()
     # test_std_person()
     # test_skills()
+    # test_skill_index()
@@ -0,0 +1,125 @@
+if __name__ == "__main__":
+    import __init__
+
+import copy
+import random
+import time
+
+import pytest
+
+from cogst5.base import BbwObj
+from cogst5.route import BbwRoute
+from cogst5.vehicle import BbwSpaceShip
+from cogst5.world import BbwWorld
+from cogst5.models.errors import *
+
+
+def make_worlds(l):
+    return [BbwWorld(name=name, uwp=uwp, zone="normal", hex=hex, sector=(-4, 1)) for name, uwp, hex in l]
+
+
+def test_route_multi_jump(cs):
+    # every world is 2 parsecs away from the next one
+    l = make_worlds([("a", "A788899-C", "1910"), ("b", "B788899-C", "2110"), ("c", "A788899-C", "2310")])
+    l += make_worlds([("d", "A788899-C", "2510"), ("e", "A788899-C", "2710")])
+    legs = BbwRoute.plan(cs, l, l[0], l[3])
+    assert [(i[0].name(), i[1].name(), i[2]) for i in legs] == [("a", "b", 2), ("b", "c", 2), ("c", "d", 2)]
+    # refined fuel is the fastest
+    assert all(i[3] == "refined" and i[4] == 40 and i[5] == 40 * 500 for i in legs)
+    assert sum(i[6] for i in legs) == pytest.approx(BbwSpaceShip.j_drive_avg_time(3))
+
+    # the gas giant is free but we need to refine
+    l[1].set_gas_giants(1)
+    legs = BbwRoute.plan(cs, l, l[0], l[3], objective="fuel")
+    assert legs[1][3] == "gas giant" and legs[1][5] == 0
+
+    # fuel already in the tanks
+    cs.add_fuel("refined", 40)
+    legs = BbwRoute.plan(cs, l, l[0], l[1])
+    assert legs[0][4] == 0 and legs[0][5] == 0
+
+    assert BbwRoute.plan(cs, l, l[0], l[0]) == []
+    h, t = BbwRoute.table(legs)
+    assert len(h) == len(t[0]) and t[-1][0] == "total"
+
+
+def test_route_fuel_constraints(cs):
+    # b has no fuel: the ship cannot go a -> b -> c
+    l = make_worlds([("a", "A788899-C", "1910"), ("b", "X700000-0", "2110"), ("c", "A788899-C", "2310")])
+    assert BbwRoute.plan(cs, l, l[0], l[2]) is None
+    # with a detour through a world with water it is possible
+    l += make_worlds([("d", "X786000-0", "2111")])
+    legs = BbwRoute.plan(cs, l, l[0], l[2])
+    assert [i[1].name() for i in legs] == ["d", "c"]
+    assert legs[1][3] == "world"
+
+    # no scoop, no water
+    cs.set_has_fuel_scoop(0)
+    assert BbwRoute.plan(cs, l, l[0], l[2]) is None
+
+    # j drive too small
+    cs.set_has_fuel_scoop(1)
+    cs.set_j_drive(1)
+    assert BbwRoute.plan(cs, l, l[0], l[2]) is None
+
+    # red zones are not intermediate stops
+    cs.set_j_drive(2)
+    l[3].set_zone("red")
+    assert BbwRoute.plan(cs, l, l[0], l[2]) is None
+    assert len(BbwRoute.plan(cs, l, l[0], l[2], avoid_red=False)) == 2
+    assert len(BbwRoute.plan(cs, l, l[0], l[3])) == 1
+
+    with pytest.raises(SelectionException):
+        BbwRoute.plan(cs, l, l[0], l[2], objective="asd")
+
+
+def test_route_charted_space(cs):
+    cont = BbwObj(name="charted space", capacity="inf", size=0)
+    for i in make_worlds([("a", "A788899-C", "1910"), ("b", "B788899-C", "2110"), ("c", "A788899-C", "2310")]):
+        cont.dist_obj(i)
+    assert len(BbwRoute.plan(cs, cont, cont["a"], cont["c"])) == 2
+    assert BbwRoute.graph(cont, cs.j_drive()) is BbwRoute.graph(cont, cs.j_drive())
+
+    # a world is replaced (load, undo, ...): the graph is built again with the new one
+    cont["b"] = copy.deepcopy(cont["b"])
+    legs = BbwRoute.plan(cs, cont, cont["a"], cont["c"])
+    assert legs[0][1] is cont["b"]
+
+    # same worlds in another campaign
+    cont2 = copy.deepcopy(cont)
+    assert len(BbwRoute.plan(cs, cont2, cont2["a"], cont2["c"])) == 2
+
+    # moved out of reach
+    cont["b"].set_hex("2710")
+    assert BbwRoute.plan(cs, cont, cont["a"], cont["c"]) is None
+
+
+def bench_route(cs):
+    """Route over 2000 worlds, then again with the jump graph cached. Run this file directly"""
+    random.seed(0)
+    hexes = random.sample([(x, y) for x in range(1, 33) for y in range(1, 41)], 1000)
+    cont = BbwObj(name="charted space", capacity="inf", size=0)
+    cont.move_objs(
+        BbwWorld(name=f"w{sx}-{idx}", uwp="A788899-C", zone="normal", hex=f"{x:02}{y:02}", sector=(sx, 0))
+        for sx in range(2)
+        for idx, (x, y) in enumerate(hexes)
+    )
+    l = list(cont.values())
+
+    t0 = time.perf_counter()
+    legs = BbwRoute.plan(cs, cont, l[0], l[-1])
+    t1 = time.perf_counter()
+    BbwRoute.plan(cs, cont, l[1], l[-2])
+    t2 = time.perf_counter()
+    print(f"route over {len(l)} worlds ({len(legs)} jumps): {t1 - t0:.3f}s, with cached graph: {t2 - t1:.3f}s")
+
+
+if __name__ == "__main__":
+    from conftest import cs
+
+    cs = cs.__pytest_wrapped__.obj()
+
+    test_route_multi_jump(cs)
+    # test_route_fuel_constraints(cs)
+    # test_route_charted_space(cs)
+    bench_route(cs)
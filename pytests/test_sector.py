@@ -0,0 +1,111 @@
+if __name__ == "__main__":
+    import __init__
+
+import os
+import random
+import time
+
+import pytest
+
+from cogst5.base import BbwObj
+from cogst5.models.errors import InvalidArgument
+from cogst5.sector import BbwSector
+from cogst5.world import BbwWorld
+
+_tab = [
+    "Sector\tSS\tHex\tName\tUWP\tBases\tRemarks\tZone\tPBG\tAllegiance\tStars",
+    "Spin\tC\t1910\tRegina\tA788899-C\tNS\tRi Pa Ph An Cp\t\t703\tImDd\tF7 V BD M3 V",
+    "Spin\tC\t2011\tWypoc\tE9C4547-9\t\tNi\tA\t711\tImDd\tK0 V",
+    "Spin\tC\t2111\t\tX000000-0\t\tBa\tR\t000\t--\tM0 V",
+    "Spin\tC\t2112\tUnknown\t???????-?\t\t\t\t000\t--\t",
+]
+
+_col = [
+    "# Spinward Marches",
+    "Hex  Name                 UWP       Remarks      Z PBG Stars",
+    "---- -------------------- --------- ------------ - --- ------------",
+    "1910 Regina               A788899-C Ri Pa Ph     - 703 F7 V BD M3 V",
+    "2011 Wypoc                E9C4547-9 Ni           A 711 K0 V",
+    "",
+]
+
+
+def test_read_rows():
+    rows = list(BbwSector.read_rows(_tab))
+    assert len(rows) == 4
+    assert rows[0]["Name"] == "Regina" and rows[0]["UWP"] == "A788899-C" and rows[0]["PBG"] == "703"
+    assert rows[2]["Name"] == ""
+
+    rows = list(BbwSector.read_rows(_col))
+    assert len(rows) == 2
+    assert rows[1] == {
+        "Hex": "2011",
+        "Name": "Wypoc",
+        "UWP": "E9C4547-9",
+        "Remarks": "Ni",
+        "Zone": "A",
+        "PBG": "711",
+        "Stars": "K0 V",
+    }
+
+
+def test_import_sector(tmp_path):
+    cs = BbwObj(name="charted space", capacity="inf", size=0)
+    res, skipped = BbwSector.import_sector(cs, _tab, (-4, 1))
+    assert sorted(cs.keys()) == ["2111", "Regina", "Wypoc"]
+    assert len(res) == 3 and [i[0] for i in skipped] == ["Unknown"]
+
+    w = cs["Regina"]
+    assert w.sector() == (-4, 1) and w.hex() == "1910" and w.gas_giants() == 3
+    assert w.trade_codes() == {"Ri", "Ht"}
+    assert cs["Wypoc"].zone() == "amber" and cs["2111"].zone() == "red"
+    w1 = BbwWorld(name="Regina", uwp="A788899-C", zone="normal", hex="1910", sector=(-4, 1))
+    assert w.trade_codes() == w1.trade_codes()
+    assert cs.get_objs(name="wypoc", only_one=True, recursive=False)[0] is cs["Wypoc"]
+
+    p = tmp_path / "spin.sec"
+    p.write_text("\n".join(_col))
+    res, skipped = BbwSector.import_sector_file(cs, p, "(-4, 1)")
+    assert len(res) == 0 and sorted(i[0] for i in skipped) == ["Regina", "Wypoc"]
+
+
+def test_import_sector_input(tmp_path):
+    assert BbwSector.parse_sector("(-4, 1)") == BbwSector.parse_sector([-4, 1]) == (-4, 1)
+    for i in ["__import__('os').getcwd()", "(1, 2, 3)", "('a', 1)", "(1.5, 2)", (1,)]:
+        with pytest.raises(InvalidArgument):
+            BbwSector.parse_sector(i)
+
+    d = tmp_path / "save"
+    (d / "sectors").mkdir(parents=True)
+    (d / "sectors" / "spin.sec").write_text("\n".join(_col))
+    (tmp_path / "secret").write_text("")
+    os.symlink(tmp_path / "secret", d / "link")
+    dirs = [str(d / "0" / "1"), f"{d}/sectors/", f"{d}/"]
+    assert BbwSector.find_file("spin.sec", dirs) == f"{d}/sectors/spin.sec"
+    for i in ["../secret", "sectors/../../secret", str(tmp_path / "secret"), "link", "missing.sec"]:
+        with pytest.raises(InvalidArgument):
+            BbwSector.find_file(i, dirs)
+
+
+def bench_import_sector():
+    """Import of a full sector (about 500 worlds). Run this file directly"""
+    random.seed(0)
+    lines = ["Hex\tName\tUWP\tZone\tPBG"]
+    for x in range(1, 33):
+        for y in range(1, 41):
+            if random.random() < 0.4:
+                uwp = random.choice("ABCDEX") + "".join(random.choice("0123456789A") for _ in range(6))
+                uwp += f"-{random.choice('56789ABC')}"
+                lines.append(f"{x:02}{y:02}\tw{x:02}{y:02}\t{uwp}\t\t{random.randint(100, 999)}")
+
+    cs = BbwObj(name="charted space", capacity="inf", size=0)
+    t = time.perf_counter()
+    res, _ = BbwSector.import_sector(cs, lines, (0, 0))
+    t = time.perf_counter() - t
+    print(f"import of {len(res)} worlds: {t:.3f}s")
+
+
+if __name__ == "__main__":
+    test_read_rows()
+    # test_import_sector_input(pathlib.Path(tempfile.mkdtemp()))
+    bench_import_sector()
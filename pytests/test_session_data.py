@@ -1,2 +1,351 @@
 if __name__ == "__main__":
     import __init__
+
+import asyncio
+import json
+import jsonpickle
+import os
+
+from cogst5.journal import BbwJournal
+from cogst5.log import BbwLog, BbwLogArchive
+from cogst5.calendar import BbwCalendar
+from cogst5.company import BbwDebt
+from cogst5.history import BbwHistory
+from cogst5.session_data import BbwSessionData
+from cogst5.session_manager import BbwSessionManager
+from cogst5.world import BbwWorld
+
+
+def _encode(obj):
+    """jsonpickle encoding with the sets sorted: the order of a set depends on how it was built"""
+
+    def _sort_sets(d):
+        if isinstance(d, dict):
+            return {k: sorted(v, key=str) if k == "py/set" else _sort_sets(v) for k, v in d.items()}
+        if isinstance(d, list):
+            return [_sort_sets(i) for i in d]
+        return d
+
+    return _sort_sets(json.loads(jsonpickle.encode(obj)))
+
+
+def test_journal(tmp_path, cs, w0, w1):
+    j = BbwJournal(str(tmp_path / "session_data.json"))
+    sd = BbwSessionData()
+    sd.fleet().dist_obj(cs)
+    sd.charted_space().dist_obj(w0)
+    sd.set_ship_curr(cs.name())
+    sd.set_world_curr(w0.name())
+    j.write_snapshot(j.seal(sd))
+    assert j.n_records() == 0
+
+    sd.get_ship_curr().add_fuel("refined")
+    sd.add_log_entry("new entry", 100)
+    sd.charted_space().dist_obj(w1)
+    # ship, log, company and the new world. The calendar was only read
+    assert j.append(sd) == 4
+    assert j.append(sd) == 0
+    # reads are not journaled
+    str(sd.get_ship_curr()), str(sd.get_world()), sd.company().money(), sd.calendar().t(), str(sd.log())
+    assert j.append(sd) == 0
+    assert "_dirty" not in jsonpickle.encode(sd)
+    sd.fleet().rename_obj(cs.name(), "new name")
+    sd.set_ship_curr("new name")
+    assert j.append(sd) == 3
+    # the ledger is part of the company
+    sd.company().ledger().add_entry(0, "other", 5)
+    assert j.append(sd) == 1
+
+    with open(j.journal_path(), "a") as f:
+        f.write('{"op": "set", "k": ["com')
+
+    sd2 = BbwJournal(j.path()).load()
+    assert _encode(sd2) == _encode(sd)
+    assert sd2.get_ship_curr().get_objs("fuel, refined").count() == 41
+    assert sd2.company().money() == 100
+    assert sd2.get_world(w1.name()).name() == w1.name()
+
+    enc_data = j.seal(sd)
+    assert j.n_records() == 0
+    sd.calendar().add_t(3)
+    j.append(sd)
+    # crash during compaction: the old snapshot + sealed journal + journal are still consistent
+    sd2 = BbwJournal(j.path()).load()
+    assert sd2.calendar().t() == 3
+    assert sd2.fleet()["new name"].get_objs("fuel, refined").count() == 41
+
+    j.write_snapshot(enc_data)
+    sd2 = BbwJournal(j.path()).load()
+    assert _encode(sd2) == _encode(sd)
+
+
+def test_session_manager(tmp_path, cs):
+    async def _command(sm, channel, f):
+        BbwSessionManager.set_current(0, channel)
+        c = await sm.acquire()
+        f(c.session_data)
+        sm.release()
+
+    def command(sm, channel, f):
+        # like discord: every command runs in its own task
+        return asyncio.create_task(_command(sm, channel, f))
+
+    async def run():
+        sm = BbwSessionManager(f"{tmp_path}/")
+        assert sm.campaign_dir((0, 1)) == f"{tmp_path}/0/1/"
+        assert sm.campaign_dir((None, None)) == f"{tmp_path}/"
+
+        await command(sm, 1, lambda sd: sd.fleet().dist_obj(cs))
+        await command(sm, 2, lambda sd: sd.calendar().add_t(5))
+        # undo and redo are journaled like any other change
+        await command(sm, 2, lambda sd: sm.campaign().history.undo(sd))
+        assert BbwSessionManager(f"{tmp_path}/").campaign((0, 2)).session_data.calendar().t() == 0
+        await command(sm, 2, lambda sd: sm.campaign().history.redo(sd))
+        assert len(sm.campaign((0, 2)).history) == 1 and sm.campaign((0, 2)).history.n_redo() == 0
+        assert BbwSessionManager.current() == (None, None)
+        assert len(sm) == 2
+        assert os.path.exists(f"{tmp_path}/0/1/session_data.journal")
+        assert not os.path.exists(f"{tmp_path}/0/1/session_data.json")
+
+        BbwSessionManager._max_campaigns = 1
+        await command(sm, 3, lambda sd: None)
+        assert (0, 1) not in sm and (0, 2) not in sm and (0, 3) in sm
+        await asyncio.gather(*sm._flushing.values())
+        assert os.path.exists(f"{tmp_path}/0/1/session_data.json")
+        assert not os.path.exists(f"{tmp_path}/0/3")
+
+        await command(sm, 1, lambda sd: sd.set_ship_curr(cs.name()))
+        assert sm.campaign((0, 1)).session_data.get_ship_curr().name() == cs.name()
+        assert BbwSessionManager(f"{tmp_path}/").campaign((0, 2)).session_data.calendar().t() == 5
+
+    max_campaigns = BbwSessionManager._max_campaigns
+    try:
+        asyncio.run(run())
+    finally:
+        BbwSessionManager._max_campaigns = max_campaigns
+
+
+def test_log_archive(tmp_path):
+    sd = BbwSessionData()
+    for i in range(3):
+        sd.add_log_entry(f"old {i}", i)
+    # the archive starts with what is in the ring buffer
+    sd.log().set_archive(BbwLogArchive(str(tmp_path / "session_data.log")))
+    for i in range(200):
+        sd.calendar().add_t(1)
+        sd.add_log_entry(f"entry {i}", i % 2)
+    sd.log().undo()
+
+    def ck(log):
+        assert len(log.archive()) == 202
+        assert [i[1] for i in log.query(5, name="old")] == ["old 0", "old 1", "old 2"]
+        assert log.query(3, transactions=1)[-1][1] == "entry 197"
+        assert log.query(1, transactions=2)[0][1] == "entry 198"
+        assert [i[1] for i in log.query(10, t_min=2, t_max=3)] == ["entry 1", "entry 2"]
+
+    log = sd.log()
+    assert len(log) == BbwLog._max_size - 1 and log[-1][1] == "entry 198"
+    ck(log)
+
+    # only the ring buffer goes with the session data
+    log = jsonpickle.decode(jsonpickle.encode(log))
+    assert log.archive() is None and len(log) == BbwLog._max_size - 1
+    assert log.query(5, name="old") == []
+    log.set_archive(BbwLogArchive(str(tmp_path / "session_data.log")))
+    ck(log)
+
+    # BbwLog was a list
+    log = jsonpickle.decode('{"py/object": "cogst5.log.BbwLog", "_name": "", "py/seq": [[2, "a", 1], [0, "b", null]]}')
+    assert log.query(1, transactions=1) == [[2, "a", 1]]
+
+
+def test_ledger():
+    sd = BbwSessionData()
+    sd.company().set_money(100000)
+    sd.add_log_entry("buy: wood, spt (10)", -5000, kind="buy", name="wood, spt", tons=10)
+    sd.add_log_entry("fuel, refined (20)", -10000, kind="fuel", tons=20)
+    sd.calendar().add_t(40)
+    sd.add_log_entry("sell: wood, spt (10)", 8000, kind="sell", name="wood, spt", tons=10, cost=5000)
+    sd.add_log_entry("payback", 100)
+    sd.add_log_entry("no money")
+    sd.calendar().add_t(365)
+    sd.add_log_entry("fuel, refined (20)", -10000, kind="fuel", tons=20)
+    sd.company().pay_salaries([], sd.log(), sd.calendar().t())
+
+    ledger = jsonpickle.decode(jsonpickle.encode(sd.company())).ledger()
+    assert ledger.total() == sd.company().money() - 100000 == -17000 + 100
+    assert ledger.total("fuel") == -20000
+    assert ledger.total("fuel", year=1) == ledger.total("fuel", year=1, month=2) == -10000
+    assert ledger.total("sell", year=0, month=1) == 0 and ledger.total("sell", year=0, month=2) == 8000
+
+    h, t = ledger.table()
+    assert h == ["month", "buy", "sell", "salary", "fuel", "other", "net"]
+    assert t[0] == ["0-01", -5000, 0, 0, -10000, 0, -15000]
+    assert [i[0] for i in t] == ["0-01", "0-02", "1-02"]
+    h, t = ledger.table("year")
+    assert [i[-1] for i in t] == [-6900, -10000]
+    h, t = ledger.table(year=1)
+    assert len(t) == 1
+    h, t = ledger.table_by_good()
+    assert t == [["wood, spt", 10, 5000, 10, 8000, 3000, 300]]
+
+
+def test_close_months(cs):
+    for t, ndays in [(0, 0), (0, 29), (28, 1), (364, 1), (100, 3000)]:
+        ts = BbwCalendar.month_starts(t, ndays)
+        assert len(ts) == BbwCalendar(t).add_t(ndays)
+        assert all(BbwCalendar(i - 1).add_t(1) == 1 for i in ts)
+
+    def make():
+        sd = BbwSessionData()
+        sd.company().debts().dist_obj(BbwDebt(name="mortgage", capacity=1000, due_t=10, period=28, end_t=600))
+        sd.company().debts().dist_obj(BbwDebt(name="loan", capacity=500, due_t=10))
+        return sd
+
+    crew = cs.get_objs(name="crew")
+    ts = BbwCalendar.month_starts(0, 1000)
+
+    sd0 = make()
+    for _ in ts:
+        sd0.company().pay_salaries(crew, sd0.log(), 0)
+        sd0.company().pay_debts(sd0.log(), 0)
+    sd1 = make()
+    summary = sd1.company().close_months(crew, sd1.log(), 0, ts)
+
+    assert [i[:2] for i in summary] == [["salaries", len(ts)], ["debt: mortgage", 22], ["debt: loan", 1]]
+    assert list(sd1.company().debts().keys()) == list(sd0.company().debts().keys()) == []
+    for kind in ["salary", "debt"]:
+        assert sd1.company().ledger().total(kind) == sd0.company().ledger().total(kind) != 0
+    assert sum(i[0] for i in sd1.log()) == sum(i[0] for i in sd0.log())
+    assert len(sd1.log()) == 3
+    assert sd1.company().ledger().total("debt", year=0, month=2) == 1500
+
+
+def test_history(tmp_path, cs, w0, w1):
+    sd = BbwSessionData()
+    sd.fleet().dist_obj(cs)
+    sd.charted_space().dist_obj(w0)
+    sd.set_ship_curr(cs.name())
+    sd.log().set_archive(BbwLogArchive(str(tmp_path / "session_data.log")))
+    h = BbwHistory()
+
+    def state():
+        sd.pop_dirty()
+        return _encode(sd)
+
+    def command(name, f):
+        h.begin(sd, name)
+        f()
+        return h.end(sd)
+
+    states = [state()]
+    assert command("fuel", lambda: (sd.get_ship_curr().add_fuel("refined"), sd.add_log_entry("fuel", 100)))
+    assert [k for k, _ in h._undo[-1][1]] == [("company",), ("fleet", cs.name()), ("log",)]
+    states.append(state())
+    # only reads: nothing is copied and there is nothing to undo
+    h.begin(sd, "show")
+    str(sd.get_ship_curr()), str(sd.get_world(w0.name())), sd.company().money(), str(sd.log())
+    assert h._before == {}
+    assert not h.end(sd)
+    assert command("rename", lambda: (sd.fleet().rename_obj(cs.name(), "new name"), sd.set_ship_curr("new name")))
+    states.append(state())
+    assert command("worlds", lambda: (sd.charted_space().dist_obj(w1), sd.charted_space().del_obj(w0.name())))
+    states.append(state())
+    assert h.names() == ["fuel", "rename", "worlds"]
+
+    assert h.undo(sd) == ["worlds"]
+    assert state() == states[2]
+    assert h.undo(sd, 5) == ["rename", "fuel"]
+    # the journal gets what was restored
+    assert {("fleet", cs.name()), ("fleet", "new name"), ("curr",), ("log",)} <= sd.dirty()
+    assert state() == states[0] and len(sd.log().archive()) == 0
+    assert h.undo(sd) == []
+
+    assert h.redo(sd, 2) == ["fuel", "rename"]
+    assert state() == states[2] and len(sd.log().archive()) == 1
+    assert sd.get_ship_curr().get_objs("fuel, refined").count() == 41
+
+    # undo within a command: the rest of the command is recorded
+    h.begin(sd, "undo")
+    assert h.undo(sd) == ["rename"]
+    sd.calendar().add_t(3)
+    h.end(sd)
+    assert h.names() == ["fuel", "undo"] and h.n_redo() == 0
+    assert h.undo(sd) == ["undo"]
+    assert state() == states[1]
+
+    # changes in place deep in a ship
+    def crew():
+        return sd.get_ship_curr().get_objs(name="zio peppo", only_one=True).objs()[0][0]
+
+    assert command("skill", lambda: crew().set_skill("broker", 3))
+    assert h.undo(sd) == ["skill"] and crew().skill_rank()["broker"] == 2
+    assert state() == states[1]
+
+    # a save was loaded during the command
+    h.begin(sd)
+    sd = BbwSessionData()
+    h.end(sd)
+    assert len(h) == 0
+
+
+def test_history_log(tmp_path):
+    sd = BbwSessionData()
+    sd.log().set_archive(BbwLogArchive(str(tmp_path / "session_data.log")))
+    h = BbwHistory()
+    n = BbwLog._max_size
+
+    def command(name, n_entries):
+        h.begin(sd, name)
+        for i in range(n_entries):
+            sd.add_log_entry(f"{name} {i}", i)
+        return h.end(sd)
+
+    def ck(n_archived, last):
+        log = sd.log()
+        assert len(log.archive()) == n_archived and len(log) == min(n_archived, n)
+        assert len(BbwLogArchive(log.archive().path())) == n_archived
+        if n_archived:
+            assert log[-1][1] == last and log.query(1)[0][1] == last
+
+    # the ring buffer is full, the archive goes on
+    assert command("a", n + 20) and command("b", 30)
+    ck(n + 50, "b 29")
+
+    # undo -> redo -> undo
+    assert h.undo(sd) == ["b"]
+    ck(n + 20, f"a {n + 19}")
+    assert h.redo(sd) == ["b"]
+    ck(n + 50, "b 29")
+    assert h.undo(sd, 2) == ["b", "a"]
+    ck(0, None)
+    assert h.redo(sd, 2) == ["a", "b"]
+    ck(n + 50, "b 29")
+    assert h.undo(sd) == ["b"]
+    ck(n + 20, f"a {n + 19}")
+
+    # a new entry drops the redo: b does not come back in the archive
+    assert command("c", 1)
+    assert h.redo(sd) == []
+    ck(n + 21, "c 0")
+    assert sd.log().query(1000, name="b") == []
+    assert h.undo(sd) == ["c"]
+    ck(n + 20, f"a {n + 19}")
+    assert h.redo(sd) == ["c"]
+    ck(n + 21, "c 0")
+    assert [i[1] for i in sd.log().query(2)] == [f"a {n + 19}", "c 0"]
+
+
+if __name__ == "__main__":
+    from conftest import cs, w0, w1
+    import pathlib
+    import tempfile
+
+    cs, w0, w1 = cs.__pytest_wrapped__.obj(), w0.__pytest_wrapped__.obj(), w1.__pytest_wrapped__.obj()
+    test_journal(pathlib.Path(tempfile.mkdtemp()), cs, w0, w1)
+    test_session_manager(pathlib.Path(tempfile.mkdtemp()), cs)
+    test_log_archive(pathlib.Path(tempfile.mkdtemp()))
+    test_ledger()
+    test_close_months(cs)
+    test_history(pathlib.Path(tempfile.mkdtemp()), cs, w0, w1)
+    test_history_log(pathlib.Path(tempfile.mkdtemp()))
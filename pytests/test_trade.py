@@ -1,8 +1,17 @@
 if __name__ == "__main__":
     import __init__
 
+import pytest
+import random
+import time
+from fractions import Fraction
+
 from cogst5.trade import BbwTrade
-from cogst5.person import BbwSupplier
+from cogst5.route import BbwRoute
+from cogst5.item import BbwItemFactory
+from cogst5.world import BbwWorld
+from cogst5.person import BbwSupplier, BbwPersonFactory
+from cogst5.base import BbwObj
 from cogst5.calendar import BbwCalendar
 from cogst5.utils import BbwUtils
 
@@ -71,8 +80,166 @@ def test_optimize_spt(cs, w0, w1):
 
     h, t = BbwTrade.optimize_spt(cs, w0, filter=["advanced weapons, spt", "cybernetics, spt", "luxury goods, spt"])
 
-    l = [i.replace(" ", "\n") for i in ["advanced weapons, spt", "cybernetics, spt"]]
+    # exact averages: the rolls are not approximated with the average roll anymore
+    l = [i.replace(" ", "\n") for i in ["cybernetics, spt", "advanced weapons, spt"]]
     assert [t[0][0], t[1][0]] == l
+    assert len(h) == len(t[0])
+
+
+def test_deal_spt_dist(w0):
+    buy_multi, buy_r, sell_multi, sell_r = BbwTrade.get_deal_spt_dist("advanced weapons, spt", 0, w0)
+    assert int(buy_r) == 2 and int(sell_r) == -2
+    assert buy_multi.prob() == 1
+    t = BbwTrade._speculative_trading_modified_price_buy_table
+    # only 3 sixes give the best price
+    assert buy_multi.prob(lambda x: x == BbwUtils.get_modifier(20, t)) == Fraction(1, 216)
+    assert buy_multi.percentile(0) == BbwUtils.get_modifier(20, t)
+    assert buy_multi.percentile(100) == BbwUtils.get_modifier(5, t)
+    t = BbwTrade._speculative_trading_modified_price_sell_table
+    assert sell_multi.percentile(0) == BbwUtils.get_modifier(1, t)
+    assert sell_multi.percentile(100) == BbwUtils.get_modifier(16, t)
+
+
+def test_expected_revenue(cs, w0, w1):
+    h, t = BbwTrade.expected_passengers(cs, 2, 3, w0, w1)
+    assert [i[0] for i in t] == ["high", "middle", "basic", "low"]
+    assert len(h) == len(t[0])
+
+    _, nd = BbwTrade.find_passengers_dist(cs, 2, 3, "basic", w0, w1)
+    assert nd.prob() == 1
+    for _ in range(20):
+        person, _ = BbwTrade.find_passengers(cs, 2, 3, "basic", w0, w1)
+        assert nd.prob(lambda x: x == (0 if person is None else person.count())) > 0
+
+    nd = BbwTrade.find_mail_dist(cs, 2, 3, w0, w1)
+    assert nd.prob() == 1 and set(dict(nd.items()).keys()) <= set(range(7))
+
+    nd, tons_per_lot, revenue = BbwTrade.find_freight_dist(2, 3, "major", w0, w1)
+    ticket = BbwItemFactory._tickets[BbwWorld.distance(w0, w1) - 1]
+    assert float(revenue.mean()) == pytest.approx(float(nd.mean()) * tons_per_lot.mean() * ticket)
+
+    h, t = BbwTrade.expected_mail_and_freight(cs, 2, 3, w0, w1)
+    assert [i[0] for i in t] == ["mail", "major", "minor", "incidental"]
+
+
+def test_trade_scan(cs, w0, w1):
+    w2 = BbwWorld(name="Knorbes", uwp="C7A5747-7", zone="normal", hex="1808", sector=(-4, 1))
+    w3 = BbwWorld(name="far away", uwp="A788899-C", zone="normal", hex="2312", sector=(-4, 1))
+    cs.dist_obj(BbwObj(name="lowberths", capacity=20, size=0))
+    h, t = BbwTrade.trade_scan(cs, w0, [w0, w1, w2, w3], 2, 3, cargo_tons=100)
+    assert len(h) == len(t[0])
+    assert sorted(i[0] for i in t) == ["Knorbes", "Wypoc"]
+    assert t[0][-1] >= t[1][-1]
+
+    # same numbers as the single pair reports, capped: 46 stateroom spaces (4 per high or middle passenger) go to all
+    # the high passengers and to the middle ones that fit, none is left for the basic ones. 10 low passengers fit
+    _, tp = BbwTrade.expected_passengers(cs, 2, 3, w0, w1)
+    high, middle, _, _ = [float(i[3].split(" ")[0]) for i in tp]
+    n_middle = (46 - 4 * high / 14000) / 4
+    assert n_middle < middle / 10000
+    row = [i for i in t if i[0] == "Wypoc"][0]
+    assert row[4] == pytest.approx(high + n_middle * 10000 + 10 * 1300, abs=5)
+
+    # far away is 4 parsecs away but there is no stop in between
+    h, t = BbwTrade.trade_scan(cs, w0, [w0, w1, w2, w3], 2, 3, n_jumps=3, cargo_tons=0)
+    assert sorted(i[0] for i in t) == ["Knorbes", "Wypoc"] and all(i[3] == 0 and i[5] == 0 for i in t)
+
+    # with a stop it is 2 jumps away: the days are the ones of the route
+    l = [w0, w1, w2, w3, BbwWorld(name="stop", uwp="A788899-C", zone="normal", hex="2111", sector=(-4, 1))]
+    h, t = BbwTrade.trade_scan(cs, w0, l, 2, 3, n_jumps=3, cargo_tons=0)
+    assert len(t) == 4
+    legs = BbwRoute.plan(cs, l, w0, w3)
+    row = [i for i in t if i[0] == "far away"][0]
+    assert len(legs) == 2 and row[2] == BbwUtils.conv_days_2_time(sum(i[6] for i in legs))
+    assert "far away" not in [i[0] for i in BbwTrade.trade_scan(cs, w0, l, 2, 3, n_jumps=1)[1]]
+
+    # no cargo: no luggage, no high and middle passengers. No room: no passengers
+    _, t = BbwTrade.trade_scan(cs, w0, l, 2, 3, n_jumps=3)
+    assert row[4] < [i for i in t if i[0] == "far away"][0][4]
+    cs.del_obj(name="staterooms")
+    cs.dist_obj(BbwObj(name="filler", capacity=44, size=44), cont="stateroom, main")
+    cs.dist_obj(BbwObj(name="filler", capacity=20, size=20), cont="lowberths")
+    _, t = BbwTrade.trade_scan(cs, w0, l, 2, 3, n_jumps=3)
+    assert len(t) == 4 and all(i[4] == 0 for i in t)
+
+    # no fuel tank: nothing is reachable
+    cs.del_obj(name="fuel tank")
+    assert BbwTrade.trade_scan(cs, w0, l, 2, 3, n_jumps=3)[1] == []
+
+    buy_multi = BbwTrade.get_deal_spt_dist("wood", 0, None)[0]
+    assert BbwTrade.price_multi(0, True)[1] == pytest.approx(float(buy_multi.mean()))
+
+
+def test_goods_table(w0, w1):
+    gt = BbwTrade.goods_table()
+    assert BbwTrade.goods_table() is gt
+    for w in [w0, w1, None]:
+        buy_dms, sell_dms = gt.dms(w)
+        for i, v in enumerate(BbwTrade._speculative_trading_table):
+            assert buy_dms[i] == int(BbwTrade._get_mod_st(v.buy_mods(), w))
+            assert sell_dms[i] == int(BbwTrade._get_mod_st(v.sell_mods(), w))
+            assert gt.avg_tons(w)[i] == v.tons_stats(w)[1] * v.ton_multi()
+
+    profits = BbwTrade.spt_profits(w0, [w1, w0], 2)
+    for i, v in enumerate(BbwTrade._speculative_trading_table):
+        expected = BbwTrade._evaluate_good_st(v, w0, w1, 2)[4]
+        assert profits[0][i] == pytest.approx(expected)
+
+
+def test_plan_cargo(cs):
+    # 12 tons of cargo, 4 stateroom and 4 lowberth spaces free
+    cs.dist_obj(BbwObj(name="filler", capacity=18, size=18), cont="cargo0")
+    cs.dist_obj(BbwObj(name="filler", capacity=42, size=42), cont="stateroom, main")
+    cs.dist_obj(BbwObj(name="lowberths", capacity=4, size=0))
+    offers = [
+        ("high", BbwPersonFactory.make(name="high", count=2)),
+        ("middle", None),
+        ("basic", BbwPersonFactory.make(name="basic", count=3)),
+        ("low", BbwPersonFactory.make(name="low", count=3)),
+        ("mail", BbwItemFactory.make(name="mail", count=2)),
+        ("incidental", BbwItemFactory.make(name="incidental", count=12, capacity=1, value=8000)),
+    ]
+    free = [i.free_space() for i, _ in cs.get_objs().objs()]
+
+    # mail first would give 50000 + the high passenger instead of 12 lots
+    plan = BbwTrade.plan_cargo(cs, offers)
+    assert [i[2] for i in plan] == [0, 0, 2, 2, 0, 12]
+    assert sum(i[3] for i in plan) == 2 * 2000 + 2 * 700 + 12 * 8000
+    assert [i.free_space() for i, _ in cs.get_objs().objs()] == free
+
+    # cheap lots: mail, the high passenger and its luggage
+    offers[-1] = ("incidental", BbwItemFactory.make(name="incidental", count=12, capacity=1, value=1000))
+    plan = BbwTrade.plan_cargo(cs, offers)
+    assert [i[2] for i in plan] == [1, 0, 0, 2, 2, 1]
+
+    h, t = BbwTrade.plan_cargo_table(plan)
+    assert len(h) == len(t[0]) and t[-1][:3] == ["total", 22, 6]
+
+    # 20 tons in 2 holds (12 + 8): only one 10 tons lot fits
+    cs.dist_obj(BbwObj(name="cargo1", capacity=8, size=0))
+    offers = [("incidental", BbwItemFactory.make(name="incidental", count=2, capacity=10, value=5000))]
+    plan = BbwTrade.plan_cargo(cs, offers)
+    assert [i[2:] for i in plan] == [(1, 5000)]
+    assert BbwTrade.plan_cargo(cs, [("mail", None)]) == [("mail", None, 0, 0)]
+
+
+def bench_spt_profits(w0):
+    """Speculative trade profits towards 500 worlds. Run this file directly"""
+    random.seed(0)
+    l = [
+        BbwWorld(
+            name=f"w{i}",
+            uwp=random.choice("ABCDEX") + "".join(random.choice("0123456789A") for _ in range(7)),
+            zone=random.choice(["normal", "amber", "red"]),
+            hex="0101",
+            sector=(0, 0),
+        )
+        for i in range(500)
+    ]
+    t = time.perf_counter()
+    profits = BbwTrade.spt_profits(w0, l, 2)
+    t = time.perf_counter() - t
+    print(f"spt profits of {len(profits[0])} goods in {len(l)} worlds: {t:.3f}s")
 
 
 if __name__ == "__main__":
@@ -85,3 +252,9 @@ def test_optimize_spt(cs, w0, w1):
     # test_find_cargo(cs, w0, w1)
     # test_suppliers_st(cs, w0, w1)
     # test_optimize_spt(cs, w0, w1)
+    # test_deal_spt_dist(w0)
+    # test_expected_revenue(cs, w0, w1)
+    # test_trade_scan(cs, w0, w1)
+    # test_goods_table(w0, w1)
+    bench_spt_profits(w0)
+    # test_plan_cargo(cs)
@@ -1,6 +1,10 @@
 if __name__ == "__main__":
     import __init__
 
+import d20
+import pytest
+import timeit
+
 from cogst5.utils import BbwUtils
 
 
@@ -25,5 +29,66 @@ def test_convert_d20_traveller():
     assert BbwUtils.to_d20_roll("2DD") == "2d6*10"
 
 
+class _Sanitized:
+    def f(self, a: int, b: float = 0.0, c: bool = False, d: str = "", e: list = None, *args, **kwargs):
+        return a, b, c, d, e, args, kwargs
+
+    def no_annotations(self, a, b=0):
+        return a, b
+
+    @staticmethod
+    def static(a: int = 0):
+        return a
+
+
+_Sanitized = BbwUtils.for_all_methods(BbwUtils.type_sanitizer_decor)(_Sanitized)
+
+
+def test_type_sanitizer_decor():
+    o = _Sanitized()
+    assert o.f("3", "0.5", "true", "x", "[1, 2]") == (3, 0.5, True, "x", [1, 2], (), {})
+    assert o.f(a="3", c="0", e=(1,), z="1") == (3, 0.0, False, "", (1,), (), {"z": "1"})
+    assert o.f(1, None, True, "d", None, "extra") == (1, None, True, "d", None, ("extra",), {})
+    assert o.static("4") == 4
+    assert _Sanitized.static(a="5") == 5
+    assert _Sanitized.no_annotations is _Sanitized.__dict__["no_annotations"]
+    assert o.no_annotations("1") == ("1", 0)
+
+    with pytest.raises(ValueError):
+        o.f(0, e="__import__('os')")
+
+
+def test_roll():
+    BbwUtils._parse_roll.cache_clear()
+    ast = BbwUtils.parse_roll("2d6+3 [ck]")
+    assert BbwUtils.parse_roll("2d6+3 [ck]") is ast
+    assert BbwUtils._parse_roll.cache_info().hits == 1
+
+    r = BbwUtils.roll("2d6+3 [ck]")
+    assert 5 <= r.total <= 15 and r.expr is not None
+    assert BbwUtils._parse_roll.cache_info().misses == 1
+
+    r = BbwUtils.roll("1d6 some comment", allow_comments=True)
+    assert r.comment == "some comment"
+
+    l = BbwUtils.roll_many("1d6", 200)
+    assert len(l) == 200 and {i.total for i in l} == {1, 2, 3, 4, 5, 6}
+    l = BbwUtils.roll_many("1d20", 100, advantage=d20.AdvType.ADV)
+    assert all(str(i.ast) == "2d20kh1" for i in l)
+    assert str(ast) == "2d6 + 3 [ck]"
+
+
+def bench_type_sanitizer_decor(n=100000):
+    """Per-call overhead of the decorator. Run this file directly"""
+    o = _Sanitized()
+    t_raw = timeit.timeit(lambda: o.f.__wrapped__(o, 1, 0.5, True), number=n)
+    t_dec = timeit.timeit(lambda: o.f(1, 0.5, True), number=n)
+    t_str = timeit.timeit(lambda: o.f("1", "0.5", "true"), number=n)
+    print(f"raw: {t_raw / n * 1e9:.0f}ns, decorated: {t_dec / n * 1e9:.0f}ns, from strings: {t_str / n * 1e9:.0f}ns")
+
+
 if __name__ == "__main__":
+    test_type_sanitizer_decor()
+    bench_type_sanitizer_decor()
+    # test_roll()
     test_convert_d20_traveller()
@@ -5,6 +5,7 @@
 
 from cogst5.vehicle import BbwSpaceShip
 from cogst5.item import BbwItem
+from cogst5.person import BbwPerson
 from cogst5.models.errors import *
 import pytest
 
@@ -112,6 +113,30 @@ def test_fuel_tank(cs):
     assert ft.free_space() == 0
 
 
+def test_crew_profile(cs):
+    crew = cs.crew_profile()
+    assert cs.crew_profile() is crew
+    v, l = crew.max_skill("broker")
+    assert v == ("broker", 2) and [i.name() for i in l] == ["zio peppo, crew"]
+    assert crew.max_skill("broker") is crew.max_skill("broker")
+    assert crew.max_rank("navy")[0][1] == 0
+
+    # the crew member is changed in place
+    l[0].set_skill("broker", 3)
+    crew = cs.crew_profile()
+    assert crew.max_skill("broker")[0] == ("broker", 3)
+
+    room = cs.get_objs("stateroom, main", only_one=True)[0]
+    p = BbwPerson(name="new, crew", upp="35AFFC3", skill_rank={"broker": 4})
+    assert room.dist_obj(p).count() == 1
+    assert cs.crew_profile() is not crew
+    v, l = cs.crew_profile().max_skill("broker")
+    assert v == ("broker", 4) and [i.name() for i in l] == ["new, crew"]
+
+    room.del_obj("new, crew")
+    assert cs.crew_profile().max_skill("broker")[0] == ("broker", 3)
+
+
 if __name__ == "__main__":
     from conftest import cs
 
@@ -119,4 +144,5 @@ def test_fuel_tank(cs):
     test_m_drive()
     cs = cs.__pytest_wrapped__.obj()
     test_fuel_tank(copy.deepcopy(cs))
+    # test_crew_profile(copy.deepcopy(cs))
     test_armour()
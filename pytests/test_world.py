@@ -2,8 +2,11 @@
     import __init__
 
 import copy
+import random
+import time
 
-from cogst5.world import BbwWorld
+from cogst5.base import BbwObj
+from cogst5.world import BbwWorld, BbwHexIndex
 
 
 def test_world_stats(w0):
@@ -76,6 +79,56 @@ def test_set_docking_fee(w0):
     assert w0.docking_fee() != oldv
 
 
+def test_hex_index(w0, w1):
+    cs = BbwObj(name="charted space", capacity="inf", size=0)
+    cs.move_obj(w0)
+    cs.move_obj(w1)
+    for i, hex in enumerate(["1911", "2110", "2310", "1510"]):
+        cs.move_obj(BbwWorld(name=f"w{i}", uwp="X000000-0", zone="red", hex=hex, sector=(-4, 1)))
+
+    idx = BbwHexIndex.of(cs)
+    assert BbwHexIndex.of(cs) is idx
+    assert [(i.name(), d) for i, d in idx.worlds_within(w0, 2)] == [("w0", 1), ("Wypoc", 2), ("w1", 2)]
+    assert [i.name() for i, _ in idx.worlds_within(w0, 0, self_included=True)] == ["Regina"]
+    assert idx.nearest(w0, lambda x: x.zone() == "amber") == (w1, 2)
+    assert idx.nearest(w0, lambda x: x.SP()[0] == "A") is None
+    assert idx.nearest(w0, lambda x: x.SP()[0] == "A", self_included=True) == (w0, 0)
+    assert idx.nearest(w0, lambda x: x.name() == "w3") == (cs["w3"], 4)
+
+    # moving or adding worlds rebuilds the index
+    w1.set_hex("1510")
+    assert BbwHexIndex.of(cs) is not idx
+    assert BbwWorld.distance(w0, w1) == 4
+    assert [i.name() for i, _ in BbwHexIndex.of(cs).worlds_within(w0, 2)] == ["w0", "w1"]
+    cs.move_obj(BbwWorld(name="w4", uwp="X000000-0", zone="red", hex="1910", sector=(-4, 1)))
+    assert BbwHexIndex.of(cs).nearest(w0) == (cs["w4"], 0)
+
+
+def bench_hex_index():
+    """Radius queries with the index against all pairs. Run this file directly"""
+    random.seed(0)
+    hexes = random.sample([(x, y) for x in range(1, 33) for y in range(1, 41)], 500)
+    l = [
+        BbwWorld(name=f"w{idx}", uwp="X000000-0", zone="normal", hex=f"{x:02}{y:02}", sector=(sx, sy))
+        for sx in range(2)
+        for sy in range(2)
+        for idx, (x, y) in enumerate(hexes)
+    ]
+    idx = BbwHexIndex(l)
+
+    t = time.perf_counter()
+    for w in l[:200]:
+        ans = idx.worlds_within(w, 2)
+    t_idx = time.perf_counter() - t
+    t = time.perf_counter()
+    for w in l[:200]:
+        expected = [i for i in l if i is not w and BbwWorld.distance(w, i) <= 2]
+    t_all = time.perf_counter() - t
+    print(f"worlds within 2 parsecs in {len(l)} worlds. Index: {t_idx:.3f}s, all pairs: {t_all:.3f}s")
+
+    assert set(id(i) for i, _ in ans) == set(id(i) for i in expected)
+
+
 if __name__ == "__main__":
     from conftest import w0, w1
 
@@ -86,3 +139,5 @@ def test_set_docking_fee(w0):
     test_set_trade_code(copy.deepcopy(w0))
     test_people(copy.deepcopy(w0))
     test_set_docking_fee(copy.deepcopy(w0))
+    test_hex_index(copy.deepcopy(w0), copy.deepcopy(w1))
+    bench_hex_index()